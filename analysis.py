@@ -1,29 +1,89 @@
+import bisect
+
 import numpy as np
 
+import instrumentation
+from election_dataset import PARTIES, as_year_slice, party_codes
 
-def compute_flip_for_year(election_results, loser, votes_to_win):
-    """Compute dynamic-programming table to flip enough states to give loser >= votes_to_win.
 
-    Returns:
-        flipped_states (list[str]): states to flip
-        min_votes_to_flip (int): minimal popular votes to flip across selected states
-        best_v (int): electoral votes flipped
-        winner_states_dict (dict): per-state data used in DP
+# Sentinel for unreachable EV totals. Kept well below the int64 max so that
+# adding a state's flip cost to it can never overflow.
+DP_INF = np.iinfo(np.int64).max // 4
+
+# Name of the per-state flip cost formula; part of every cache key so cached
+# solutions are never reused across different cost models.
+COST_MODEL = 'winner_to_runner_up_half_margin'
+LINKED_COST_MODEL = COST_MODEL + '+linked_districts'
+
+# EVs a state with district units awards to its statewide winner (the two Senate EVs)
+AT_LARGE_EV = 2
+
+
+def _min_cost_knapsack(ev_weights, flip_costs, max_electoral_votes):
+    """Vectorized 0/1 knapsack over electoral votes.
+
+    dp[v] is the minimal number of flipped votes needed to move exactly v
+    electoral votes. Each state's relaxation is a single slice operation over
+    the int64 cost array, which matches the descending per-cell loop because
+    the candidate costs are computed from the previous row before assignment.
+    take_bits[i] is a bit-packed mask over the EV axis of the cells state i
+    improved, so the backtrack over states in reverse order is exact.
+    """
+    dp = np.full(max_electoral_votes + 1, DP_INF, dtype=np.int64)
+    dp[0] = 0
+    take_bits = []
+
+    for ev, vt in zip(ev_weights, flip_costs):
+        prev = dp[:max_electoral_votes + 1 - ev]
+        candidate = prev + vt
+        improved = (prev < DP_INF) & (candidate < dp[ev:])
+        dp[ev:][improved] = candidate[improved]
+        took = np.zeros(max_electoral_votes + 1, dtype=bool)
+        took[ev:] = improved
+        take_bits.append(np.packbits(took))
+
+    instrumentation.count('dp_runs')
+    instrumentation.count('dp_cells_relaxed', int(np.maximum(max_electoral_votes + 1 - np.asarray(ev_weights), 0).sum()))
+    return dp, take_bits
+
+
+def winner_columns(year, party_win):
+    """Index into PARTIES of each row's winning party (its *_votes column).
+
+    Raises ValueError for a winner code other than D/R/T instead of guessing a party.
     """
+    codes = party_codes(party_win)
+    if (codes < 0).any():
+        unknown = sorted(set(np.asarray(party_win, dtype=object)[codes < 0].tolist()))
+        raise ValueError(f'{year}: unknown state winner code(s) {unknown}; expected one of {", ".join(PARTIES)}')
+    return codes.astype(np.int64)
+
+
+def _flip_candidates(election_results, loser):
+    """Per-state flip data for every state the loser lost, sorted by votes per EV."""
+    year = as_year_slice(election_results)
+
     # States the loser lost
-    lost_states = election_results[election_results['party_win'] != loser]
+    party_win = year['party_win']
+    lost = party_win != loser
+
+    # Each state's winning party column, gathered column-wise instead of per row
+    votes = np.stack([year[p + '_votes'][lost] for p in PARTIES], axis=1)
+    state_winner_votes = votes[np.arange(len(votes)), winner_columns(year.year, party_win[lost])]
+    runner_up_votes = year[loser + '_votes'][lost]
+    votes_to_flip = (state_winner_votes - runner_up_votes) // 2 + 1
 
     winner_states_dict = {}
-    for _, row in lost_states.iterrows():
-        state = row['state']
-        electoral_votes = row['electoral_votes']
-        state_winner_votes = row[row['party_win'] + '_votes']
-        runner_up_votes = row[loser + '_votes']
-        votes_to_flip = (state_winner_votes - runner_up_votes) // 2 + 1
+    for state, electoral_votes, vt, total_votes in zip(
+        year['state'][lost].tolist(),
+        year['electoral_votes'][lost].tolist(),
+        votes_to_flip.tolist(),
+        year['totalvotes'][lost].tolist(),
+    ):
         winner_states_dict[state] = {
             'electoral_votes': electoral_votes,
-            'votes_to_flip': votes_to_flip,
-            'total_votes': row['totalvotes']
+            'votes_to_flip': vt,
+            'total_votes': total_votes
         }
 
     # Sort by efficiency
@@ -34,35 +94,541 @@ def compute_flip_for_year(election_results, loser, votes_to_win):
         )
     }
 
-    max_electoral_votes = sum([d['electoral_votes'] for d in winner_states_dict.values()])
-    dp = [np.inf] * (max_electoral_votes + 1)
+    return winner_states_dict
+
+
+def _group_options(sub_units, at_large):
+    """Options of one state with district units: {EV total: (cost, units)}, cheapest per total.
+
+    sub_units are the (ev, cost, name) units the loser lost; at_large is the
+    (ev, cost, name) of the at-large EVs or None when the loser already won the
+    statewide vote. Votes flipped inside the sub-units also count statewide, so
+    taking the at-large EVs on top of a set of sub-units costs
+    max(at-large cost, sub-unit costs) rather than their sum.
+    """
+    best = {0: (0, ())}
+    for ev, cost, name in sub_units:
+        for v, (c, units) in list(best.items()):
+            if v + ev not in best or c + cost < best[v + ev][0]:
+                best[v + ev] = (c + cost, units + (name,))
+    options = {v: entry for v, entry in best.items() if v > 0}
+    if at_large is not None:
+        ev, cost, name = at_large
+        for v, (c, units) in best.items():
+            entry = (max(cost, c), units + (name,))
+            if v + ev not in options or entry[0] < options[v + ev][0]:
+                options[v + ev] = entry
+    return [(v, c, units) for v, (c, units) in sorted(options.items())]
+
+
+def _linked_flip_groups(election_results, loser):
+    """Flip options per state for the linked district model.
+
+    A state whose year has district rows (state_po 'ME-02' next to 'ME') splits
+    into its at-large EVs, decided by the combined vote of the state row and its
+    district rows, and one unit per row for the remaining EVs (the state row
+    carries the votes outside the listed districts). Every other state is a
+    single-option group, as in _flip_candidates.
+
+    Returns (winner_states_dict, groups): the per-unit flip data (at-large units
+    also carry their combined 'original_votes' and 'state_winner') and a list of
+    [(ev, cost, units)] option lists, cheapest votes per EV first.
+    """
+    year = as_year_slice(election_results)
+    states = year['state'].tolist()
+    state_po = year['state_po'].tolist()
+    party_win = year['party_win']
+    ev = year['electoral_votes']
+    total_votes = year['totalvotes']
+    votes = {p: year[f'{p}_votes'] for p in PARTIES}
+    # each row's winning party, checked against PARTIES as in _flip_candidates
+    row_winner = [PARTIES[c] for c in winner_columns(year.year, party_win).tolist()]
+
+    row_of = {po: i for i, po in enumerate(state_po)}
+    districts = {}
+    for i, po in enumerate(state_po):
+        parent = po.split('-')[0]
+        if '-' in po and parent in row_of:
+            districts.setdefault(row_of[parent], []).append(i)
+    district_rows = {i for rows in districts.values() for i in rows}
+
+    def unit(i, electoral_votes):
+        cost = int((votes[row_winner[i]][i] - votes[loser][i]) // 2 + 1)
+        return {'electoral_votes': electoral_votes, 'votes_to_flip': cost, 'total_votes': int(total_votes[i])}
+
+    winner_states_dict = {}
+    groups = []
+    for i, state in enumerate(states):
+        if i in district_rows:
+            continue
+        if i not in districts:
+            if party_win[i] != loser:
+                winner_states_dict[state] = unit(i, int(ev[i]))
+                groups.append([(int(ev[i]), winner_states_dict[state]['votes_to_flip'], (state,))])
+            continue
+
+        members = [i] + districts[i]
+        sub_units = []
+        for j in members:
+            own_ev = int(ev[j]) - (AT_LARGE_EV if j == i else 0)
+            if own_ev > 0 and party_win[j] != loser:
+                winner_states_dict[states[j]] = unit(j, own_ev)
+                sub_units.append((own_ev, winner_states_dict[states[j]]['votes_to_flip'], states[j]))
+        combined = {p: int(votes[p][members].sum()) for p in PARTIES}
+        at_large_winner = max(PARTIES, key=combined.get)
+        at_large = None
+        if at_large_winner != loser:
+            name = f'{state} AT-LARGE'
+            winner_states_dict[name] = {
+                'electoral_votes': AT_LARGE_EV,
+                'votes_to_flip': (combined[at_large_winner] - combined[loser]) // 2 + 1,
+                'total_votes': int(total_votes[members].sum()),
+                'original_votes': combined,
+                'state_winner': at_large_winner,
+            }
+            at_large = (AT_LARGE_EV, winner_states_dict[name]['votes_to_flip'], name)
+        options = _group_options(sub_units, at_large)
+        if options:
+            groups.append(options)
+
+    groups.sort(key=lambda options: min(cost / ev for ev, cost, _ in options))
+    winner_states_dict = {
+        k: v for k, v in sorted(
+            winner_states_dict.items(),
+            key=lambda item: item[1]['votes_to_flip'] / item[1]['electoral_votes']
+        )
+    }
+    return winner_states_dict, groups
+
+
+def _grouped_min_cost_knapsack(groups, max_electoral_votes):
+    """Multiple-choice min-cost knapsack: at most one (ev, cost, units) option per group.
+
+    A single-option group is a plain 0/1 item, so with no linked states this is
+    the same DP as _min_cost_knapsack. choices[g][v] is the option of group g
+    that set dp[v] after group g was relaxed (-1 if none), which makes the
+    backtrack exact; each option is one slice operation over the EV axis.
+    """
+    n_ev = max_electoral_votes + 1
+    dp = np.full(n_ev, DP_INF, dtype=np.int64)
     dp[0] = 0
-    state_used = [None] * (max_electoral_votes + 1)
-
-    for state, data in winner_states_dict.items():
-        ev = data['electoral_votes']
-        vt = data['votes_to_flip']
-        for v in range(max_electoral_votes, ev - 1, -1):
-            if dp[v - ev] + vt < dp[v]:
-                dp[v] = dp[v - ev] + vt
-                state_used[v] = state
-
-    min_dp = np.inf
-    best_v = 0
-    for v in range(votes_to_win, max_electoral_votes + 1):
-        if dp[v] < min_dp:
-            min_dp = dp[v]
-            best_v = v
-
-    flipped_states = []
-    v_current = best_v
-    min_votes_to_flip = 0
-    while v_current > 0:
-        state = state_used[v_current]
-        if state is None:
-            break
-        min_votes_to_flip += winner_states_dict[state]['votes_to_flip']
-        flipped_states.append(state)
-        v_current -= winner_states_dict[state]['electoral_votes']
-
-    return flipped_states, min_votes_to_flip, best_v, winner_states_dict
+    choices = []
+    for options in groups:
+        relaxed = dp.copy()
+        choice = np.full(n_ev, -1, dtype=np.int16)
+        for o, (ev, cost, _) in enumerate(options):
+            prev = dp[:n_ev - ev]
+            candidate = prev + cost
+            improved = (prev < DP_INF) & (candidate < relaxed[ev:])
+            relaxed[ev:][improved] = candidate[improved]
+            choice[ev:][improved] = o
+        dp = relaxed
+        choices.append(choice)
+    instrumentation.count('dp_runs')
+    instrumentation.count('dp_cells_relaxed', sum(max(n_ev - ev, 0) for options in groups for ev, _, _ in options))
+    return dp, choices
+
+
+class FlipFrontier:
+    """Minimal flip cost for every EV target of one year, from a single DP pass.
+
+    The min-cost table already covers every EV total, so any number of targets
+    (classic, no_majority, metrics, or ad-hoc thresholds) can be answered from
+    one frontier without rerunning the knapsack.
+
+    linked_districts: model Maine/Nebraska style district units as linked options
+        of their state (see _linked_flip_groups) instead of independent rows
+    """
+
+    def __init__(self, election_results, loser, linked_districts=False):
+        self.loser = loser
+        self.linked_districts = linked_districts
+        self._groups = None
+        if linked_districts:
+            self.winner_states_dict, self._groups = _linked_flip_groups(election_results, loser)
+        else:
+            self.winner_states_dict = _flip_candidates(election_results, loser)
+        self.states = list(self.winner_states_dict.keys())
+        self.ev_weights = np.array([int(d['electoral_votes']) for d in self.winner_states_dict.values()], dtype=np.int64)
+        self.flip_costs = np.array([int(d['votes_to_flip']) for d in self.winner_states_dict.values()], dtype=np.int64)
+        self.max_electoral_votes = int(self.ev_weights.sum())
+
+        if linked_districts:
+            dp, self._choices = _grouped_min_cost_knapsack(self._groups, self.max_electoral_votes)
+        else:
+            dp, self._take_bits = _min_cost_knapsack(self.ev_weights, self.flip_costs, self.max_electoral_votes)
+        self._dp = dp
+
+        # For each target t: the first EV total >= t with the minimal cost (earliest on ties)
+        suffix_min = np.minimum.accumulate(dp[::-1])[::-1]
+        positions = np.arange(self.max_electoral_votes + 1)
+        records = np.where(dp == suffix_min, positions, self.max_electoral_votes + 1)
+        best_v = np.minimum.accumulate(records[::-1])[::-1]
+        self._best_v = np.where(suffix_min < DP_INF, best_v, 0)
+        self.min_cost = np.where(suffix_min < DP_INF, suffix_min, -1)
+        self._solutions = {}
+
+    def best_electoral_votes(self, votes_to_win):
+        """EV total flipped by the cheapest solution reaching votes_to_win (0 if unreachable)."""
+        start = max(int(votes_to_win), 0)
+        if start > self.max_electoral_votes:
+            return 0
+        return int(self._best_v[start])
+
+    def _reconstruct(self, best_v):
+        if best_v not in self._solutions and self._groups is not None:
+            flipped_states = []
+            v_current = best_v
+            for g in range(len(self._groups) - 1, -1, -1):
+                o = int(self._choices[g][v_current])
+                if o >= 0:
+                    ev, _, units = self._groups[g][o]
+                    flipped_states.extend(units)
+                    v_current -= ev
+            # votes shared between a state's at-large and district units are counted once
+            self._solutions[best_v] = (flipped_states, int(self._dp[best_v]) if best_v else 0)
+        if best_v not in self._solutions:
+            flipped_states = []
+            v_current = best_v
+            for i in range(len(self.states) - 1, -1, -1):
+                if v_current <= 0:
+                    break
+                if (self._take_bits[i][v_current // 8] >> (7 - v_current % 8)) & 1:
+                    flipped_states.append(self.states[i])
+                    v_current -= int(self.ev_weights[i])
+            self._solutions[best_v] = (flipped_states, int(self._dp[best_v]) if best_v else 0)
+        return self._solutions[best_v]
+
+    def optimal_cost(self, votes_to_win):
+        """The DP table's optimum for the target, dp[best_v] (0 for targets <= 0, -1 if unreachable)."""
+        start = max(int(votes_to_win), 0)
+        if start == 0:
+            return 0
+        if start > self.max_electoral_votes:
+            return -1
+        return int(self.min_cost[start])
+
+    def min_votes(self, votes_to_win):
+        """Minimal popular votes to flip so the loser gains at least votes_to_win EVs."""
+        return self._reconstruct(self.best_electoral_votes(votes_to_win))[1]
+
+    def solve(self, votes_to_win):
+        """Same return value as compute_flip_for_year for this target."""
+        best_v = self.best_electoral_votes(votes_to_win)
+        flipped_states, min_votes_to_flip = self._reconstruct(best_v)
+        return list(flipped_states), min_votes_to_flip, best_v, self.winner_states_dict
+
+
+def compute_flip_for_year(election_results, loser, votes_to_win, cache=None, frontiers=None, linked_districts=False,
+                          solver='dp', epsilon=0.01):
+    """Compute dynamic-programming table to flip enough states to give loser >= votes_to_win.
+
+    cache: optional FlipCache; the solution is looked up by the year's content and
+        stored there after a miss
+    frontiers: optional dict of FlipFrontier keyed by (year, loser), or
+        (year, loser, 'linked') for linked_districts; reused when present and
+        filled when the DP has to run
+    linked_districts: solve with district units linked to their state (FlipFrontier)
+    solver: 'dp' (default), 'bnb' or 'fptas' with `epsilon` (see solve_flip; frontiers
+        are only used by 'dp', and linked_districts is only supported there)
+
+    Returns:
+        flipped_states (list[str]): states to flip
+        min_votes_to_flip (int): minimal popular votes to flip across selected states
+        best_v (int): electoral votes flipped
+        winner_states_dict (dict): per-state data used in DP
+    """
+    if solver != 'dp' and linked_districts:
+        raise ValueError(f'linked_districts is only supported by the dp solver, not {solver!r}')
+    key = None
+    if cache is not None:
+        cost_model = LINKED_COST_MODEL if linked_districts else COST_MODEL
+        if solver != 'dp':
+            # approximate solutions must never be served to exact callers (or vice versa)
+            cost_model += f'+{solver}' + (f'@{epsilon}' if solver == 'fptas' else '')
+        key = cache.make_key(election_results, loser, votes_to_win, cost_model)
+        solution = cache.get(key)
+        if solution is not None:
+            instrumentation.count('flip_cache_hits')
+            return solution
+        instrumentation.count('flip_cache_misses')
+
+    if solver != 'dp':
+        solution = solve_flip(election_results, loser, votes_to_win, solver=solver, epsilon=epsilon).as_tuple()
+        if cache is not None:
+            cache.put(key, solution)
+        return solution
+
+    if frontiers is None:
+        frontier = FlipFrontier(election_results, loser, linked_districts)
+    else:
+        frontier_key = (as_year_slice(election_results).year, loser)
+        if linked_districts:
+            frontier_key += ('linked',)
+        if frontier_key not in frontiers:
+            frontiers[frontier_key] = FlipFrontier(election_results, loser, linked_districts)
+        frontier = frontiers[frontier_key]
+
+    solution = frontier.solve(votes_to_win)
+    if cache is not None:
+        cache.put(key, solution)
+    return solution
+
+
+# Solvers for a single EV target: exact DP (FlipFrontier), exact branch-and-bound, (1 + epsilon) FPTAS
+SOLVERS = ('dp', 'bnb', 'fptas')
+
+
+class FlipSolution:
+    """One solver's answer for an EV target, with a proven lower bound on the optimum.
+
+    gap = min_votes_to_flip / lower_bound - 1 is the largest possible relative
+    excess over the optimal flip: 0 for the DP and for a finished branch and
+    bound, at most epsilon for the FPTAS.
+    """
+
+    def __init__(self, flipped_states, min_votes_to_flip, best_v, winner_states_dict, solver, lower_bound, nodes=0):
+        self.flipped_states = flipped_states
+        self.min_votes_to_flip = min_votes_to_flip
+        self.best_v = best_v
+        self.winner_states_dict = winner_states_dict
+        self.solver = solver
+        self.lower_bound = lower_bound
+        self.nodes = nodes
+
+    @property
+    def gap(self):
+        if self.min_votes_to_flip <= 0 or self.lower_bound <= 0:
+            return 0.0
+        return max(self.min_votes_to_flip / self.lower_bound - 1, 0.0)
+
+    def as_tuple(self):
+        """Same return value as compute_flip_for_year."""
+        return list(self.flipped_states), self.min_votes_to_flip, self.best_v, self.winner_states_dict
+
+
+def _lp_cover_bound(ev_weights, flip_costs, votes_to_win):
+    """LP relaxation of the min-cost cover (items in votes-per-EV order): the cheapest
+    fractional way to reach votes_to_win, a lower bound on every integer flip."""
+    cum_ev = np.concatenate([[0], np.cumsum(ev_weights)])
+    cum_cost = np.concatenate([[0], np.cumsum(flip_costs)])
+    if votes_to_win > cum_ev[-1]:
+        return float('inf')
+    k = int(np.searchsorted(cum_ev, votes_to_win))  # items 0..k-2 in full, a fraction of item k-1
+    if k == 0:
+        return 0.0
+    return float(cum_cost[k - 1] + (votes_to_win - cum_ev[k - 1]) * flip_costs[k - 1] / ev_weights[k - 1])
+
+
+def _branch_and_bound(ev_weights, flip_costs, votes_to_win, max_nodes):
+    """Exact min-cost cover by depth-first branch and bound.
+
+    Items must be in votes-per-EV order. The incumbent is seeded with the greedy
+    cover of that order, 'take' is explored before 'skip', and a node is pruned
+    when its cost plus the LP bound of the remaining items cannot beat the
+    incumbent. Stops after max_nodes nodes; returns (taken item indices, nodes,
+    finished).
+    """
+    n = len(ev_weights)
+    cum_ev = np.concatenate([[0], np.cumsum(ev_weights)]).tolist()
+    cum_cost = np.concatenate([[0], np.cumsum(flip_costs)]).tolist()
+    weights = ev_weights.tolist()
+    costs = flip_costs.tolist()
+
+    def lp_bound(i, need):
+        # fractional cover of `need` EVs from items i.. (prefix sums keep this O(log n))
+        if need <= 0:
+            return 0.0
+        target = cum_ev[i] + need
+        if target > cum_ev[n]:
+            return float('inf')
+        k = bisect.bisect_left(cum_ev, target)
+        return cum_cost[k - 1] - cum_cost[i] + (target - cum_ev[k - 1]) * costs[k - 1] / weights[k - 1]
+
+    greedy = bisect.bisect_left(cum_ev, votes_to_win)
+    best_cost = cum_cost[greedy]
+    best_items = list(range(greedy))
+    nodes = 0
+    stack = [(0, votes_to_win, 0, ())]
+    while stack:
+        i, need, cost, taken = stack.pop()
+        nodes += 1
+        if nodes > max_nodes:
+            return best_items, nodes, False
+        if need <= 0:
+            if cost < best_cost:
+                best_cost, best_items = cost, list(taken)
+            continue
+        if i == n or cost + lp_bound(i, need) >= best_cost:
+            continue
+        # pushed last so 'take' is explored first
+        stack.append((i + 1, need, cost, taken))
+        stack.append((i + 1, need - weights[i], cost + costs[i], taken + (i,)))
+    return best_items, nodes, True
+
+
+def _fptas(ev_weights, flip_costs, votes_to_win, epsilon, lower_bound):
+    """(1 + epsilon)-approximate min-cost cover by DP over scaled costs.
+
+    Costs are divided by K = epsilon * lower_bound / n and floored, so any set
+    loses less than n * K <= epsilon * OPT; best_ev[c] is the most EVs reachable
+    with scaled cost c (one slice operation per item). The table only spans the
+    scaled cost of the greedy cover, i.e. n * greedy / (epsilon * lower_bound)
+    cells. Returns the taken item indices.
+    """
+    n = len(ev_weights)
+    scale = epsilon * lower_bound / n
+    cum_ev = np.cumsum(ev_weights)
+    greedy_cost = int(np.cumsum(flip_costs)[int(np.searchsorted(cum_ev, votes_to_win))])
+    scaled = (flip_costs // scale).astype(np.int64) if scale >= 1 else flip_costs.copy()
+    n_cost = int(greedy_cost // scale if scale >= 1 else greedy_cost) + 1
+    best_ev = np.full(n_cost, -1, dtype=np.int64)
+    best_ev[0] = 0
+    take_bits = []
+    for ev, cost in zip(ev_weights.tolist(), scaled.tolist()):
+        if cost >= n_cost:
+            # dearer than the whole greedy cover on its own
+            take_bits.append(np.zeros((n_cost + 7) // 8, dtype=np.uint8))
+            continue
+        prev = best_ev[:n_cost - cost]
+        candidate = np.where(prev >= 0, prev + ev, -1)
+        improved = candidate > best_ev[cost:]
+        took = np.zeros(n_cost, dtype=bool)
+        took[cost:] = improved
+        best_ev[cost:] = np.where(improved, candidate, best_ev[cost:])
+        take_bits.append(np.packbits(took))
+
+    c = int(np.flatnonzero(best_ev >= votes_to_win)[0])
+    items = []
+    for i in range(n - 1, -1, -1):
+        if (take_bits[i][c // 8] >> (7 - c % 8)) & 1:
+            items.append(i)
+            c -= int(scaled[i])
+    return items
+
+
+def solve_flip(election_results, loser, votes_to_win, solver='dp', epsilon=0.01, max_nodes=1_000_000):
+    """Minimal flip for one EV target with a selectable solver.
+
+    solver: 'dp' (exact knapsack over the full EV range, FlipFrontier),
+        'bnb' (exact branch and bound seeded by the votes-per-EV greedy order;
+        returns the incumbent and its gap if max_nodes is exhausted) or
+        'fptas' (within a factor 1 + epsilon of the optimum)
+    Returns a FlipSolution; its gap is measured against the larger of the LP
+    bound and (for the FPTAS) cost / (1 + epsilon).
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f'unknown solver {solver!r}; expected one of {", ".join(SOLVERS)}')
+    if solver == 'fptas' and not epsilon > 0:
+        raise ValueError(f'epsilon must be positive, got {epsilon!r}')
+    if solver == 'dp':
+        frontier = FlipFrontier(election_results, loser)
+        flipped_states, min_votes_to_flip, best_v, winner_states_dict = frontier.solve(votes_to_win)
+        return FlipSolution(flipped_states, min_votes_to_flip, best_v, winner_states_dict, solver,
+                            max(frontier.optimal_cost(votes_to_win), 0))
+
+    winner_states_dict = _flip_candidates(election_results, loser)
+    states = list(winner_states_dict.keys())
+    ev_weights = np.array([int(d['electoral_votes']) for d in winner_states_dict.values()], dtype=np.int64)
+    flip_costs = np.array([int(d['votes_to_flip']) for d in winner_states_dict.values()], dtype=np.int64)
+    lower_bound = _lp_cover_bound(ev_weights, flip_costs, votes_to_win)
+    if votes_to_win <= 0 or lower_bound == float('inf'):
+        # nothing to flip, or the target is out of reach (the DP reports no states either)
+        return FlipSolution([], 0, 0, winner_states_dict, solver, 0)
+
+    nodes = 0
+    if solver == 'bnb':
+        items, nodes, finished = _branch_and_bound(ev_weights, flip_costs, int(votes_to_win), max_nodes)
+        instrumentation.count('bnb_nodes', nodes)
+    else:
+        items = _fptas(ev_weights, flip_costs, int(votes_to_win), epsilon, lower_bound)
+    flipped_states = [states[i] for i in items]
+    min_votes_to_flip = int(flip_costs[items].sum())
+    best_v = int(ev_weights[items].sum())
+    if solver == 'bnb' and finished:
+        lower_bound = min_votes_to_flip
+    elif solver == 'fptas':
+        lower_bound = max(lower_bound, min_votes_to_flip / (1 + epsilon))
+    return FlipSolution(flipped_states, min_votes_to_flip, best_v, winner_states_dict, solver, lower_bound, nodes)
+
+
+def _top_k_knapsack(ev_weights, flip_costs, max_electoral_votes, k):
+    """K-best 0/1 knapsack with an exact per-state backtracking table.
+
+    dp[v, r] is the r-th cheapest cost of a subset of the states seen so far
+    that moves exactly v electoral votes. After each state the skip and take
+    candidates are merged and the k smallest kept, all as array operations.
+
+    Returns the final dp plus, per state, a bit-packed take/skip table over the
+    EV axis and (for k > 1) the rank of the entry each cell was built from.
+    """
+    n_ev = max_electoral_votes + 1
+    dp = np.full((n_ev, k), DP_INF, dtype=np.int64)
+    dp[0, 0] = 0
+    take_bits = []
+    source_rank = []
+
+    for ev, vt in zip(ev_weights, flip_costs):
+        take = np.full((n_ev, k), DP_INF, dtype=np.int64)
+        prev = dp[:n_ev - ev]
+        take[ev:] = np.where(prev < DP_INF, prev + vt, DP_INF)
+
+        merged = np.concatenate([dp, take], axis=1)
+        order = np.argsort(merged, axis=1, kind='stable')[:, :k]
+        dp = np.take_along_axis(merged, order, axis=1)
+
+        take_bits.append(np.packbits(order >= k, axis=0))
+        if k > 1:
+            source_rank.append((order % k).astype(np.uint8))
+
+    return dp, take_bits, source_rank
+
+
+def compute_top_flip_sets(election_results, loser, votes_to_win, k=5):
+    """Find the k cheapest distinct sets of states that give loser >= votes_to_win.
+
+    Unlike compute_flip_for_year this keeps an exact (states x EV) choice table,
+    so every returned set is reconstructed precisely and all k come from a
+    single DP pass.
+
+    Returns:
+        solutions (list[tuple]): (flipped_states, votes_to_flip, electoral_votes_flipped),
+            cheapest first
+        winner_states_dict (dict): per-state data used in DP
+    """
+    if not 1 <= k <= 255:
+        raise ValueError(f'k must be between 1 and 255, got {k}')
+
+    winner_states_dict = _flip_candidates(election_results, loser)
+    states = list(winner_states_dict.keys())
+    ev_weights = np.array([int(d['electoral_votes']) for d in winner_states_dict.values()], dtype=np.int64)
+    flip_costs = np.array([int(d['votes_to_flip']) for d in winner_states_dict.values()], dtype=np.int64)
+
+    max_electoral_votes = int(ev_weights.sum())
+    dp, take_bits, source_rank = _top_k_knapsack(ev_weights, flip_costs, max_electoral_votes, k)
+
+    start = max(int(votes_to_win), 0)
+    if start > max_electoral_votes:
+        return [], winner_states_dict
+
+    # Rank every (EV total, rank) cell that reaches the target; ties go to fewer EVs
+    costs = dp[start:].ravel()
+    finite = np.flatnonzero(costs < DP_INF)
+    chosen = finite[np.argsort(costs[finite], kind='stable')][:k]
+
+    solutions = []
+    for flat in chosen:
+        v_current, rank = start + int(flat) // k, int(flat) % k
+        best_v = v_current
+        flipped_states = []
+        for i in range(len(states) - 1, -1, -1):
+            took = (take_bits[i][v_current // 8, rank] >> (7 - v_current % 8)) & 1
+            next_rank = int(source_rank[i][v_current, rank]) if k > 1 else 0
+            if took:
+                flipped_states.append(states[i])
+                v_current -= int(ev_weights[i])
+            rank = next_rank
+        min_votes_to_flip = sum(winner_states_dict[s]['votes_to_flip'] for s in flipped_states)
+        solutions.append((flipped_states, min_votes_to_flip, best_v))
+
+    return solutions, winner_states_dict
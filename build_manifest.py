@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+
+# Bump when the manifest layout changes so old manifests are ignored.
+MANIFEST_VERSION = 2
+MANIFEST_NAME = '.build_manifest.json'
+
+# Source files whose code shapes each stage's outputs; editing one invalidates that stage.
+STAGE_SOURCES = {
+    'compute': ['analysis.py', 'election_dataset.py', 'election_loader.py', 'flip_cache.py', 'flexible_vote_margins.py',
+                'reporting.py', 'instrumentation.py'],
+    'plots': ['plotting.py'],
+    'sort': ['tools/sort_flip_results.py'],
+    'metrics': ['election_metrics.py', 'analysis.py', 'election_dataset.py', 'election_loader.py', 'flip_cache.py', 'swing.py',
+                'instrumentation.py'],
+}
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def source_digest(*stages):
+    """Hash of the source files behind the given stages."""
+    h = hashlib.sha256()
+    for stage in stages:
+        for rel_path in STAGE_SOURCES[stage]:
+            h.update(rel_path.encode('utf-8') + b'\0')
+            with open(os.path.join(_ROOT, rel_path), 'rb') as f:
+                h.update(f.read())
+    return h.hexdigest()
+
+
+def _file_stamp(path):
+    """[size, mtime_ns] of a file, or None when it is missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def year_digests(dataset, years=None):
+    """{year: hash of that year's input rows (every stored column)}."""
+    columns = dataset.base_columns()
+    digests = {}
+    for year_data in dataset.iter_years():
+        if years is not None and year_data.year not in years:
+            continue
+        h = hashlib.sha256()
+        for col in sorted(columns):
+            h.update(f'{col}:'.encode('utf-8'))
+            h.update('\x1f'.join(map(str, year_data[col].tolist())).encode('utf-8'))
+            h.update(b'\n')
+        digests[year_data.year] = h.hexdigest()
+    return digests
+
+
+def artifact_key(*parts):
+    """Hash of everything an artifact was built from (code digests, config, year digests)."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+class BuildManifest:
+    """Record of what the last builds under an output root were made from.
+
+    Per year it keeps the input digest, the compute code digest and the
+    per-mode year results (the output of compute_year_flip_results), so an
+    unchanged year is restored instead of recomputed. Per artifact (a group of
+    output files such as a mode's reports or plots) it keeps the key it was
+    built from and the files written (with their size and mtime), so an
+    artifact whose key is unchanged and whose files are still the ones it
+    wrote is skipped. Artifact names carry the year range; ranges whose files
+    share names (e.g. the plots) notice when another range overwrote them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.years = {}
+        self.artifacts = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == MANIFEST_VERSION:
+            self.years = data.get('years', {})
+            self.artifacts = data.get('artifacts', {})
+
+    @classmethod
+    def for_output_root(cls, output_root=None):
+        return cls(os.path.join(output_root or '', MANIFEST_NAME))
+
+    def year_results(self, year, digest, code, modes):
+        """Stored year results for all `modes`, or None when the year's input or code changed."""
+        entry = self.years.get(str(year))
+        if not entry or entry['digest'] != digest or entry['code'] != code:
+            return None
+        if not all(m in entry['modes'] for m in modes):
+            return None
+        return {m: entry['modes'][m] for m in modes}
+
+    def store_year_results(self, year, digest, code, year_results):
+        entry = self.years.get(str(year))
+        if not entry or entry['digest'] != digest or entry['code'] != code:
+            entry = {'digest': digest, 'code': code, 'modes': {}}
+            self.years[str(year)] = entry
+        # round-trip through JSON now so fresh and restored results are identical
+        entry['modes'].update(json.loads(json.dumps(year_results, default=_json_default)))
+        return {m: entry['modes'][m] for m in year_results}
+
+    def is_fresh(self, artifact, key):
+        entry = self.artifacts.get(artifact)
+        if not entry or entry['key'] != key:
+            return False
+        return all(_file_stamp(path) == stamp for path, stamp in entry['outputs'].items())
+
+    def mark_built(self, artifact, key, outputs):
+        self.artifacts[artifact] = {'key': key, 'outputs': {p: _file_stamp(p) for p in outputs if p}}
+
+    def save(self):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'years': self.years, 'artifacts': self.artifacts}, f,
+                      default=_json_default)
+        os.replace(tmp_path, self.path)
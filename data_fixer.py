@@ -6,11 +6,16 @@ Usage:
 
 It applies explicit corrections from `corrections.json` (list of corrections keyed by year and state or state_po),
 then recomputes winner/runner-up and D_electoral/R_electoral/T_electoral from vote totals.
+
+Rows are streamed in two passes over the input (per-year electoral totals first, then the
+fixed rows), so memory does not grow with the input size; corrections are looked up by
+(year, state) / (year, state_po) instead of being scanned for every row.
 """
 import csv
 import json
 import argparse
-from typing import Dict, Any
+import os
+from typing import Dict, Any, List
 
 
 def parse_int(s: str) -> int:
@@ -39,6 +44,64 @@ def match_correction(corr: Dict[str, Any], row: Dict[str, str]) -> bool:
     return True
 
 
+# Row fields the correction index is keyed on
+KEY_FIELDS = ("year", "state", "state_po")
+
+
+class CorrectionIndex:
+    """Corrections indexed by (year, STATE) and (year, STATE_PO).
+
+    A correction with a year and a state or state_po is filed under one of those
+    keys; the rest (no year, or neither state key) are checked against every row.
+    match_correction still confirms each candidate, so a correction giving both
+    state and state_po must match both, exactly as with a linear scan.
+    """
+
+    def __init__(self, corrections: List[Dict[str, Any]]):
+        self.corrections = corrections
+        self._index: Dict[tuple, List[int]] = {}
+        self._unindexed: List[int] = []
+        for i, corr in enumerate(corrections):
+            field = "state" if "state" in corr else "state_po" if "state_po" in corr else None
+            if "year" in corr and field:
+                self._index.setdefault((field, str(corr["year"]), corr[field].upper()), []).append(i)
+            else:
+                self._unindexed.append(i)
+
+    def candidates(self, row: Dict[str, str]) -> List[int]:
+        """Positions of the corrections that may apply to row, in file order."""
+        year = row.get("year")
+        found = (self._index.get(("state", year, (row.get("state") or "").upper()), [])
+                 + self._index.get(("state_po", year, (row.get("state_po") or "").upper()), []))
+        if self._unindexed:
+            found = found + self._unindexed
+        return sorted(found)
+
+    def apply(self, row: Dict[str, str]) -> List[int]:
+        """Apply every matching correction in file order; returns the positions applied."""
+        applied = []
+        candidates = self.candidates(row)
+        pos = 0
+        while pos < len(candidates):
+            i = candidates[pos]
+            pos += 1
+            corr = self.corrections[i]
+            if not match_correction(corr, row):
+                continue
+            changes = corr.get("changes", {})
+            apply_changes(row, changes)
+            applied.append(i)
+            if any(k in changes for k in KEY_FIELDS):
+                # the row's keys changed: later corrections are matched against the new values
+                candidates = [j for j in self.candidates(row) if j > i]
+                pos = 0
+        return applied
+
+
+def describe_correction(corr: Dict[str, Any]) -> str:
+    return " ".join(str(corr[k]) for k in KEY_FIELDS if k in corr) or "(no keys)"
+
+
 def apply_changes(row: Dict[str, str], changes: Dict[str, Any]):
     for k, v in changes.items():
         # write values as strings to keep CSV consistent
@@ -85,55 +148,50 @@ def recompute_electorals(row: Dict[str, str]):
     row["loser_votes"] = str(others_sorted[0][1] if others_sorted else 0)
 
 
-def main():
+def fixed_rows(path: str, index: CorrectionIndex):
+    """Stream (row, applied correction positions) with corrections applied and electorals recomputed."""
+    with open(path, newline="", encoding="utf-8") as fh:
+        for row in csv.DictReader(fh):
+            applied = index.apply(row)
+            # after explicit corrections, recompute electorals and winners from votes
+            recompute_electorals(row)
+            yield row, applied
+
+
+def main(argv=None):
     p = argparse.ArgumentParser()
     p.add_argument("--infile", default="1900_2024_election_results.csv")
     p.add_argument("--out", default="1900_2024_election_results.fixed.csv")
     p.add_argument("--corrections", default="corrections.json")
     p.add_argument("--inplace", action="store_true", help="overwrite infile")
     p.add_argument("--dry-run", action="store_true", help="print affected rows and exit")
-    args = p.parse_args()
+    p.add_argument("--hits", default=None, help="write every correction's matched row count to this JSON file")
+    args = p.parse_args(argv)
 
     corrections = load_corrections(args.corrections)
+    index = CorrectionIndex(corrections)
 
     with open(args.infile, newline="", encoding="utf-8") as fh:
-        reader = csv.DictReader(fh)
-        rows = list(reader)
-        fieldnames = reader.fieldnames
+        fieldnames = csv.DictReader(fh).fieldnames
 
     if not fieldnames:
         print("No headers found in CSV")
         return
 
+    # Pass 1: apply corrections and compute per-year national electoral totals by party_win
     modified_count = 0
     affected = []
-
-    for row in rows:
-        matched = False
-        for corr in corrections:
-            if match_correction(corr, row):
-                changes = corr.get("changes", {})
-                apply_changes(row, changes)
-                matched = True
-        # after explicit corrections, recompute electorals and winners from votes
-        recompute_electorals(row)
-        if matched:
-            modified_count += 1
-            affected.append((row.get("year"), row.get("state"), row.get("state_po")))
-
-    if args.dry_run:
-        print(f"Would modify {modified_count} rows")
-        for y, s, sp in affected:
-            print(y, s, sp)
-        return
-
-    outpath = args.out
-    if args.inplace:
-        outpath = args.infile
-
-    # Compute per-year national electoral totals by party_win (for reporting)
+    hits = [0] * len(corrections)
     year_party_totals = {}
-    for row in rows:
+    for row, applied in fixed_rows(args.infile, index):
+        for i in applied:
+            hits[i] += 1
+        if applied:
+            modified_count += 1
+            if args.dry_run:
+                affected.append((row.get("year"), row.get("state"), row.get("state_po")))
+        if args.dry_run:
+            continue
         year = row.get("year")
         party = (row.get("party_win") or "").strip().upper()
         ev = parse_int(row.get("electoral_votes", "0"))
@@ -143,52 +201,69 @@ def main():
             ytot[party] += ev
         else:
             raise ValueError(f"Unexpected party_win '{party}' in year {year}")
-            # if unknown party_win, fall back to highest vote
-            Dv = parse_int(row.get("D_votes", "0"))
-            Rv = parse_int(row.get("R_votes", "0"))
-            Tv = parse_int(row.get("T_votes", "0"))
-            winner = max((("D", Dv), ("R", Rv), ("T", Tv)), key=lambda x: x[1])[0]
-            ytot[winner] += ev
-
-    # Assign per-row state-level electoral allocations: each state's EV goes to its winner (party_win)
-    for row in rows:
-        year = row.get("year")
-        # set D_electoral, R_electoral, T_electoral from year_party_totals
-        row["D_electoral"] = str(year_party_totals[year]["D"])
-        row["R_electoral"] = str(year_party_totals[year]["R"])
-        row["T_electoral"] = str(year_party_totals[year]["T"])
-        overall_winner = 'D' if year_party_totals[year]['D'] > year_party_totals[year]['R'] else 'R'
-        # get runner up as 2nd highest of D, R, T
-        parties = ['D', 'R', 'T']
-        runner_up = sorted(parties, key=lambda p: year_party_totals[year][p], reverse=True)[1]
-        row["overall_winner"] = overall_winner
-        row["overall_runner_up"] = runner_up
-        # check if winner_state (party_win matches overall_winner)
-        if row.get("party_win") == overall_winner:
-            row["winner_state"] = "True"
-        else:
-            row["winner_state"] = "False"
-        if year == '1960':
-            row["T_name"] = "Harry F. Byrd"
 
-    with open(outpath, "w", newline="", encoding="utf-8") as fh:
-        writer = csv.DictWriter(fh, fieldnames=fieldnames)
-        writer.writeheader()
-        for row in rows:
-            writer.writerow(row)
+    if args.hits:
+        with open(args.hits, "w", encoding="utf-8") as fh:
+            json.dump([{"correction": i, **{k: corr[k] for k in KEY_FIELDS if k in corr}, "hits": n}
+                       for i, (corr, n) in enumerate(zip(corrections, hits))], fh, indent=2)
 
-    # Post-write: verify per-year D/R/T electoral totals
-    totals_by_year = {}
-    for row in rows:
-        year = row.get("year")
-        totals = totals_by_year.setdefault(year, {"D": 0, "R": 0, "T": 0, "total": 0})
-        ev = parse_int(row.get("electoral_votes", "0"))
-        totals["D"] += parse_int(row.get("D_electoral", "0"))
-        totals["R"] += parse_int(row.get("R_electoral", "0"))
-        totals["T"] += parse_int(row.get("T_electoral", "0"))
-        totals["total"] += ev
+    if args.dry_run:
+        print(f"Would modify {modified_count} rows")
+        for y, s, sp in affected:
+            print(y, s, sp)
+        print_hit_summary(corrections, hits)
+        return
+
+    outpath = args.out
+    if args.inplace:
+        outpath = args.infile
 
-    print(f"Wrote {len(rows)} rows to {outpath}. Applied corrections to {modified_count} rows.")
+    # Pass 2: stream the fixed rows to a temporary file next to the output (the input is
+    # still being read, and may be the output itself), assigning each year's totals
+    tmp_path = outpath + ".tmp"
+    totals_by_year = {}
+    n_rows = 0
+    try:
+        with open(tmp_path, "w", newline="", encoding="utf-8") as out:
+            writer = csv.DictWriter(out, fieldnames=fieldnames)
+            writer.writeheader()
+            for row, _ in fixed_rows(args.infile, index):
+                year = row.get("year")
+                # Assign per-row state-level electoral allocations: each state's EV goes to its winner (party_win)
+                # set D_electoral, R_electoral, T_electoral from year_party_totals
+                row["D_electoral"] = str(year_party_totals[year]["D"])
+                row["R_electoral"] = str(year_party_totals[year]["R"])
+                row["T_electoral"] = str(year_party_totals[year]["T"])
+                overall_winner = 'D' if year_party_totals[year]['D'] > year_party_totals[year]['R'] else 'R'
+                # get runner up as 2nd highest of D, R, T
+                parties = ['D', 'R', 'T']
+                runner_up = sorted(parties, key=lambda p: year_party_totals[year][p], reverse=True)[1]
+                row["overall_winner"] = overall_winner
+                row["overall_runner_up"] = runner_up
+                # check if winner_state (party_win matches overall_winner)
+                if row.get("party_win") == overall_winner:
+                    row["winner_state"] = "True"
+                else:
+                    row["winner_state"] = "False"
+                if year == '1960':
+                    row["T_name"] = "Harry F. Byrd"
+                writer.writerow(row)
+                n_rows += 1
+
+                # verify per-year D/R/T electoral totals as written
+                totals = totals_by_year.setdefault(year, {"D": 0, "R": 0, "T": 0, "total": 0})
+                totals["D"] += parse_int(row.get("D_electoral", "0"))
+                totals["R"] += parse_int(row.get("R_electoral", "0"))
+                totals["T"] += parse_int(row.get("T_electoral", "0"))
+                totals["total"] += parse_int(row.get("electoral_votes", "0"))
+        os.replace(tmp_path, outpath)
+    finally:
+        # nothing is left behind when the write fails (after os.replace the temp file is gone)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    print(f"Wrote {n_rows} rows to {outpath}. Applied corrections to {modified_count} rows.")
+    print_hit_summary(corrections, hits)
     # Print summary lines for each year where sums don't match
     bad_years = []
     for year, t in sorted(totals_by_year.items()):
@@ -205,5 +280,14 @@ def main():
         print("All years: allocated electoral votes match expected totals.")
 
 
+def print_hit_summary(corrections: List[Dict[str, Any]], hits: List[int]):
+    """Print how many corrections matched, and every correction that matched no row (usually a typo in its keys)."""
+    matched = sum(1 for n in hits if n)
+    print(f"{matched} of {len(corrections)} corrections matched {sum(hits)} rows.")
+    for corr, n in zip(corrections, hits):
+        if not n:
+            print(f"  unmatched correction: {describe_correction(corr)}")
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,260 @@
+import numpy as np
+import pandas as pd
+
+
+PARTIES = ('D', 'R', 'T')
+PARTY_CODES = {p: i for i, p in enumerate(PARTIES)}
+
+# Columns stored as int64 arrays (missing values become 0)
+INT_COLUMNS = [
+    'year', 'D_votes', 'R_votes', 'T_votes', 'electoral_votes', 'winner_votes', 'loser_votes',
+    'votes_to_flip', 'total_electoral_votes', 'electoral_votes_to_win',
+    'D_electoral', 'R_electoral', 'T_electoral', 'totalvotes',
+]
+# Columns stored as str arrays (missing values become '')
+STR_COLUMNS = ['state', 'state_po', 'D_name', 'R_name', 'T_name']
+# Party columns stored both as str and as int8 codes into PARTIES (-1 when not D/R/T)
+PARTY_COLUMNS = ['party_win', 'overall_winner', 'overall_runner_up']
+
+
+def party_codes(values):
+    """Map an array of party strings to int8 codes into PARTIES (-1 for anything else)."""
+    values = np.asarray(values, dtype=object)
+    codes = np.full(len(values), -1, dtype=np.int8)
+    for party, code in PARTY_CODES.items():
+        codes[values == party] = code
+    return codes
+
+
+class YearTally:
+    """Electoral tally for one year: each state's EVs credited once to its winner.
+
+    ev_totals: EVs per party code ('D', 'R', 'T')
+    names: candidate name per party code (first non-empty name among that party's
+        winning rows, else the first non-empty name in the party's name column)
+    ev_by_candidate: [(name, ev)] grouped by the winning row's candidate name,
+        in order of first appearance (name variants in the data stay separate)
+    """
+
+    def __init__(self, ev_totals, names, ev_by_candidate):
+        self.ev_totals = ev_totals
+        self.names = names
+        self.ev_by_candidate = ev_by_candidate
+
+    def other_parties(self):
+        """{code: (name, ev)} for every party that won electoral votes."""
+        return {code: (self.names[code], ev) for code, ev in self.ev_totals.items() if ev > 0}
+
+
+def compute_year_tallies(dataset):
+    """Compute YearTally for every year with grouped array aggregations over the whole dataset."""
+    n_years = len(dataset.years)
+    n_parties = len(PARTIES)
+    counts = [dataset.offsets[int(y)][1] - dataset.offsets[int(y)][0] for y in dataset.years]
+    year_idx = np.repeat(np.arange(n_years), counts)
+    code = dataset.columns['state_winner_code'].astype(np.int64)
+    ev = dataset.columns['electoral_votes']
+    party_names = [dataset.columns[f'{p}_name'] for p in PARTIES]
+    # the winning candidate's name on each row
+    row_name = np.choose(code, party_names)
+
+    keys = year_idx * n_parties + code
+    won = ev > 0
+    ev_totals = np.bincount(keys[won], weights=ev[won], minlength=n_years * n_parties)
+    ev_totals = ev_totals.astype(np.int64).reshape(n_years, n_parties)
+
+    names = np.full(n_years * n_parties, '', dtype=object)
+    sel = won & (row_name != '')
+    uniq, first = np.unique(keys[sel], return_index=True)
+    names[uniq] = row_name[sel][first]
+    names = names.reshape(n_years, n_parties)
+    for p_idx, col in enumerate(party_names):
+        # fallback: the first non-empty name in the party's column for that year
+        missing = names[:, p_idx] == ''
+        sel = col != ''
+        uniq, first = np.unique(year_idx[sel], return_index=True)
+        fallback = np.full(n_years, '', dtype=object)
+        fallback[uniq] = col[sel][first]
+        names[missing, p_idx] = fallback[missing]
+
+    by_candidate = pd.DataFrame({'year_idx': year_idx, 'name': row_name, 'ev': ev})
+    by_candidate = by_candidate[row_name != ''].groupby(['year_idx', 'name'], sort=False)['ev'].sum()
+    candidates = [[] for _ in range(n_years)]
+    for (y_idx, name), total in by_candidate.items():
+        candidates[y_idx].append((name, int(total)))
+
+    tallies = {}
+    for y_idx, year in enumerate(dataset.years.tolist()):
+        tallies[year] = YearTally(
+            {p: int(ev_totals[y_idx, i]) for i, p in enumerate(PARTIES)},
+            {p: names[y_idx, i] for i, p in enumerate(PARTIES)},
+            candidates[y_idx],
+        )
+    return tallies
+
+
+class YearSlice:
+    """Read-only view of one year's rows inside an ElectionDataset.
+
+    Column access returns NumPy slices of the dataset's contiguous arrays, so
+    nothing is copied per year.
+    """
+
+    def __init__(self, dataset, year, start, stop):
+        self.dataset = dataset
+        self.year = year
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, col):
+        return self.dataset.columns[col][self.start:self.stop]
+
+    def __contains__(self, col):
+        return col in self.dataset.columns
+
+    @property
+    def columns(self):
+        return list(self.dataset.columns.keys())
+
+    def first(self, col):
+        """Value of a per-year column (repeated on every row) as a Python scalar."""
+        value = self.dataset.columns[col][self.start]
+        return value.item() if isinstance(value, np.generic) else value
+
+    def index_of(self, state):
+        """Position of `state` within this year's rows (O(1))."""
+        return self.dataset.row_index[(self.year, state)] - self.start
+
+    def frame(self):
+        """This year's rows as a DataFrame (copies; for pandas-only consumers)."""
+        return self.dataset.frame.iloc[self.dataset.source_rows[self.start:self.stop]]
+
+
+class ElectionDataset:
+    """Election results preloaded into contiguous per-column NumPy arrays.
+
+    Rows are ordered by year (stable, so the file order within a year is kept),
+    each year occupies a contiguous [start, stop) range, and a (year, state)
+    index gives O(1) row lookups. `frame` keeps the original DataFrame for
+    writers that copy the input data (see election_loader for the cached
+    load path, where it is read lazily).
+    """
+
+    def __init__(self, df):
+        order = np.argsort(df['year'].to_numpy(), kind='stable')
+
+        columns = {}
+        for col in INT_COLUMNS:
+            if col in df.columns:
+                values = pd.to_numeric(df[col], errors='coerce').fillna(0).to_numpy()
+                columns[col] = values.astype(np.int64)[order]
+        for col in STR_COLUMNS + PARTY_COLUMNS:
+            if col in df.columns:
+                values = df[col].fillna('').astype(str).str.strip().to_numpy(dtype=object)
+                columns[col] = values[order]
+        self._setup(columns, order, frame=df)
+
+    @classmethod
+    def from_columns(cls, columns, source_rows, frame_loader=None):
+        """Build from year-sorted base columns (INT_COLUMNS as int64, STR_COLUMNS and
+        PARTY_COLUMNS as str object arrays), e.g. as restored from a load cache.
+
+        frame_loader: optional callable returning the original DataFrame; it is only
+            called when `frame` is first used
+        """
+        dataset = cls.__new__(cls)
+        dataset._setup(dict(columns), source_rows, frame_loader=frame_loader)
+        return dataset
+
+    def _setup(self, columns, source_rows, frame=None, frame_loader=None):
+        self._frame = frame
+        self._frame_loader = frame_loader
+        self._tallies = None
+        self._swing_curves = None
+        self.source_rows = source_rows
+        self.columns = columns
+        n_rows = len(source_rows)
+
+        for col in PARTY_COLUMNS:
+            if col in self.columns:
+                self.columns[col + '_code'] = party_codes(self.columns[col])
+
+        # Resolved state winner: party_win when it is D/R/T, otherwise the highest of D/R/T votes
+        if 'party_win_code' in self.columns:
+            votes = np.stack([self.columns.get(f'{p}_votes', np.zeros(n_rows, dtype=np.int64)) for p in PARTIES], axis=1)
+            by_votes = np.argmax(votes, axis=1).astype(np.int8)
+            code = self.columns['party_win_code']
+            self.columns['state_winner_code'] = np.where(code >= 0, code, by_votes).astype(np.int8)
+
+        years = self.columns['year']
+        self.years = np.unique(years)
+        starts = np.searchsorted(years, self.years, side='left')
+        stops = np.searchsorted(years, self.years, side='right')
+        self.offsets = {int(y): (int(a), int(b)) for y, a, b in zip(self.years, starts, stops)}
+
+        self.row_index = {}
+        if 'state' in self.columns:
+            for i, (y, s) in enumerate(zip(years.tolist(), self.columns['state'].tolist())):
+                self.row_index[(y, s)] = i
+
+    @property
+    def frame(self):
+        """The original DataFrame (file row order), loaded on first use when built from a cache."""
+        if self._frame is None and self._frame_loader is not None:
+            self._frame = self._frame_loader()
+        return self._frame
+
+    def base_columns(self):
+        """The stored (non-derived) columns: everything from_columns needs to rebuild the dataset."""
+        return {col: values for col, values in self.columns.items()
+                if col in INT_COLUMNS or col in STR_COLUMNS or col in PARTY_COLUMNS}
+
+    @classmethod
+    def from_csv(cls, path, **read_csv_kwargs):
+        return cls(pd.read_csv(path, **read_csv_kwargs))
+
+    def __len__(self):
+        return len(self.columns['year'])
+
+    def tallies(self):
+        """Per-year YearTally for all years, computed on first use and then shared."""
+        if self._tallies is None:
+            self._tallies = compute_year_tallies(self)
+        return self._tallies
+
+    def swing_curves(self):
+        """Uniform-swing curves of all years (swing.SwingCurves), computed on first use and then shared."""
+        if self._swing_curves is None:
+            from swing import compute_swing_curves
+            self._swing_curves = compute_swing_curves(self)
+        return self._swing_curves
+
+    def year(self, year):
+        start, stop = self.offsets[int(year)]
+        return YearSlice(self, int(year), start, stop)
+
+    def iter_years(self, start_year=None, end_year=None):
+        for y in self.years.tolist():
+            if start_year is not None and y < start_year:
+                continue
+            if end_year is not None and y > end_year:
+                continue
+            yield self.year(y)
+
+
+def as_dataset(data):
+    """Accept an ElectionDataset or a DataFrame and return an ElectionDataset."""
+    if isinstance(data, ElectionDataset):
+        return data
+    return ElectionDataset(data)
+
+
+def as_year_slice(data):
+    """Accept a YearSlice or a single year's DataFrame and return a YearSlice."""
+    if isinstance(data, YearSlice):
+        return data
+    dataset = ElectionDataset(data)
+    return dataset.year(dataset.years[0])
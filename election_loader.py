@@ -0,0 +1,130 @@
+import functools
+import glob
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from election_dataset import INT_COLUMNS, PARTY_COLUMNS, STR_COLUMNS, ElectionDataset
+
+
+DEFAULT_CSV = '1900_2024_election_results.fixed.csv'
+
+# Bump when the cached column layout changes so stale cache files are ignored.
+LOADER_VERSION = 1
+
+# Columns every entry point relies on; a CSV without them is rejected up front.
+REQUIRED_COLUMNS = [
+    'year', 'state', 'party_win', 'D_votes', 'R_votes', 'T_votes', 'D_name', 'R_name', 'T_name',
+    'overall_winner', 'overall_runner_up', 'electoral_votes', 'totalvotes',
+    'total_electoral_votes', 'electoral_votes_to_win', 'D_electoral', 'R_electoral', 'T_electoral',
+]
+
+
+class SchemaError(ValueError):
+    """The election CSV does not have the columns or value types the pipeline expects."""
+
+
+def read_election_csv(csv_path):
+    """Parse the election CSV (lines starting with '/' are file path comments)."""
+    return pd.read_csv(csv_path, comment='/')
+
+
+def validate_schema(df, csv_path='<data>'):
+    """Raise SchemaError if required columns are missing or numeric columns hold non-numbers."""
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise SchemaError(f'{csv_path}: missing required columns: {", ".join(missing)}')
+    if df['year'].isna().any():
+        raise SchemaError(f'{csv_path}: rows without a year at lines {(np.flatnonzero(df["year"].isna()) + 2).tolist()[:5]}')
+    for col in INT_COLUMNS:
+        if col not in df.columns:
+            continue
+        numeric = pd.to_numeric(df[col], errors='coerce')
+        bad = numeric.isna() & df[col].notna()
+        if bad.any():
+            row = int(np.flatnonzero(bad.to_numpy())[0])
+            raise SchemaError(f'{csv_path}: column {col} has a non-numeric value {df[col].iloc[row]!r} at line {row + 2}')
+
+
+def csv_digest(csv_path):
+    """Hash of the CSV bytes (and the loader version) used to key the load cache."""
+    h = hashlib.sha256(f'v{LOADER_VERSION}\n'.encode('utf-8'))
+    with open(csv_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _cache_path(csv_path, cache_dir, digest):
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(cache_dir, f'{stem}-{digest[:16]}.npz')
+
+
+def _save_cache(dataset, path):
+    """Store the dataset's base columns: ints as int32 when they fit (else int64),
+    strings as categorical (categories, codes) pairs."""
+    arrays = {'source_rows': dataset.source_rows}
+    for col, values in dataset.base_columns().items():
+        if col in INT_COLUMNS:
+            fits = values.size == 0 or (values.min() >= np.iinfo(np.int32).min and values.max() <= np.iinfo(np.int32).max)
+            arrays[f'int:{col}'] = values.astype(np.int32) if fits else values
+        else:
+            categories, codes = np.unique(values.astype(str), return_inverse=True)
+            arrays[f'cat:{col}'] = categories
+            arrays[f'codes:{col}'] = codes.astype(np.int32)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def _load_cache(path, frame_loader):
+    with np.load(path, allow_pickle=False) as data:
+        columns = {}
+        for name in data.files:
+            kind, _, col = name.partition(':')
+            if kind == 'int':
+                columns[col] = data[name].astype(np.int64)
+            elif kind == 'cat':
+                columns[col] = data[name].astype(object)[data[f'codes:{col}']]
+        source_rows = data['source_rows']
+    return ElectionDataset.from_columns(columns, source_rows, frame_loader=frame_loader)
+
+
+def load_dataset(csv_path=DEFAULT_CSV, cache_dir='.load_cache', use_cache=True):
+    """Load the election CSV as an ElectionDataset through a binary column cache.
+
+    The first load parses and validates the CSV and stores the typed columns in
+    an .npz file keyed by the CSV's content hash; later loads of the same bytes
+    read that file instead. The original DataFrame is only parsed again if
+    something uses `dataset.frame`.
+    """
+    if not use_cache:
+        df = read_election_csv(csv_path)
+        validate_schema(df, csv_path)
+        return ElectionDataset(df)
+
+    frame_loader = functools.partial(read_election_csv, csv_path)
+    path = _cache_path(csv_path, cache_dir, csv_digest(csv_path))
+    if os.path.exists(path):
+        try:
+            return _load_cache(path, frame_loader)
+        except (OSError, ValueError, KeyError):
+            pass
+
+    df = read_election_csv(csv_path)
+    validate_schema(df, csv_path)
+    dataset = ElectionDataset(df)
+    # drop cache files of earlier versions of this CSV before writing the new one
+    for stale in glob.glob(_cache_path(csv_path, cache_dir, '*')):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    _save_cache(dataset, path)
+    return dataset
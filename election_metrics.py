@@ -1,96 +1,92 @@
 import os
 import math
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from plotting import make_plot, make_bar_plot
 
-from analysis import compute_flip_for_year
+import instrumentation
+from analysis import FlipFrontier, compute_flip_for_year
+from election_dataset import ElectionDataset, YearSlice, as_year_slice
+from election_loader import load_dataset
+from flip_cache import FlipCache
 
 
-plt.style.use('dark_background')
+def compute_state_metrics(dataset: ElectionDataset, years: Optional[List[int]] = None,
+                          recount_threshold: Union[float, Sequence[float]] = 0.005,
+                          brittleness_threshold: Union[float, Sequence[float]] = 0.02) -> Dict[int, Dict[str, Union[int, float, np.ndarray]]]:
+    """State-level metrics for many years in one column-wise pass over the dataset.
 
+    Computes every state's two-party total and margin once, then the per-year
+    two-party vote totals, the recount EV sum and the brittleness count with
+    masks and grouped reductions (rows of a year are contiguous, so groups
+    reduce with np.add.reduceat). The uniform swing sigma comes from the
+    dataset's cached swing curves.
 
-def _safe_int(x, default: int = 0) -> int:
-    try:
-        if pd.isna(x):
-            return default
-        return int(x)
-    except Exception:
-        try:
-            v = pd.to_numeric(x, errors='coerce')
-            return default if pd.isna(v) else int(v)
-        except Exception:
-            return default
-
-
-def _get_num(row: pd.Series, col: str) -> int:
-    try:
-        v = row[col]
-    except Exception:
-        return 0
-    try:
-        v = pd.to_numeric(v, errors='coerce')
-    except Exception:
-        v = np.nan
-    return 0 if pd.isna(v) else int(v)
-
-
-def _two_party_totals(df: pd.DataFrame) -> Tuple[int, int, int]:
-    D_total = pd.to_numeric(df['D_votes'], errors='coerce').fillna(0).astype(int).sum()
-    R_total = pd.to_numeric(df['R_votes'], errors='coerce').fillna(0).astype(int).sum()
-    S = D_total + R_total
-    return D_total, R_total, S
-
-
-def _state_two_party(row: pd.Series) -> int:
-    d = _get_num(row, 'D_votes')
-    r = _get_num(row, 'R_votes')
-    return int(d + r)
-
-
-def _state_margin_votes(row: pd.Series) -> int:
-    d = _get_num(row, 'D_votes')
-    r = _get_num(row, 'R_votes')
-    return abs(d - r)
-
-
-def _votes_to_flip_state(row: pd.Series) -> int:
-    # Minimum integer votes to change outcome under a symmetric shift assumption
-    margin = _state_margin_votes(row)
-    return margin // 2 + 1 if margin > 0 else 0
-
-
-def _uniform_swing_sigma(year_df: pd.DataFrame, loser: str, votes_needed_ev: int) -> float:
-    if votes_needed_ev <= 0:
-        return 0.0
-
-    # States the loser lost (i.e., states currently won by the other party)
-    lost_states = year_df[year_df['party_win'] != loser].copy()
-
-    # threshold to flip state i under a uniform two-party swing = f_i / (D_i + R_i)
-    thresholds: List[Tuple[float, int]] = []  # (threshold_i, electoral_votes)
-    for _, row in lost_states.iterrows():
-        two_party = _state_two_party(row)
-        if two_party <= 0:
-            continue
-        f_i = _votes_to_flip_state(row)
-        thr = f_i / two_party
-        ev = _get_num(row, 'electoral_votes')
-        thresholds.append((thr, ev))
-
-    thresholds.sort(key=lambda x: x[0])
+    years: years to compute (default: every year in the dataset)
+    recount_threshold / brittleness_threshold: a value, or a sequence of values to
+        evaluate at once; with a sequence the matching entry is an array over it
+    Returns {year: {'D_total', 'R_total', 'sigma', 'close_states_ev', 'brittleness'}}
+    """
+    if years is None:
+        years = dataset.years.tolist()
+    years = [int(y) for y in years]
+    if not years:
+        return {}
+    bounds = [dataset.offsets[y] for y in years]
+    counts = np.array([stop - start for start, stop in bounds])
+    rows = np.concatenate([np.arange(start, stop) for start, stop in bounds])
+    group_starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    first_rows = np.array([start for start, _ in bounds])
+    year_idx = np.repeat(np.arange(len(years)), counts)
+
+    cols = dataset.columns
+    D = cols['D_votes'][rows]
+    R = cols['R_votes'][rows]
+    ev = cols['electoral_votes'][rows]
+    party_win = cols['party_win'][rows]
+
+    # per-state two-party total and margin
+    two_party = D + R
+    margin = np.abs(D - R)
+    valid = two_party > 0
+    safe_two_party = np.where(valid, two_party, 1)
+    margin_share = np.where(valid, margin / safe_two_party, np.inf)
+
+    # per-year winner
+    winner = cols['overall_winner'][first_rows]
+
+    D_total = np.add.reduceat(D, group_starts)
+    R_total = np.add.reduceat(R, group_starts)
+
+    # Recount Vulnerability: EVs of states whose margin share is under each threshold
+    recount_thresholds = np.atleast_1d(np.asarray(recount_threshold, dtype=np.float64))
+    close = valid[:, None] & (margin_share[:, None] < recount_thresholds[None, :])
+    close_states_ev = np.add.reduceat(np.where(close, ev[:, None], 0), group_starts, axis=0)
+
+    # Coalition Brittleness: winner-won states with a margin share under each threshold
+    brittleness_thresholds = np.atleast_1d(np.asarray(brittleness_threshold, dtype=np.float64))
+    winner_won = valid & (party_win == winner[year_idx])
+    brittle = winner_won[:, None] & (margin_share[:, None] < brittleness_thresholds[None, :])
+    brittleness = np.add.reduceat(brittle.astype(np.int64), group_starts, axis=0)
+    if np.ndim(recount_threshold) == 0:
+        close_states_ev = close_states_ev[:, 0]
+    if np.ndim(brittleness_threshold) == 0:
+        brittleness = brittleness[:, 0]
+
+    # Uniform swing sigma: read off the dataset's cached swing curves (swing.py)
+    sigma = dataset.swing_curves().sigma(years)
 
-    acc_ev = 0
-    sigma = math.nan
-    for thr, ev in thresholds:
-        acc_ev += ev
-        if acc_ev >= votes_needed_ev:
-            sigma = thr
-            break
-    return float(sigma)
+    return {
+        year: {
+            'D_total': D_total[i],
+            'R_total': R_total[i],
+            'sigma': float(sigma[i]),
+            'close_states_ev': close_states_ev[i],
+            'brittleness': brittleness[i],
+        }
+        for i, year in enumerate(years)
+    }
 
 
 def _state_concentration_risk(flipped_states: List[str], winner_states_dict: Dict[str, Dict[str, int]], f: int) -> float:
@@ -106,35 +102,48 @@ def _state_concentration_risk(flipped_states: List[str], winner_states_dict: Dic
     return (f * f) / sum_sq
 
 
-from typing import Union
-
-def compute_year_metrics(year_df: pd.DataFrame, alpha: float = 0.5,
+def compute_year_metrics(year_data: Union[YearSlice, pd.DataFrame], alpha: float = 0.5,
                           recount_threshold: float = 0.005,
-                          brittleness_threshold: float = 0.02) -> Dict[str, Union[int, float, str]]:
-    year = int(year_df['year'].iloc[0])
+                          brittleness_threshold: float = 0.02,
+                          frontiers: Optional[Dict[Tuple[int, str], FlipFrontier]] = None,
+                          cache: Optional[FlipCache] = None,
+                          state_metrics: Optional[Dict[str, Union[int, float]]] = None,
+                          linked_districts: bool = False) -> Dict[str, Union[int, float, str]]:
+    """Metrics for one year. `state_metrics` is this year's entry from compute_state_metrics
+    (computed for all years at once by compute_metrics_for_all_years); it is computed here
+    when missing. `linked_districts` selects the linked district flip model for f."""
+    year_data = as_year_slice(year_data)
+    year = year_data.year
+    if state_metrics is None:
+        state_metrics = compute_state_metrics(year_data.dataset, [year], recount_threshold=recount_threshold,
+                                              brittleness_threshold=brittleness_threshold)[year]
 
     # Winner/loser parties for the year
-    winner_party = str(year_df['overall_winner'].iloc[0]).strip()
+    winner_party = year_data.first('overall_winner')
     loser_party = 'D' if winner_party == 'R' else 'R'
 
     # Two-party totals
-    D_total, R_total, S = _two_party_totals(year_df)
+    D_total = state_metrics['D_total']
+    R_total = state_metrics['R_total']
+    S = D_total + R_total
     m = abs(D_total - R_total) / S if S > 0 else float('nan')
 
     # Electoral tallies
-    total_ec = _safe_int(year_df['total_electoral_votes'].iloc[0])
-    ev_to_win = _safe_int(year_df['electoral_votes_to_win'].iloc[0])
+    total_ec = year_data.first('total_electoral_votes')
+    ev_to_win = year_data.first('electoral_votes_to_win')
 
-    D_ec = _safe_int(year_df['D_electoral'].iloc[0])
-    R_ec = _safe_int(year_df['R_electoral'].iloc[0])
+    D_ec = year_data.first('D_electoral')
+    R_ec = year_data.first('R_electoral')
 
     winner_ec = D_ec if winner_party == 'D' else R_ec
     loser_ec = R_ec if winner_party == 'D' else D_ec
 
     votes_needed_ev = max(ev_to_win - loser_ec, 0)
 
-    # Flip computation for f and flipped set
-    flipped_states, f, best_v, winner_states_dict = compute_flip_for_year(year_df, loser_party, votes_needed_ev)
+    # Flip computation for f and flipped set (reuses the year's frontier / cached solution when available)
+    flipped_states, f, best_v, winner_states_dict = compute_flip_for_year(year_data, loser_party, votes_needed_ev,
+                                                                          cache=cache, frontiers=frontiers,
+                                                                          linked_districts=linked_districts)
 
     # Derived shares
     winner_pop_two_party = D_total if winner_party == 'D' else R_total
@@ -156,7 +165,7 @@ def compute_year_metrics(year_df: pd.DataFrame, alpha: float = 0.5,
     electoral_college_safety = f_over_S
 
     R_concentration = _state_concentration_risk(flipped_states, winner_states_dict, f)
-    sigma = _uniform_swing_sigma(year_df, loser_party, votes_needed_ev)
+    sigma = state_metrics['sigma']
 
     # Vote Efficiency Gap
     if PV_share == 0.5:
@@ -169,27 +178,10 @@ def compute_year_metrics(year_df: pd.DataFrame, alpha: float = 0.5,
         eta = transform((EC_share - 0.5) / denom - 1 if denom != 0 else float('inf'))
 
     # Recount Vulnerability
-    close_states_ev = 0
-    for _, row in year_df.iterrows():
-        tp = _state_two_party(row)
-        if tp <= 0:
-            continue
-        margin_share = _state_margin_votes(row) / tp
-        if margin_share < recount_threshold:
-            close_states_ev += _get_num(row, 'electoral_votes')
-    V_recount = close_states_ev / total_ec if total_ec > 0 else float('nan')
+    V_recount = state_metrics['close_states_ev'] / total_ec if total_ec > 0 else float('nan')
 
     # Coalition Brittleness: count of winner-won states with margin < 2%
-    brittleness = 0
-    for _, row in year_df.iterrows():
-        if str(row['party_win']).strip() != winner_party:
-            continue
-        tp = _state_two_party(row)
-        if tp <= 0:
-            continue
-        margin_share = _state_margin_votes(row) / tp
-        if margin_share < brittleness_threshold:
-            brittleness += 1
+    brittleness = state_metrics['brittleness']
 
     # Institutional Distortion Index
     if m == 0 or math.isnan(m) or math.isnan(f_over_S):
@@ -232,31 +224,132 @@ def compute_year_metrics(year_df: pd.DataFrame, alpha: float = 0.5,
 def compute_metrics_for_all_years(csv_path: str = '1900_2024_election_results.fixed.csv',
                                   alpha: float = 0.5,
                                   recount_threshold: float = 0.005,
-                                  brittleness_threshold: float = 0.02) -> pd.DataFrame:
-    # Handle leading file path comment lines in CSV
-    df = pd.read_csv(csv_path, comment='/', engine='python')
-
-    # Clean expected columns to numeric where needed
-    for col in ['D_votes', 'R_votes', 'electoral_votes', 'totalvotes', 'D_electoral', 'R_electoral',
-                'total_electoral_votes', 'electoral_votes_to_win']:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+                                  brittleness_threshold: float = 0.02,
+                                  frontiers: Optional[Dict[Tuple[int, str], FlipFrontier]] = None,
+                                  cache: Optional[FlipCache] = None,
+                                  dataset: Optional[ElectionDataset] = None,
+                                  start_year: Optional[int] = None,
+                                  end_year: Optional[int] = None,
+                                  linked_districts: bool = False) -> pd.DataFrame:
+    """Compute metrics per year. `frontiers` maps (year, loser) to a FlipFrontier
+    already built by get_flip_results; missing entries are built and added.
+    `cache` is an optional on-disk FlipCache for the flip solutions.
+    `dataset` is a preloaded ElectionDataset; csv_path is only read when it is None.
+    `start_year`/`end_year` optionally restrict the (inclusive) range of years.
+    `linked_districts` selects the linked district flip model (see FlipFrontier)."""
+    if frontiers is None:
+        frontiers = {}
+
+    if dataset is None:
+        # shared loader: schema check, '/' comment lines and the binary column cache
+        dataset = load_dataset(csv_path)
+
+    # state-level margins, masks and EV sums for every year in one vectorized pass
+    year_slices = list(dataset.iter_years(start_year, end_year))
+    state_metrics = compute_state_metrics(dataset, [y.year for y in year_slices],
+                                          recount_threshold=recount_threshold,
+                                          brittleness_threshold=brittleness_threshold)
 
     metrics: List[Dict[str, Union[int, float, str]]] = []
-    for year, year_df in df.groupby('year'):
-        metrics.append(compute_year_metrics(year_df.copy(), alpha=alpha,
+    for year_data in year_slices:
+        metrics.append(compute_year_metrics(year_data, alpha=alpha,
                                             recount_threshold=recount_threshold,
-                                            brittleness_threshold=brittleness_threshold))
+                                            brittleness_threshold=brittleness_threshold,
+                                            frontiers=frontiers, cache=cache,
+                                            state_metrics=state_metrics[year_data.year],
+                                            linked_districts=linked_districts))
 
     metrics_df = pd.DataFrame(metrics).sort_values('year').reset_index(drop=True)
     return metrics_df
 
 
+# Metrics whose value depends on alpha or on a threshold, in sweep output order
+SWEEP_METRICS = ['C1_euclidean', 'C2_max', 'C3_harmonic_like', 'C4_weighted_geom', 'C5_efficiency_ratio',
+                 'recount_vulnerability_V', 'coalition_brittleness_count']
+
+
+def closeness_grid(m: np.ndarray, f: np.ndarray, S: np.ndarray, alpha: np.ndarray) -> Dict[str, np.ndarray]:
+    """C1-C5 as array expressions (same formulas and nan/inf rules as compute_year_metrics),
+    broadcasting per-year m, f, S against an alpha grid."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f_over_S = np.where(S > 0, f / np.where(S > 0, S, 1), np.nan)
+        C1 = np.sqrt(m * m + f_over_S * f_over_S)
+        C2 = np.maximum(m, f_over_S)
+        denom_C3 = np.where(S > 0, S + m * f, np.nan)
+        C3 = np.where(denom_C3 > 0, (2 * m * f) / denom_C3, np.nan)
+        C4 = (m ** alpha) * (f_over_S ** (1 - alpha))
+        C5 = np.where((S > 0) & (m > 0), f / (m * S), np.where((S > 0) & (m == 0), np.inf, np.nan))
+    shape = np.broadcast(m, alpha).shape
+    return {name: np.broadcast_to(values, shape) for name, values in
+            zip(SWEEP_METRICS[:5], (C1, C2, C3, C4, C5))}
+
+
+def sweep_metrics(alphas: Sequence[float] = (0.5,),
+                  recount_thresholds: Sequence[float] = (0.005,),
+                  brittleness_thresholds: Sequence[float] = (0.02,),
+                  csv_path: str = '1900_2024_election_results.fixed.csv',
+                  frontiers: Optional[Dict[Tuple[int, str], FlipFrontier]] = None,
+                  cache: Optional[FlipCache] = None,
+                  dataset: Optional[ElectionDataset] = None,
+                  start_year: Optional[int] = None,
+                  end_year: Optional[int] = None) -> pd.DataFrame:
+    """Evaluate the parameter-dependent metrics over a grid of alpha x recount x brittleness values.
+
+    The threshold-independent parts (two-party totals, margin m, flip cost f) are computed
+    once per year, the knapsack runs once per year (reusing `frontiers`/`cache`), and the
+    recount/brittleness sums for every threshold come from one compute_state_metrics pass.
+    C1-C5, V and the brittleness count are then broadcast across the whole grid.
+
+    Returns a long table with columns year, alpha, recount_threshold,
+    brittleness_threshold, metric, value (one row per year x grid point x metric).
+    """
+    if dataset is None:
+        dataset = load_dataset(csv_path)
+    if frontiers is None:
+        frontiers = {}
+    alphas = np.asarray(alphas, dtype=np.float64)
+    recount_thresholds = np.asarray(recount_thresholds, dtype=np.float64)
+    brittleness_thresholds = np.asarray(brittleness_thresholds, dtype=np.float64)
+
+    base = compute_metrics_for_all_years(dataset=dataset, frontiers=frontiers, cache=cache,
+                                         start_year=start_year, end_year=end_year)
+    years = base['year'].to_numpy()
+    state_metrics = compute_state_metrics(dataset, years.tolist(), recount_threshold=recount_thresholds,
+                                          brittleness_threshold=brittleness_thresholds)
+
+    col = lambda name: base[name].to_numpy(dtype=np.float64)[:, None]  # noqa: E731
+    values = closeness_grid(col('m'), col('f'), col('S_two_party'), alphas[None, :])
+    total_ec = col('total_EC')
+    close_ev = np.stack([state_metrics[y]['close_states_ev'] for y in years.tolist()]).astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values['recount_vulnerability_V'] = np.where(total_ec > 0, close_ev / np.where(total_ec > 0, total_ec, 1), np.nan)
+    values['coalition_brittleness_count'] = np.stack([state_metrics[y]['brittleness'] for y in years.tolist()])
+
+    # axes: (year, alpha, recount, brittleness); each metric varies along its own parameter only
+    shape = (len(years), len(alphas), len(recount_thresholds), len(brittleness_thresholds))
+    axis_of = {'recount_vulnerability_V': 2, 'coalition_brittleness_count': 3}
+    idx = np.indices(shape).reshape(4, -1)
+    frames = []
+    for name in SWEEP_METRICS:
+        grid_shape = [len(years), 1, 1, 1]
+        grid_shape[axis_of.get(name, 1)] = -1
+        frames.append(pd.DataFrame({
+            'year': years[idx[0]],
+            'alpha': alphas[idx[1]],
+            'recount_threshold': recount_thresholds[idx[2]],
+            'brittleness_threshold': brittleness_thresholds[idx[3]],
+            'metric': name,
+            'value': np.broadcast_to(values[name].reshape(grid_shape), shape).ravel(),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
 def _plot_series(years: List[int], values: List[float], ylabel: str, title: str, out_path: str,
                  is_percentage: bool = False, bar: bool = False):
     """Deprecated internal plotting (kept for compatibility). Election metrics now uses
     plotting.make_plot/make_bar_plot for consistent styling. This function is unused.
     """
+    from plotting import make_bar_plot
     df_tmp = pd.DataFrame({"series": values}, index=years)
     folder = os.path.dirname(out_path)
     base = os.path.basename(out_path)
@@ -273,7 +366,11 @@ def _plot_series(years: List[int], values: List[float], ylabel: str, title: str,
         make_bar_plot(df_tmp, years[0], years[-1], plot_count, 'series', ylabel, title, filename, folder_path=folder, show_plot=False)
 
 
-def write_outputs(metrics_df: pd.DataFrame, results_dir: str = 'election_metrics') -> None:
+def write_outputs(metrics_df: pd.DataFrame, results_dir: str = 'election_metrics',
+                  workers: Optional[int] = None, plots: bool = True) -> List[str]:
+    """Write the metrics CSV and render the metric plots concurrently (see plotting.render_plot_jobs).
+    With plots=False only the CSV is written and matplotlib is never imported.
+    Returns the manifest of written files."""
     # write outputs to 'election_metrics/' folder per user preference
     os.makedirs(results_dir, exist_ok=True)
 
@@ -282,6 +379,11 @@ def write_outputs(metrics_df: pd.DataFrame, results_dir: str = 'election_metrics
 
     csv_out = os.path.join(results_dir, f'election_metrics-{first_year}-{last_year}.csv')
     metrics_df.to_csv(csv_out, index=False)
+    instrumentation.count('files_written')
+    if not plots:
+        return [csv_out]
+
+    from plotting import plot_job, render_plot_jobs
 
     # place plots directly into the election_metrics folder
     plots_dir = results_dir
@@ -306,6 +408,7 @@ def write_outputs(metrics_df: pd.DataFrame, results_dir: str = 'election_metrics
 
     years = metrics_df['year'].tolist()
 
+    jobs = []
     for idx, (col, ylabel, title) in enumerate(plot_specs, start=1):
         values = metrics_df[col].tolist()
         # Construct a small DataFrame with index=years and the series as a single column
@@ -315,17 +418,25 @@ def write_outputs(metrics_df: pd.DataFrame, results_dir: str = 'election_metrics
         filename = col
         full_title = f"{title} ({first_year}-{last_year})"
         if col == 'coalition_brittleness_count':
-            make_bar_plot(df_plot, first_year, last_year, plot_count, col, ylabel, full_title, filename, folder_path=plots_dir, show_plot=False)
+            jobs.append(plot_job('make_bar_plot', df_plot, first_year, last_year, plot_count, col, ylabel, full_title, filename, folder_path=plots_dir, show_plot=False,
+                                 stage_name=f'{plot_count}-{filename}'))
         else:
-            make_bar_plot(df_plot, first_year, last_year, plot_count, col, ylabel, full_title, filename, folder_path=plots_dir, show_plot=False, subplot_dual_log=True)
+            jobs.append(plot_job('make_bar_plot', df_plot, first_year, last_year, plot_count, col, ylabel, full_title, filename, folder_path=plots_dir, show_plot=False,
+                                 subplot_dual_log=True, stage_name=f'{plot_count}-{filename}'))
+
+    return [csv_out] + render_plot_jobs(jobs, workers=workers)
 
 
 if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Compute election metrics for every year.')
+    parser.add_argument('--no-plots', action='store_true', help='write the metrics CSV only')
+    args = parser.parse_args()
     try:
         print("Starting election_metrics computation...")
         metrics = compute_metrics_for_all_years()
         print(f"Computed metrics dataframe with shape: {metrics.shape}")
-        write_outputs(metrics)
+        write_outputs(metrics, plots=not args.no_plots)
         print(f"Wrote metrics for {len(metrics)} elections to results and plots.")
     except Exception as e:
         os.makedirs('results', exist_ok=True)
@@ -1,352 +1,536 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+import argparse
 import os
-import time
-
-from analysis import compute_flip_for_year
-from reporting import generate_year_results
-from plotting import make_all_plots
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import instrumentation
+from analysis import SOLVERS, compute_flip_for_year, solve_flip
+from build_manifest import BuildManifest, artifact_key, source_digest, year_digests
+from election_dataset import PARTIES, as_dataset
+from election_loader import load_dataset
+from flip_cache import FlipCache
+from reporting import ReportSink, generate_year_results, records_path, render_year_section, report_folder, report_path
 from election_metrics import compute_metrics_for_all_years, write_outputs
 
-# Set the dark theme for all plots
-plt.style.use('dark_background')
-
 
-def get_flip_results(election_results_df, start_year, end_year, print_results=False, flip_mode='classic'):
-    """Compute flip results.
+def compute_year_flip_results(election_results, modes, year_tally, cache=None, frontiers=None, linked_districts=False,
+                              solver='dp', epsilon=0.01):
+    """Per-year computation for the requested modes: DP, flipped-state details and other-party tallies.
 
-    flip_mode: 'classic' (runner-up becomes outright winner),
-               'no_majority' (original winner ends up with strictly less than ECs_to_win),
-               'both' (produce both modes)
-    Returns a dict mapping mode->(flip_results_df, flip_results_dict)
+    Has no side effects besides the optional cache/frontiers, so years can be computed
+    in any order (or in worker processes) and written afterwards.
+    linked_districts: solve with district units linked to their state (see FlipFrontier)
+    solver/epsilon: flip solver (see analysis.solve_flip); other solvers than 'dp' add the
+                    solution's 'optimality_gap' to the result row
+    Returns a dict mapping mode->{'result': row for the flip results CSV,
+                                  'report': generate_year_results keyword arguments,
+                                  'write_report': whether the mode produces a TXT entry}
     """
-    modes = [flip_mode] if flip_mode in ('classic', 'no_majority') else ['classic', 'no_majority']
-
-    # Initialize containers for each mode
-    all_flip_results = {m: {} for m in modes}
-
-    # Map modes to output folders (user preference): classic -> results/, no_majority -> no_majority/
-    folder_map = {
-        'classic': 'results',
-        'no_majority': 'no_majority'
-    }
-
-    # Ensure results directories and initialize summary files per mode
+    year = election_results.year
+    total_electoral_votes = election_results.first('total_electoral_votes')
+    votes_to_win = election_results.first('electoral_votes_to_win')
+    winner = election_results.first('overall_winner')
+    winner_electoral_votes = election_results.first(winner + '_electoral')
+    loser = election_results.first('overall_runner_up')
+    winner_name = election_results.first(winner + '_name')
+    loser_name = election_results.first(loser + '_name')
+    loser_electoral_votes = election_results.first(loser + '_electoral')
+
+    # common per-year values
+    total_votes_winner = election_results[winner + '_votes'].sum()
+    total_votes_loser = election_results[loser + '_votes'].sum()
+    color = 'deepskyblue' if election_results['D_votes'].sum() > election_results['R_votes'].sum() else 'red'
+    if year == 1960:
+        total_votes_winner = 34220984
+        total_votes_loser = 34108157
+        color = 'deepskyblue'
+    popular_vote_margin = total_votes_winner - total_votes_loser
+    abs_popular_vote_margin = abs(popular_vote_margin)
+    total_votes_in_year = election_results['totalvotes'].sum()
+    total_electoral_votes_in_year = election_results['electoral_votes'].sum()
+    electoral_college_votes_to_win = total_electoral_votes_in_year // 2 + 1
+
+    year_results = {}
+    # compute for requested modes
     for m in modes:
-        folder = folder_map.get(m, os.path.join('results', m))
-        os.makedirs(folder, exist_ok=True)
-        # name the text summary file depending on mode
-        txt_name = f'no_majority_results_{start_year}-{end_year}.txt' if m == 'no_majority' else f'flip_results_{start_year}-{end_year}.txt'
-        with open(os.path.join(folder, txt_name), 'w') as f:
-            f.write('')
-
-    # loop through the years in the election results data
-    for year in election_results_df['year'].unique():
-        election_results = election_results_df[election_results_df['year'] == year]
-        total_electoral_votes = election_results['total_electoral_votes'].iloc[0]
-        votes_to_win = election_results['electoral_votes_to_win'].iloc[0]
-        winner = election_results['overall_winner'].iloc[0]
-        winner_electoral_votes = election_results[winner + '_electoral'].iloc[0]
-        loser = election_results['overall_runner_up'].iloc[0]
-        winner_name = election_results[winner + '_name'].iloc[0]
-        loser_name = election_results[loser + '_name'].iloc[0]
-        loser_electoral_votes = election_results[loser + '_electoral'].iloc[0]
-
-        # common per-year values
-        total_votes_winner = election_results[winner + '_votes'].sum()
-        total_votes_loser = election_results[loser + '_votes'].sum()
-        color = 'deepskyblue' if election_results['D_votes'].sum() > election_results['R_votes'].sum() else 'red'
-        if year == 1960:
-            total_votes_winner = 34220984
-            total_votes_loser = 34108157
-            color = 'deepskyblue'
-        popular_vote_margin = total_votes_winner - total_votes_loser
-        abs_popular_vote_margin = abs(popular_vote_margin)
-        total_votes_in_year = election_results['totalvotes'].sum()
-        total_electoral_votes_in_year = election_results['electoral_votes'].sum()
-        electoral_college_votes_to_win = total_electoral_votes_in_year // 2 + 1
-
-        # compute for requested modes
-        for m in modes:
-            if m == 'classic':
-                electoral_votes_to_flip = votes_to_win - loser_electoral_votes
-            elif m == 'no_majority':
-                # flip enough EVs away from the original winner so winner ends up with strictly less than needed to win
-                # i.e., original_winner_ECs_after = winner_electoral_votes - flipped_ev < electoral_college_votes_to_win
-                # So need flipped_ev > winner_electoral_votes - (electoral_college_votes_to_win - 1)
-                flipped_ev_needed = max(0, winner_electoral_votes - (electoral_college_votes_to_win - 1))
-                electoral_votes_to_flip = flipped_ev_needed
-            else:
-                continue
-
-            # If no electoral votes need flipping, set empty results
-            if electoral_votes_to_flip <= 0:
-                flipped_states = []
-                min_votes_to_flip = 0
-                best_v = 0
-                winner_states_dict = {}
+        if m == 'classic':
+            electoral_votes_to_flip = votes_to_win - loser_electoral_votes
+        elif m == 'no_majority':
+            # flip enough EVs away from the original winner so winner ends up with strictly less than needed to win
+            # i.e., original_winner_ECs_after = winner_electoral_votes - flipped_ev < electoral_college_votes_to_win
+            # So need flipped_ev > winner_electoral_votes - (electoral_college_votes_to_win - 1)
+            flipped_ev_needed = max(0, winner_electoral_votes - (electoral_college_votes_to_win - 1))
+            electoral_votes_to_flip = flipped_ev_needed
+        else:
+            continue
+
+        # If no electoral votes need flipping, set empty results
+        optimality_gap = 0.0
+        if electoral_votes_to_flip <= 0:
+            flipped_states = []
+            min_votes_to_flip = 0
+            best_v = 0
+            winner_states_dict = {}
+        elif solver != 'dp':
+            solution = solve_flip(election_results, loser, electoral_votes_to_flip, solver=solver, epsilon=epsilon)
+            flipped_states, min_votes_to_flip, best_v, winner_states_dict = solution.as_tuple()
+            optimality_gap = solution.gap
+        else:
+            # one DP per year (shared through `frontiers`) answers every mode's EV target
+            flipped_states, min_votes_to_flip, best_v, winner_states_dict = compute_flip_for_year(
+                election_results, loser, electoral_votes_to_flip, cache=cache, frontiers=frontiers,
+                linked_districts=linked_districts
+            )
+
+        flipped_states_votes_dict = {}
+        for state in flipped_states:
+            # capture original per-party vote totals for the state so we can
+            # show original -> adjusted tuples in reports
+            if 'original_votes' in winner_states_dict[state]:
+                # linked at-large unit: combined votes of the state and its district rows
+                original_votes = winner_states_dict[state]['original_votes']
+                d_votes, r_votes, t_votes = (int(original_votes[p]) for p in PARTIES)
+                state_winner = winner_states_dict[state]['state_winner']
             else:
-                flipped_states, min_votes_to_flip, best_v, winner_states_dict = compute_flip_for_year(
-                    election_results, loser, electoral_votes_to_flip
-                )
-
-            flipped_states_votes_dict = {}
-            for state in flipped_states:
-                # attempt to capture original per-party vote totals for the state so we can
-                # show original -> adjusted tuples in reports
-                try:
-                    prow = election_results[election_results['state'] == state].iloc[0]
-                except Exception:
-                    prow = None
-
-                d_votes = r_votes = t_votes = 0
-                state_winner = ''
-                if prow is not None:
-                    try:
-                        d_votes = int(prow.get('D_votes') or 0)
-                    except Exception:
-                        d_votes = 0
-                    try:
-                        r_votes = int(prow.get('R_votes') or 0)
-                    except Exception:
-                        r_votes = 0
-                    try:
-                        t_votes = int(prow.get('T_votes') or 0)
-                    except Exception:
-                        t_votes = 0
-
-                    state_winner = (prow.get('party_win') or '').strip()
-                    if state_winner not in ('D', 'R', 'T'):
-                        # fallback: infer by comparing vote totals in the row
-                        if d_votes >= r_votes and d_votes >= t_votes:
-                            state_winner = 'D'
-                        elif r_votes >= d_votes and r_votes >= t_votes:
-                            state_winner = 'R'
-                        else:
-                            state_winner = 'T'
-
-                flipped_states_votes_dict[state] = {
-                    'EC': winner_states_dict[state]['electoral_votes'],
-                    'flipped votes': winner_states_dict[state]['votes_to_flip'],
-                    '% flipped': round(
-                        winner_states_dict[state]['votes_to_flip'] / winner_states_dict[state]['total_votes'] * 100, 3
-                    ),
-                    'original_votes': {'D': d_votes, 'R': r_votes, 'T': t_votes},
-                    'state_winner': state_winner,
-                }
-
-            flipped_states_votes_dict = {
-                k: v for k, v in sorted(
-                    flipped_states_votes_dict.items(), key=lambda item: item[1]['flipped votes']
-                )
+                i = election_results.index_of(state)
+                d_votes = int(election_results['D_votes'][i])
+                r_votes = int(election_results['R_votes'][i])
+                t_votes = int(election_results['T_votes'][i])
+                # party_win, or the highest of D/R/T when party_win is not a known code
+                state_winner = PARTIES[election_results['state_winner_code'][i]]
+
+            flipped_states_votes_dict[state] = {
+                'EC': winner_states_dict[state]['electoral_votes'],
+                'flipped votes': winner_states_dict[state]['votes_to_flip'],
+                '% flipped': round(
+                    winner_states_dict[state]['votes_to_flip'] / winner_states_dict[state]['total_votes'] * 100, 3
+                ),
+                'original_votes': {'D': d_votes, 'R': r_votes, 'T': t_votes},
+                'state_winner': state_winner,
             }
 
-            number_of_flipped_states = len(flipped_states)
-
-            all_flip_results[m][year] = {
+        flipped_states_votes_dict = {
+            k: v for k, v in sorted(
+                flipped_states_votes_dict.items(), key=lambda item: item[1]['flipped votes']
+            )
+        }
+
+        number_of_flipped_states = len(flipped_states)
+
+        result = {
+            'min_votes_to_flip': min_votes_to_flip,
+            'flipped_states': flipped_states,
+            'number_of_flipped_states': number_of_flipped_states,
+            'electoral_votes_flipped': best_v,
+            'total_electoral_votes': total_electoral_votes_in_year,
+            'electoral_votes_to_win': electoral_college_votes_to_win,
+            'popular_vote_margin': popular_vote_margin,
+            'color': color,
+            'flip_margin_ratio': 100 * (min_votes_to_flip / total_votes_in_year if total_votes_in_year else 0),
+            'popular_margin_ratio': 100 * (popular_vote_margin / total_votes_in_year if total_votes_in_year else 0),
+        }
+        if solver != 'dp':
+            result['optimality_gap'] = optimality_gap
+
+        # other_parties keyed by party code ('D','R','T'): each state's `electoral_votes` counted once
+        # for the state's `party_win` (per-party totals repeated on every row would multiply).
+        # The tallies are aggregated once for all years and shared across modes.
+        other_parties = year_tally.other_parties()
+
+        # Remove the primary winner/runner-up from other_parties to avoid duplication in the "Other" list
+        other_parties.pop(winner_name, None)
+        other_parties.pop(loser_name, None)
+
+        # For no_majority mode only produce a TXT entry when the flip produces NO MAJORITY
+        write_report = True
+        if m == 'no_majority':
+            # after flipping best_v to the loser, does the original winner end up below the threshold?
+            adjusted_winner_ev = winner_electoral_votes - best_v
+            write_report = adjusted_winner_ev < electoral_college_votes_to_win
+
+        year_results[m] = {
+            'result': result,
+            'report': {
+                'year': year,
+                'winner_name': winner_name,
+                'winner': winner,
+                'winner_electoral_votes': winner_electoral_votes,
+                'loser_name': loser_name,
+                'loser': loser,
+                'loser_electoral_votes': loser_electoral_votes,
+                'total_votes_winner': total_votes_winner,
+                'total_votes_loser': total_votes_loser,
+                'popular_vote_margin': popular_vote_margin,
+                'electoral_college_votes_to_win': electoral_college_votes_to_win,
+                'flipped_states_votes_dict': flipped_states_votes_dict,
                 'min_votes_to_flip': min_votes_to_flip,
-                'flipped_states': flipped_states,
                 'number_of_flipped_states': number_of_flipped_states,
-                'electoral_votes_flipped': best_v,
-                'total_electoral_votes': total_electoral_votes_in_year,
-                'electoral_votes_to_win': electoral_college_votes_to_win,
-                'popular_vote_margin': popular_vote_margin,
-                'color': color,
-                'flip_margin_ratio': 100 * (min_votes_to_flip / total_votes_in_year if total_votes_in_year else 0),
-                'popular_margin_ratio': 100 * (popular_vote_margin / total_votes_in_year if total_votes_in_year else 0),
-            }
+                'abs_popular_vote_margin': abs_popular_vote_margin,
+                'total_votes_in_year': total_votes_in_year,
+                'best_v': best_v,
+                'other_parties': other_parties,
+            },
+            'write_report': write_report,
+        }
 
-            # Build other_parties: sum each state's `electoral_votes` once, assigned to the state's `party_win` candidate.
-            # Some files store per-party totals repeated on every row; summing those repeats multiplies totals.
-            # Instead iterate states and add that state's `electoral_votes` once to the candidate indicated by `party_win`.
-            # Build other_parties keyed by party code ('D','R','T').
-            # Sum each state's `electoral_votes` once and attribute to the state's `party_win`.
-            ev_totals = {'D': 0, 'R': 0, 'T': 0}
-            name_map = {'D': '', 'R': '', 'T': ''}
-            for _, prow in election_results.iterrows():
-                pw = (prow.get('party_win') or '').strip()
-                # normalize pw to D/R/T; if missing determine by vote counts
-                if pw not in ('D', 'R', 'T'):
-                    try:
-                        d_votes = int(prow.get('D_votes') or 0)
-                    except Exception:
-                        d_votes = 0
-                    try:
-                        r_votes = int(prow.get('R_votes') or 0)
-                    except Exception:
-                        r_votes = 0
-                    try:
-                        t_votes = int(prow.get('T_votes') or 0)
-                    except Exception:
-                        t_votes = 0
-                    if d_votes >= r_votes and d_votes >= t_votes:
-                        pw = 'D'
-                    elif r_votes >= d_votes and r_votes >= t_votes:
-                        pw = 'R'
-                    else:
-                        pw = 'T'
-
-                try:
-                    ev = int(prow.get('electoral_votes') or 0)
-                except Exception:
-                    ev = 0
-
-                if ev <= 0:
-                    continue
-
-                # record candidate name for this party if not set
-                if not name_map.get(pw):
-                    name_col = f"{pw}_name"
-                    try:
-                        name_map[pw] = (prow.get(name_col) or '').strip()
-                    except Exception:
-                        name_map[pw] = ''
-
-                ev_totals[pw] = ev_totals.get(pw, 0) + ev
-
-            # Build final other_parties dict using codes as keys
-            other_parties = {}
-            for code in ('D', 'R', 'T'):
-                ev = ev_totals.get(code, 0)
-                if ev > 0:
-                    # fallback: try to get a name from the election_results frame if not found in name_map
-                    name = name_map.get(code) or ''
-                    if not name and f"{code}_name" in election_results.columns:
-                        try:
-                            # take the first non-empty name in that column
-                            nonempty = election_results[f"{code}_name"].dropna().astype(str)
-                            if len(nonempty) > 0:
-                                name = nonempty.iloc[0].strip()
-                        except Exception:
-                            name = name_map.get(code) or ''
-                    other_parties[code] = (name, ev)
-
-            # Remove the primary winner/runner-up from other_parties to avoid duplication in the "Other" list
-            other_parties.pop(winner_name, None)
-            other_parties.pop(loser_name, None)
-
-            # For no_majority mode only produce a TXT entry when the flip produces NO MAJORITY
-            if m == 'no_majority':
-                # after flipping best_v to the loser, does the original winner end up below the threshold?
-                adjusted_loser_ev = best_v + loser_electoral_votes
-                adjusted_winner_ev = winner_electoral_votes - best_v
-                if adjusted_winner_ev < electoral_college_votes_to_win:
-                    generate_year_results(
-                        year,
-                        winner_name,
-                        winner,
-                        winner_electoral_votes,
-                        loser_name,
-                        loser,
-                        loser_electoral_votes,
-                        total_votes_winner,
-                        total_votes_loser,
-                        popular_vote_margin,
-                        electoral_college_votes_to_win,
-                        flipped_states_votes_dict,
-                        min_votes_to_flip,
-                        number_of_flipped_states,
-                        abs_popular_vote_margin,
-                        total_votes_in_year,
-                        best_v,
-                        start_year,
-                        end_year,
-                        print_results=print_results,
-                        mode=m,
-                        other_parties=other_parties,
+    return year_results
+
+
+# Dataset shared with pool workers once at startup instead of being pickled per task
+_worker_dataset = None
+_worker_profile = False
+
+
+def _init_worker(dataset, profile=False):
+    global _worker_dataset, _worker_profile
+    _worker_dataset = dataset
+    _worker_profile = profile
+
+
+def _compute_year_task(year, modes, cache, linked_districts=False, solver='dp', epsilon=0.01):
+    frontiers = {}
+    with instrumentation.collect(_worker_profile) as profiler, instrumentation.stage(str(year)):
+        year_results = compute_year_flip_results(
+            _worker_dataset.year(year), modes, _worker_dataset.tallies()[year], cache=cache, frontiers=frontiers,
+            linked_districts=linked_districts, solver=solver, epsilon=epsilon
+        )
+    return year, year_results, frontiers, profiler.snapshot() if profiler is not None else None
+
+
+MODES = ('classic', 'no_majority')
+STAGES = ('compute', 'report', 'plots', 'sort', 'metrics')
+
+
+def _selected_modes(flag, modes):
+    """Modes an output flag applies to: all (True), none (False) or the listed ones."""
+    if isinstance(flag, bool):
+        return list(modes) if flag else []
+    return [m for m in modes if m in flag]
+
+
+def get_flip_results(dataset, start_year, end_year, print_results=False, flip_mode='classic', frontiers=None, cache=None, workers=1,
+                     write_reports=True, write_csv=True, output_root=None, manifest=None, linked_districts=False,
+                     solver='dp', epsilon=0.01):
+    """Compute flip results for the years start_year..end_year (inclusive).
+
+    dataset: ElectionDataset (a raw DataFrame is converted once)
+
+    flip_mode: 'classic' (runner-up becomes outright winner),
+               'no_majority' (original winner ends up with strictly less than ECs_to_win),
+               'both' (produce both modes), or a list of modes
+    frontiers: optional dict filled with the per-year FlipFrontier keyed by (year, loser),
+               so later stages (e.g. election metrics) can reuse the same DP
+    cache: optional FlipCache so unchanged years are loaded from disk instead of recomputed
+    workers: number of processes for the per-year computation (1 = run in this process);
+             results are merged in year order before any report is written
+    write_reports: write the TXT summaries and their JSONL records; True/False for every
+                   mode, or the modes to write them for
+    write_csv: write the per-mode flip results CSV and the copy of the input data; True/False
+               for every mode, or the modes to write them for
+    output_root: folder the results/ and no_majority/ folders are created under
+    manifest: optional BuildManifest; years whose input rows and compute code are
+              unchanged since they were stored there are restored instead of recomputed
+    linked_districts: link district units (ME-02, NE-02, ...) to their state's at-large EVs
+                      in the DP instead of treating every row as an independent state
+    solver: 'dp' (exact DP, default), 'bnb' (exact branch and bound) or 'fptas'
+            (within a factor 1 + epsilon); see analysis.solve_flip
+    Returns a dict mapping mode->(flip_results_df, flip_results_dict)
+    """
+    dataset = as_dataset(dataset)
+    if frontiers is None:
+        frontiers = {}
+    if isinstance(flip_mode, (list, tuple)):
+        modes = [m for m in MODES if m in flip_mode]
+    else:
+        modes = [flip_mode] if flip_mode in MODES else list(MODES)
+
+    # Initialize containers for each mode
+    all_flip_results = {m: {} for m in modes}
+    report_modes = _selected_modes(write_reports, modes)
+    csv_modes = _selected_modes(write_csv, modes)
+
+    # One buffered writer per summary file (TXT and its JSONL records) for the whole run;
+    # opening them up front creates (and truncates) each mode's main files even when they get no entries
+    sink = ReportSink()
+    for m in report_modes:
+        sink.open(report_path(start_year, end_year, mode=m, output_root=output_root))
+        sink.open(records_path(report_path(start_year, end_year, mode=m, output_root=output_root)))
+
+    # per-year EV tallies for the "other parties" lines, computed once for all years
+    year_tallies = dataset.tallies()
+
+    # compute every year in range first (optionally in parallel), then write in year order
+    years = [y for y in dataset.years.tolist() if start_year <= y <= end_year]
+    results_by_year = {}
+    stale_years = years
+    if manifest is not None:
+        code = artifact_key(source_digest('compute'), linked_districts, solver, epsilon if solver == 'fptas' else None)
+        digests = year_digests(dataset, set(years))
+        for year in years:
+            restored = manifest.year_results(year, digests[year], code, modes)
+            if restored is not None:
+                results_by_year[year] = restored
+        stale_years = [year for year in years if year not in results_by_year]
+        instrumentation.count('years_restored', len(results_by_year))
+
+    computed = {}
+    with instrumentation.stage('dp'):
+        if workers and workers > 1 and len(stale_years) > 1:
+            initargs = (dataset, instrumentation.active() is not None)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+                futures = [pool.submit(_compute_year_task, year, modes, cache, linked_districts, solver, epsilon) for year in stale_years]
+                for future in futures:
+                    year, year_results, year_frontiers, profile = future.result()
+                    computed[year] = year_results
+                    frontiers.update(year_frontiers)
+                    instrumentation.merge(profile)
+        else:
+            for year in stale_years:
+                with instrumentation.stage(str(year)):
+                    computed[year] = compute_year_flip_results(
+                        dataset.year(year), modes, year_tallies[year], cache=cache, frontiers=frontiers,
+                        linked_districts=linked_districts, solver=solver, epsilon=epsilon
                     )
-                    # also save to a separate ONLY file with just these years
+    for year, year_results in computed.items():
+        if manifest is not None:
+            year_results = manifest.store_year_results(year, digests[year], code, year_results)
+        results_by_year[year] = year_results
+
+    with instrumentation.stage('report'):
+        for year in years:
+            with instrumentation.stage(str(year)):
+                for m in modes:
+                    year_result = results_by_year[year][m]
+                    all_flip_results[m][year] = year_result['result']
+                    if not (m in report_modes and year_result['write_report']):
+                        continue
+                    # render the section once and write it to every file it belongs in
+                    section = render_year_section(**year_result['report'])
                     generate_year_results(
-                        year,
-                        winner_name,
-                        winner,
-                        winner_electoral_votes,
-                        loser_name,
-                        loser,
-                        loser_electoral_votes,
-                        total_votes_winner,
-                        total_votes_loser,
-                        popular_vote_margin,
-                        electoral_college_votes_to_win,
-                        flipped_states_votes_dict,
-                        min_votes_to_flip,
-                        number_of_flipped_states,
-                        abs_popular_vote_margin,
-                        total_votes_in_year,
-                        best_v,
-                        start_year,
-                        end_year,
+                        **year_result['report'],
+                        start_year=start_year,
+                        end_year=end_year,
                         print_results=print_results,
                         mode=m,
-                        other_parties=other_parties,
-                        filename='no_majority_ONLY_results',
-                        skip_majority=True,
+                        sink=sink,
+                        section=section,
+                        output_root=output_root,
                     )
-            else:
-                generate_year_results(
-                    year,
-                    winner_name,
-                    winner,
-                    winner_electoral_votes,
-                    loser_name,
-                    loser,
-                    loser_electoral_votes,
-                    total_votes_winner,
-                    total_votes_loser,
-                    popular_vote_margin,
-                    electoral_college_votes_to_win,
-                    flipped_states_votes_dict,
-                    min_votes_to_flip,
-                    number_of_flipped_states,
-                    abs_popular_vote_margin,
-                    total_votes_in_year,
-                    best_v,
-                    start_year,
-                    end_year,
-                    print_results=print_results,
-                    mode=m,
-                    other_parties=other_parties,
-                )
+                    if m == 'no_majority':
+                        # also save to a separate ONLY file with just these years
+                        generate_year_results(
+                            **year_result['report'],
+                            start_year=start_year,
+                            end_year=end_year,
+                            print_results=print_results,
+                            mode=m,
+                            filename='no_majority_ONLY_results',
+                            skip_majority=True,
+                            sink=sink,
+                            section=section,
+                            output_root=output_root,
+                        )
+    sink.close()
 
     # Output the results per mode
     output = {}
     for m in modes:
         flip_results_df = pd.DataFrame.from_dict(all_flip_results[m], orient='index')
-        csv_folder = folder_map.get(m, os.path.join('results', m))
-        os.makedirs(csv_folder, exist_ok=True)
-        flip_results_df.to_csv(os.path.join(csv_folder, f'flip_results-{start_year}-{end_year}.csv'))
-        # copy the input data to the results folder for this mode
-        election_results_df.to_csv(os.path.join(csv_folder, f'election_results-{start_year}-{end_year}.csv'), index=False)
+        if m in csv_modes:
+            csv_folder = report_folder(m, output_root)
+            os.makedirs(csv_folder, exist_ok=True)
+            flip_results_df.to_csv(os.path.join(csv_folder, f'flip_results-{start_year}-{end_year}.csv'))
+            # copy the input data to the results folder for this mode
+            dataset.frame.to_csv(os.path.join(csv_folder, f'election_results-{start_year}-{end_year}.csv'), index=False)
+            instrumentation.count('files_written', 2)
         output[m] = (flip_results_df, all_flip_results[m])
 
     return output
 
 
-def main():
-    start_year = 1900
-    end_year = 2024
-    election_results_df = pd.read_csv('1900_2024_election_results.fixed.csv')
-
-    # produce both modes and save outputs/plots for each
-    results_by_mode = get_flip_results(election_results_df, start_year, end_year, print_results=True, flip_mode='both')
-    for mode, (flip_results_df, _) in results_by_mode.items():
-        folder_path = 'results' if mode == 'classic' else mode
-        make_all_plots(flip_results_df, start_year, end_year, folder_path=os.path.join(folder_path), show_plot=False, mode=mode, clear_files=True)
-        
-    # run the sorting script to produce sorted versions of the results files
-    import tools.sort_flip_results
-    # run the file
-    tools.sort_flip_results.main()
-
-    metrics = compute_metrics_for_all_years()
-    write_outputs(metrics)
-
+def parse_years(text):
+    """'2000' or '1960-2000' -> (start_year, end_year)."""
+    start, sep, end = text.partition('-')
+    try:
+        start_year = int(start)
+        end_year = int(end) if sep else start_year
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected YEAR or START-END, got {text!r}')
+    if end_year < start_year:
+        raise argparse.ArgumentTypeError(f'empty year range {text!r}')
+    return start_year, end_year
+
+
+def choice_list(choices):
+    """argparse type for a comma-separated subset of choices (kept in the given choices' order)."""
+    def parse(text):
+        picked = [item.strip() for item in text.split(',') if item.strip()]
+        unknown = [item for item in picked if item not in choices]
+        if unknown or not picked:
+            raise argparse.ArgumentTypeError(f'expected a comma-separated list of {", ".join(choices)}, got {text!r}')
+        return [c for c in choices if c in picked]
+    return parse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compute minimum vote flips, reports, plots and election metrics.')
+    parser.add_argument('--years', type=parse_years, default=(1900, 2024),
+                        help='year or inclusive range to process, e.g. 2000 or 1960-2000 (default: 1900-2024)')
+    parser.add_argument('--modes', type=choice_list(MODES), default=list(MODES),
+                        help='comma-separated flip modes (default: classic,no_majority)')
+    parser.add_argument('--stages', type=choice_list(STAGES), default=list(STAGES),
+                        help='comma-separated stages to run: compute (flip CSVs), report (TXT/JSONL), plots, '
+                             'sort (sorted TXT from the JSONL records), metrics (default: all)')
+    parser.add_argument('--output-root', default=None,
+                        help='folder under which results/, no_majority/ and election_metrics/ are written (default: current directory)')
+    parser.add_argument('--csv', default='1900_2024_election_results.fixed.csv', help='input election CSV')
+    parser.add_argument('--clean', action='store_true',
+                        help='delete the selected modes\' output folders (and election_metrics/ when running metrics) first')
+    parser.add_argument('--force', action='store_true',
+                        help='ignore the build manifest: recompute every year and rewrite every selected output')
+    parser.add_argument('--linked-districts', action='store_true',
+                        help='link Maine/Nebraska district units to their state\'s at-large EVs in the flip DP')
+    parser.add_argument('--solver', choices=SOLVERS, default='dp',
+                        help='flip solver: dp (exact DP), bnb (exact branch and bound) or fptas (approximate, '
+                             'adds an optimality_gap column); metrics always use the exact DP (default: dp)')
+    parser.add_argument('--epsilon', type=float, default=0.01,
+                        help='relative error bound of the fptas solver (default: 0.01)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='processes for the per-year flip computation (default: 1, no pool)')
+    parser.add_argument('--plot-workers', type=int, default=None,
+                        help='processes for rendering plots (default: one per CPU; 1 renders inline)')
+    parser.add_argument('--no-plots', action='store_true',
+                        help='compute-only: skip every plot, same as leaving plots out of --stages (matplotlib is never imported)')
+    parser.add_argument('--profile', action='store_true',
+                        help=f'time every stage, count DP cells and files written, and write profile/profile-START-END.json '
+                             f'(also enabled by {instrumentation.ENV_VAR}=1)')
+    parser.add_argument('--profile-memory', action='store_true',
+                        help=f'--profile plus tracemalloc peak memory per stage (slower; also {instrumentation.ENV_VAR}=memory)')
+    args = parser.parse_args(argv)
+
+    start_year, end_year = args.years
+    if args.linked_districts and args.solver != 'dp':
+        parser.error('--linked-districts is only supported by the dp solver')
+    if args.epsilon <= 0:
+        parser.error('--epsilon must be positive')
+    env_profile, env_memory = instrumentation.env_settings()
+    profiler = None
+    if args.profile or args.profile_memory or env_profile:
+        profiler = instrumentation.enable(trace_memory=args.profile_memory or env_memory)
+    stages = set(args.stages)
+    if args.no_plots:
+        stages.discard('plots')
+    output_root = args.output_root
+    metrics_dir = os.path.join(output_root or '', 'election_metrics')
+
+    if args.clean:
+        folders = [report_folder(m, output_root) for m in args.modes]
+        if 'metrics' in stages:
+            folders.append(metrics_dir)
+        for folder in folders:
+            if os.path.exists(folder):
+                shutil.rmtree(folder)
+
+    with instrumentation.stage('load'):
+        dataset = load_dataset(args.csv)
+    if not any(start_year <= y <= end_year for y in dataset.years.tolist()):
+        parser.error(f'no election data for {start_year}-{end_year}')
+    frontiers = {}
+    cache = FlipCache()
+
+    # Incremental build: every artifact's key covers the code of the stages behind it, the
+    # settings and each year's input hash; artifacts whose key is unchanged (and whose files
+    # still exist) are skipped, and unchanged years are restored from the manifest.
+    manifest = BuildManifest.for_output_root(output_root)
+    if args.force:
+        manifest.years, manifest.artifacts = {}, {}
+    digests = year_digests(dataset, set(range(start_year, end_year + 1)))
+    compute_code = source_digest('compute')
+
+    def key(stage, *extra):
+        solver = (args.solver, args.epsilon if args.solver == 'fptas' else None)
+        return artifact_key(stage, compute_code, args.linked_districts, solver, start_year, end_year, digests, *extra)
+
+    # artifact names carry the year range (like the output file names), so runs over
+    # different ranges keep their own manifest entries instead of evicting each other
+    def name(stage, mode=None):
+        return ':'.join(part for part in (stage, mode, f'{start_year}-{end_year}') if part)
+
+    keys = {}
+    for m in args.modes:
+        keys[name('report', m)] = key('report', m)
+        keys[name('compute', m)] = key('compute', m)
+        keys[name('plots', m)] = key('plots', m, source_digest('plots'))
+        keys[name('sort', m)] = key('sort', m, source_digest('sort'))
+    keys[name('metrics')] = key('metrics', source_digest('metrics'), source_digest('plots') if 'plots' in stages else None)
+
+    def stale(stage, modes=None):
+        names = {m: name(stage, m) for m in (modes if modes is not None else [None])}
+        todo = [m for m, artifact in names.items() if not manifest.is_fresh(artifact, keys[artifact])]
+        for m, artifact in names.items():
+            if m not in todo:
+                print(f'{artifact} is up to date, skipping')
+        return todo if modes is not None else bool(todo)
+
+    stale_by_stage = {stage: (stale(stage, args.modes) if stage in stages else []) for stage in ('compute', 'report', 'plots')}
+    flip_modes = [m for m in args.modes if any(m in todo for todo in stale_by_stage.values())]
+
+    # the flip DP feeds the CSVs, the reports and the plots
+    if flip_modes:
+        with instrumentation.stage('flip_results'):
+            results_by_mode = get_flip_results(dataset, start_year, end_year, print_results='report' in stages, flip_mode=flip_modes,
+                                               frontiers=frontiers, cache=cache, workers=args.workers,
+                                               write_reports=stale_by_stage['report'], write_csv=stale_by_stage['compute'],
+                                               output_root=output_root, manifest=manifest,
+                                               linked_districts=args.linked_districts, solver=args.solver, epsilon=args.epsilon)
+        # only the stages that were stale for a mode were rewritten for it
+        for m in stale_by_stage['report']:
+            manifest.mark_built(name('report', m), keys[name('report', m)],
+                                [report_path(start_year, end_year, m, output_root=output_root),
+                                 records_path(report_path(start_year, end_year, m, output_root=output_root))])
+        for m in stale_by_stage['compute']:
+            folder = report_folder(m, output_root)
+            manifest.mark_built(name('compute', m), keys[name('compute', m)],
+                                [os.path.join(folder, f'flip_results-{start_year}-{end_year}.csv'),
+                                 os.path.join(folder, f'election_results-{start_year}-{end_year}.csv')])
+        if stale_by_stage['plots']:
+            # plotting (and matplotlib) is only imported when plots are requested
+            from plotting import make_all_plots
+            for mode in stale_by_stage['plots']:
+                flip_results_df, _ = results_by_mode[mode]
+                with instrumentation.stage('plots'), instrumentation.stage(mode):
+                    written = make_all_plots(flip_results_df, start_year, end_year, folder_path=report_folder(mode, output_root), show_plot=False, mode=mode, clear_files=True, workers=args.plot_workers)
+                manifest.mark_built(name('plots', mode), keys[name('plots', mode)], written)
+        manifest.save()
+
+    if 'sort' in stages:
+        sort_modes = stale('sort', args.modes)
+        if sort_modes:
+            # produce sorted versions of the results files from their JSONL records
+            import tools.sort_flip_results
+            for m in sort_modes:
+                with instrumentation.stage('sort'), instrumentation.stage(m):
+                    written = tools.sort_flip_results.main(start_year, end_year, output_root=output_root, modes=[m])
+                instrumentation.count('files_written', len(written))
+                manifest.mark_built(name('sort', m), keys[name('sort', m)], written)
+            manifest.save()
+
+    if 'metrics' in stages and stale('metrics'):
+        with instrumentation.stage('metrics'), instrumentation.stage('compute'):
+            metrics = compute_metrics_for_all_years(frontiers=frontiers, cache=cache, dataset=dataset,
+                                                    start_year=start_year, end_year=end_year,
+                                                    linked_districts=args.linked_districts)
+        with instrumentation.stage('metrics'), instrumentation.stage('write'):
+            written = write_outputs(metrics, results_dir=metrics_dir, workers=args.plot_workers, plots='plots' in stages)
+        manifest.mark_built(name('metrics'), keys[name('metrics')], written)
+        manifest.save()
+
+    if profiler is not None:
+        path = profiler.write(os.path.join(output_root or '', 'profile', f'profile-{start_year}-{end_year}.json'))
+        instrumentation.disable()
+        print(f'Wrote {path}')
 
 if __name__ == '__main__':
-    # delete folders if they exist
-    for folder in ['results', 'no_majority', 'election_metrics']:
-        if os.path.exists(folder):
-            import shutil
-            shutil.rmtree(folder)
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+
+from election_dataset import as_year_slice
+
+
+# Bump when the stored solution layout or the solver's answers change so stale entries are ignored.
+CACHE_VERSION = 2
+
+# Columns of a year's rows that the flip solution depends on.
+KEY_COLUMNS = ['state', 'state_po', 'party_win', 'electoral_votes', 'totalvotes', 'D_votes', 'R_votes', 'T_votes']
+
+
+class FlipCache:
+    """Content-addressed on-disk cache of per-year flip solutions.
+
+    A key hashes the year's state rows (only the columns the DP reads), the
+    loser party, the EV target and the cost model, so editing one year's data
+    only invalidates that year. Entries are small JSON files; when the folder
+    grows past max_bytes the least recently used entries are evicted.
+    """
+
+    def __init__(self, cache_dir='.flip_cache', max_bytes=32 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, election_results, loser, votes_to_win, cost_model):
+        year = as_year_slice(election_results)
+        h = hashlib.sha256()
+        h.update(f'v{CACHE_VERSION}|{cost_model}|{loser}|{int(votes_to_win)}\n'.encode('utf-8'))
+        for col in KEY_COLUMNS:
+            if col in year:
+                h.update(f'{col}:'.encode('utf-8'))
+                h.update('\x1f'.join(map(str, year[col].tolist())).encode('utf-8'))
+                h.update(b'\n')
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def get(self, key):
+        """Return the cached (flipped_states, min_votes_to_flip, best_v, winner_states_dict) or None."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        # touch the entry so eviction drops the least recently used files first
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return (entry['flipped_states'], entry['min_votes_to_flip'], entry['best_v'], entry['winner_states_dict'])
+
+    def put(self, key, solution):
+        flipped_states, min_votes_to_flip, best_v, winner_states_dict = solution
+        entry = {
+            'flipped_states': list(flipped_states),
+            'min_votes_to_flip': int(min_votes_to_flip),
+            'best_v': int(best_v),
+            'winner_states_dict': winner_states_dict,
+        }
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+        # only rescan the folder once the running size estimate goes over budget
+        if self._total_bytes is None:
+            self._total_bytes = self._evict()
+        else:
+            self._total_bytes += os.path.getsize(path)
+            if self._total_bytes > self.max_bytes:
+                self._total_bytes = self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until under max_bytes; returns the remaining size."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        if total <= self.max_bytes:
+            return total
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        return total
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.cache_dir, name))
+        self._total_bytes = 0
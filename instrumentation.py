@@ -0,0 +1,172 @@
+"""Opt-in stage timers, counters and peak memory for pipeline runs.
+
+Profiling is off by default: stage() is a null context and count() returns at
+once until enable() installs a Profiler (flexible_vote_margins --profile or
+--profile-memory, or the FLIP_PROFILE environment variable set to 1 or
+'memory'). Stages nest, so a stage opened inside 'compute' is reported as
+'compute/<name>'. Work done in pool workers is captured with collect() in the
+worker and folded into the parent's profile with merge().
+"""
+import contextlib
+import json
+import os
+import time
+import tracemalloc
+from collections import Counter
+
+ENV_VAR = 'FLIP_PROFILE'
+
+_active = None
+
+
+class Profiler:
+    """Accumulated wall time per stage path, plus named counters.
+
+    With trace_memory each stage also records the peak of tracemalloc's traced
+    memory while it ran (the whole traced heap, not just the stage's growth).
+    Stages are listed in the order they were first entered.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.counters = Counter()
+        self._stack = []
+        # running peak of the open stages, innermost last (only with trace_memory)
+        self._peaks = []
+        self._started = time.perf_counter()
+
+    def _path(self, name):
+        return '/'.join(self._stack + [str(name)])
+
+    def _entry(self, path):
+        return self.stages.setdefault(path, {'calls': 0, 'seconds': 0.0, 'peak_memory_bytes': 0})
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        path = self._path(name)
+        self._entry(path)
+        if self.trace_memory:
+            # fold the peak so far into the enclosing stage before measuring this one on its own
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self._peaks.append(0)
+        self._stack.append(str(name))
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            self._stack.pop()
+            entry = self._entry(path)
+            entry['calls'] += 1
+            entry['seconds'] += elapsed
+            if self.trace_memory:
+                peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+                entry['peak_memory_bytes'] = max(entry['peak_memory_bytes'], peak)
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def snapshot(self):
+        """Picklable stages and counters, for handing a worker's profile back to the parent."""
+        return {'stages': self.stages, 'counters': dict(self.counters)}
+
+    def merge(self, snapshot):
+        """Add a snapshot's stages (nested under the currently open stage) and counters."""
+        for path, stats in snapshot['stages'].items():
+            entry = self._entry('/'.join(self._stack + [path]))
+            entry['calls'] += stats['calls']
+            entry['seconds'] += stats['seconds']
+            entry['peak_memory_bytes'] = max(entry['peak_memory_bytes'], stats['peak_memory_bytes'])
+        self.counters.update(snapshot['counters'])
+
+    def report(self):
+        report = {
+            'total_seconds': time.perf_counter() - self._started,
+            'trace_memory': self.trace_memory,
+            'stages': [{'stage': path, **stats} for path, stats in self.stages.items()],
+            'counters': dict(self.counters),
+        }
+        if self.trace_memory:
+            report['peak_memory_bytes'] = max([tracemalloc.get_traced_memory()[1]] + [s['peak_memory_bytes'] for s in report['stages']])
+        else:
+            for stats in report['stages']:
+                del stats['peak_memory_bytes']
+        return report
+
+    def write(self, path):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as fh:
+            json.dump(self.report(), fh, indent=2)
+        return path
+
+
+def env_settings(environ=None):
+    """(enabled, trace_memory) requested by FLIP_PROFILE: '1'/'true'/'yes' or 'memory'."""
+    value = (environ if environ is not None else os.environ).get(ENV_VAR, '').strip().lower()
+    if value == 'memory':
+        return True, True
+    return value in ('1', 'true', 'yes', 'on'), False
+
+
+def enable(trace_memory=False):
+    """Install a fresh Profiler for this process and return it."""
+    global _active
+    disable()
+    if trace_memory:
+        tracemalloc.start()
+    _active = Profiler(trace_memory)
+    return _active
+
+
+def disable():
+    global _active
+    if _active is not None and _active.trace_memory:
+        tracemalloc.stop()
+    _active = None
+
+
+def active():
+    """The installed Profiler, or None when profiling is off."""
+    return _active
+
+
+def stage(name):
+    """Time a block as a stage of the active profile (no-op when profiling is off)."""
+    if _active is None:
+        return contextlib.nullcontext()
+    return _active.stage(name)
+
+
+def count(name, n=1):
+    if _active is not None:
+        _active.count(name, n)
+
+
+def merge(snapshot):
+    if _active is not None and snapshot is not None:
+        _active.merge(snapshot)
+
+
+@contextlib.contextmanager
+def collect(enabled):
+    """Profile a block in its own Profiler (e.g. one pool task) and yield it, or None when
+    not enabled; whatever was installed before is restored afterwards. Memory is traced
+    when tracemalloc is running in this process (e.g. inherited from the parent by fork)."""
+    global _active
+    if not enabled:
+        yield None
+        return
+    previous = _active
+    # the worker may have inherited the parent's profiler through fork; never report into it
+    _active = Profiler(trace_memory=tracemalloc.is_tracing())
+    try:
+        yield _active
+    finally:
+        _active = previous
@@ -0,0 +1,248 @@
+import argparse
+import os
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from analysis import DP_INF, compute_flip_for_year, winner_columns
+from election_dataset import PARTIES
+from election_loader import load_dataset
+
+
+def _gaussian_noise(votes, rng, scale, n_draws):
+    """Relative reporting error: each count is scaled by 1 + N(0, scale)."""
+    return votes * (1 + rng.normal(0.0, scale, size=(n_draws,) + votes.shape))
+
+
+def _uniform_noise(votes, rng, scale, n_draws):
+    """Relative error drawn uniformly from [-scale, scale]."""
+    return votes * (1 + rng.uniform(-scale, scale, size=(n_draws,) + votes.shape))
+
+
+def _poisson_noise(votes, rng, scale, n_draws):
+    """Counting noise: each count is a Poisson draw around the reported value (scale unused)."""
+    return rng.poisson(votes, size=(n_draws,) + votes.shape)
+
+
+def _recount_noise(votes, rng, scale, n_draws):
+    """Absolute recount noise: N(0, scale * sqrt(votes)) votes added to each count."""
+    return votes + rng.normal(0.0, 1.0, size=(n_draws,) + votes.shape) * (scale * np.sqrt(votes))
+
+
+# Noise models by name: f(votes, rng, scale, n_draws) -> perturbed votes of shape (n_draws,) + votes.shape
+NOISE_MODELS = {
+    'gaussian': _gaussian_noise,
+    'uniform': _uniform_noise,
+    'poisson': _poisson_noise,
+    'recount': _recount_noise,
+}
+
+
+def electoral_votes_to_flip(year_data, mode='classic'):
+    """EVs the runner-up has to gain in a mode (same targets as the main pipeline)."""
+    winner = year_data.first('overall_winner')
+    loser = year_data.first('overall_runner_up')
+    loser_ev = year_data.first(loser + '_electoral')
+    if mode == 'classic':
+        return year_data.first('electoral_votes_to_win') - loser_ev
+    winner_ev = year_data.first(winner + '_electoral')
+    ev_to_win = int(year_data['electoral_votes'].sum()) // 2 + 1
+    return max(0, winner_ev - (ev_to_win - 1))
+
+
+def _batched_min_cost(ev_weights, costs, max_electoral_votes):
+    """0/1 min-cost knapsack solved for a batch of draws at once.
+
+    costs has shape (n_draws, n_states) and the EV weights are shared, so each
+    state's relaxation is one array operation over (n_draws, EV). Returns the
+    (n_draws, EV) cost table and, per state, a bit-packed (n_draws, EV) table
+    of the cells where taking that state strictly improved the cost.
+    """
+    n_draws = costs.shape[0]
+    n_ev = max_electoral_votes + 1
+    dp = np.full((n_draws, n_ev), DP_INF, dtype=np.int64)
+    dp[:, 0] = 0
+    take_bits = []
+    for i, ev in enumerate(ev_weights):
+        prev = dp[:, :n_ev - ev]
+        candidate = np.where(prev < DP_INF, prev + costs[:, i:i + 1], DP_INF)
+        improved = candidate < dp[:, ev:]
+        dp[:, ev:] = np.where(improved, candidate, dp[:, ev:])
+        took = np.zeros((n_draws, n_ev), dtype=bool)
+        took[:, ev:] = improved
+        take_bits.append(np.packbits(took, axis=1))
+    return dp, take_bits
+
+
+class YearSimulation:
+    """Monte Carlo draws of the minimum flip for one year and mode.
+
+    min_votes[d] is draw d's minimal number of flipped votes (-1 if the target
+    is unreachable), included[d, i] whether states[i] is in draw d's flip set.
+    """
+
+    def __init__(self, year, mode, loser, states, deterministic_min_votes, min_votes, electoral_votes_flipped, included):
+        self.year = year
+        self.mode = mode
+        self.loser = loser
+        self.states = states
+        self.deterministic_min_votes = deterministic_min_votes
+        self.min_votes = min_votes
+        self.electoral_votes_flipped = electoral_votes_flipped
+        self.included = included
+
+    def inclusion_probabilities(self):
+        """{state: share of draws whose flip set contains the state}."""
+        shares = self.included.mean(axis=0) if len(self.min_votes) else np.zeros(len(self.states))
+        return dict(zip(self.states, shares.tolist()))
+
+    def flip_set_frequencies(self, top=None):
+        """[(flip set as a tuple of states, number of draws)], most frequent first."""
+        counts = Counter()
+        if len(self.min_votes):
+            sets, n = np.unique(self.included, axis=0, return_counts=True)
+            for row, count in zip(sets, n.tolist()):
+                counts[tuple(s for s, used in zip(self.states, row) if used)] = count
+        return counts.most_common(top)
+
+    def summary(self):
+        reachable = self.min_votes[self.min_votes >= 0]
+        q = np.percentile(reachable, [5, 25, 50, 75, 95]).tolist() if len(reachable) else [np.nan] * 5
+        return {
+            'year': self.year,
+            'mode': self.mode,
+            'draws': len(self.min_votes),
+            'deterministic_min_votes': self.deterministic_min_votes,
+            'mean': float(reachable.mean()) if len(reachable) else np.nan,
+            'std': float(reachable.std()) if len(reachable) else np.nan,
+            'p05': q[0], 'p25': q[1], 'p50': q[2], 'p75': q[3], 'p95': q[4],
+            'unreachable_share': float(np.mean(self.min_votes < 0)) if len(self.min_votes) else np.nan,
+        }
+
+
+def simulate_year(year_data, mode='classic', n_draws=1000, noise='gaussian', scale=0.005, seed=None, batch_size=1000):
+    """Perturb the year's D/R/T votes n_draws times and solve every draw's minimum flip.
+
+    The official outcome (state winners, EV totals, target) stays fixed; the
+    noise moves each lost state's flip cost (winner votes minus runner-up votes,
+    halved, floored at 0 when noise puts the runner-up ahead). Draws are solved
+    batch_size at a time with _batched_min_cost.
+    """
+    if noise not in NOISE_MODELS:
+        raise ValueError(f'unknown noise model {noise!r}; expected one of {", ".join(NOISE_MODELS)}')
+    rng = np.random.default_rng(None if seed is None else [seed, year_data.year])
+    loser = year_data.first('overall_runner_up')
+    votes_to_win = electoral_votes_to_flip(year_data, mode)
+    deterministic = compute_flip_for_year(year_data, loser, votes_to_win)[1] if votes_to_win > 0 else 0
+
+    party_win = year_data['party_win']
+    lost = np.flatnonzero(party_win != loser)
+    states = year_data['state'][lost].tolist()
+    ev_weights = year_data['electoral_votes'][lost]
+    max_electoral_votes = int(ev_weights.sum())
+    # column index of each lost state's winner and of the runner-up in the (state, party) vote matrix
+    votes = np.stack([year_data[f'{p}_votes'][lost] for p in PARTIES], axis=1).astype(np.float64)
+    winner_col = winner_columns(year_data.year, party_win[lost])
+    loser_col = PARTIES.index(loser)
+    rows = np.arange(len(lost))
+
+    min_votes = np.zeros(n_draws, dtype=np.int64)
+    ev_flipped = np.zeros(n_draws, dtype=np.int64)
+    included = np.zeros((n_draws, len(states)), dtype=bool)
+    start = max(int(votes_to_win), 0)
+    if votes_to_win <= 0:
+        return YearSimulation(year_data.year, mode, loser, states, deterministic, min_votes, ev_flipped, included)
+
+    for lo in range(0, n_draws, batch_size):
+        hi = min(lo + batch_size, n_draws)
+        drawn = np.clip(np.rint(NOISE_MODELS[noise](votes, rng, scale, hi - lo)), 0, None).astype(np.int64)
+        costs = np.maximum((drawn[:, rows, winner_col] - drawn[:, :, loser_col]) // 2 + 1, 0)
+
+        if start > max_electoral_votes:
+            min_votes[lo:hi] = -1
+            continue
+        dp, take_bits = _batched_min_cost(ev_weights, costs, max_electoral_votes)
+
+        # cheapest EV total >= target per draw (fewest EVs on ties)
+        best = np.argmin(dp[:, start:], axis=1)
+        draw_idx = np.arange(hi - lo)
+        best_v = start + best
+        best_cost = dp[draw_idx, best_v]
+        reachable = best_cost < DP_INF
+        min_votes[lo:hi] = np.where(reachable, best_cost, -1)
+        ev_flipped[lo:hi] = np.where(reachable, best_v, 0)
+
+        # walk the take tables back from each draw's best EV total
+        v = np.where(reachable, best_v, 0)
+        for i in range(len(states) - 1, -1, -1):
+            took = ((take_bits[i][draw_idx, v // 8] >> (7 - v % 8)) & 1).astype(bool) & (v > 0)
+            included[lo:hi, i] = took
+            v = v - np.where(took, ev_weights[i], 0)
+
+    return YearSimulation(year_data.year, mode, loser, states, deterministic, min_votes, ev_flipped, included)
+
+
+def simulate_years(dataset, start_year=None, end_year=None, mode='classic', **kwargs):
+    """simulate_year for every year in range; keyword arguments are passed through."""
+    return [simulate_year(year_data, mode=mode, **kwargs) for year_data in dataset.iter_years(start_year, end_year)]
+
+
+def write_simulation_outputs(simulations, results_dir='monte_carlo', top_sets=10):
+    """Write the summary, per-draw distribution, state inclusion and flip set CSVs; returns their paths."""
+    os.makedirs(results_dir, exist_ok=True)
+    first_year = min(s.year for s in simulations)
+    last_year = max(s.year for s in simulations)
+    mode = simulations[0].mode
+    suffix = f'{mode}-{first_year}-{last_year}'
+
+    summary = pd.DataFrame([s.summary() for s in simulations])
+    draws = pd.DataFrame([
+        {'year': s.year, 'draw': d, 'min_votes_to_flip': int(m), 'electoral_votes_flipped': int(ev)}
+        for s in simulations for d, (m, ev) in enumerate(zip(s.min_votes, s.electoral_votes_flipped))
+    ])
+    inclusion = pd.DataFrame([
+        {'year': s.year, 'state': state, 'inclusion_probability': p}
+        for s in simulations for state, p in s.inclusion_probabilities().items()
+    ])
+    flip_sets = pd.DataFrame([
+        {'year': s.year, 'rank': rank, 'flipped_states': '; '.join(states), 'draws': count, 'share': count / len(s.min_votes)}
+        for s in simulations for rank, (states, count) in enumerate(s.flip_set_frequencies(top_sets), start=1)
+    ])
+
+    paths = []
+    for name, frame in (('summary', summary), ('draws', draws), ('state_inclusion', inclusion), ('flip_sets', flip_sets)):
+        path = os.path.join(results_dir, f'monte_carlo_{name}-{suffix}.csv')
+        frame.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    from flexible_vote_margins import parse_years
+
+    parser = argparse.ArgumentParser(description='Monte Carlo distribution of the minimum vote flip under count noise.')
+    parser.add_argument('--years', type=parse_years, default=(1900, 2024), help='YEAR or START-END (default: 1900-2024)')
+    parser.add_argument('--mode', choices=('classic', 'no_majority'), default='classic')
+    parser.add_argument('--draws', type=int, default=1000, help='draws per year (default: 1000)')
+    parser.add_argument('--noise', choices=sorted(NOISE_MODELS), default='gaussian')
+    parser.add_argument('--scale', type=float, default=0.005,
+                        help='noise scale: relative sd/half-width for gaussian/uniform, sqrt(votes) multiplier for recount')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch-size', type=int, default=1000, help='draws solved per batched DP')
+    parser.add_argument('--csv', default='1900_2024_election_results.fixed.csv')
+    parser.add_argument('--output-root', default=None)
+    args = parser.parse_args(argv)
+
+    dataset = load_dataset(args.csv)
+    start_year, end_year = args.years
+    simulations = simulate_years(dataset, start_year, end_year, mode=args.mode, n_draws=args.draws, noise=args.noise,
+                                 scale=args.scale, seed=args.seed, batch_size=args.batch_size)
+    if not simulations:
+        parser.error(f'no election data for {start_year}-{end_year}')
+    for path in write_simulation_outputs(simulations, os.path.join(args.output_root or '', 'monte_carlo')):
+        print(f'Wrote {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from analysis import DP_INF, _grouped_min_cost_knapsack
+from election_dataset import PARTIES
+from election_loader import load_dataset
+
+
+def _ceil_div(n, k):
+    return -(-n // k)
+
+
+def transfer_costs(year_data):
+    """Votes to move so each party carries each row: (n_rows, len(PARTIES)) int64.
+
+    Votes for target party P may be taken from both other parties A and B. With
+    A' = a - p + 1 and B' = b - p + 1 (what P lacks to lead each of them),
+    moving x votes suffices exactly when x >= A'/2, x >= B'/2 and
+    x >= (A' + B')/3, so the cost is the largest of those ceilings (0 where P
+    already carries the row). With B' <= 0 this is the two-party
+    (a - p) // 2 + 1 used by compute_flip_for_year.
+    """
+    votes = np.stack([year_data[f'{p}_votes'] for p in PARTIES], axis=1)
+    code = year_data['state_winner_code'].astype(np.int64)
+    costs = np.zeros(votes.shape, dtype=np.int64)
+    for i in range(len(PARTIES)):
+        a, b = (votes[:, j] - votes[:, i] + 1 for j in range(len(PARTIES)) if j != i)
+        x = np.maximum.reduce([_ceil_div(a, 2), _ceil_div(a + b, 3), _ceil_div(b, 2), np.zeros_like(a)])
+        costs[:, i] = np.where(code == i, 0, x)
+    return costs
+
+
+def _party_wins(states, ev, code, costs, party, needed):
+    """Cheapest set of rows to hand to `party` so it gains at least `needed` EVs."""
+    rows = np.flatnonzero((code != party) & (ev > 0))
+    # cheapest votes per EV first, as in the two-party DP
+    rows = rows[np.argsort(costs[rows, party] / ev[rows], kind='stable')]
+    groups = [[(int(ev[r]), int(costs[r, party]), ((states[r], PARTIES[party]),))] for r in rows]
+    max_ev = int(ev[rows].sum())
+    if needed > max_ev:
+        return None
+    dp, choices = _grouped_min_cost_knapsack(groups, max_ev)
+    best_v = needed + int(np.argmin(dp[needed:]))
+    if dp[best_v] >= DP_INF:
+        return None
+    flips = []
+    v = best_v
+    for g in range(len(groups) - 1, -1, -1):
+        if choices[g][v] >= 0:
+            flips += groups[g][0][2]
+            v -= groups[g][0][0]
+    return int(dp[best_v]), best_v, flips
+
+
+def _shift(delta):
+    """(source, destination) slices moving a table axis by delta cells."""
+    if delta >= 0:
+        return slice(0, None if delta == 0 else -delta), slice(delta, None)
+    return slice(-delta, None), slice(0, delta)
+
+
+def _block_majority(states, ev, code, costs, party_ev, winner, ev_to_win):
+    """Cheapest flips leaving every party short of ev_to_win.
+
+    The DP table is indexed by the final EVs of the two parties other than the
+    winner (the winner's are the remainder). Every row is a group with one
+    option per party it could be handed to: the winner's rows move EVs to either
+    other party, and the other parties' rows move to each other or back to the
+    winner (which pays off when cheap moves from the winner overshoot one of
+    them). Each option is one shifted slice of the table.
+
+    The other parties' rows are relaxed first: those moves trade EVs between
+    the two or hand them to the winner, so their sum never rises above its
+    recorded value, which is below ev_to_win while the winner holds a majority.
+    The winner's rows only add EVs afterwards, so the table can stop at
+    ev_to_win - 1 per party without cutting off any blocking solution; the
+    winner's final EVs are the remainder and must end below ev_to_win as well.
+    """
+    others = [i for i in range(len(PARTIES)) if i != winner]
+    # recorded totals (faithless electors included); the winner keeps the remainder
+    total = int(party_ev.sum())
+    if max(party_ev) < ev_to_win:
+        return 0, 0, []
+    if party_ev[winner] < ev_to_win:
+        # the recorded winner is not the majority holder; not modeled
+        return None
+    shape = (ev_to_win, ev_to_win)
+    dp = np.full(shape, DP_INF, dtype=np.int64)
+    dp[int(party_ev[others[0]]), int(party_ev[others[1]])] = 0
+
+    rows = np.flatnonzero((ev > 0) & (code != winner)).tolist() + np.flatnonzero((ev > 0) & (code == winner)).tolist()
+    options = []
+    choices = []
+    for r in rows:
+        e = int(ev[r])
+        # (party index, EV change of others[0], EV change of others[1])
+        row_options = []
+        for target in range(len(PARTIES)):
+            if code[r] == target:
+                continue
+            delta = [0, 0]
+            if target != winner:
+                delta[others.index(target)] += e
+            if code[r] != winner:
+                delta[others.index(code[r])] -= e
+            row_options.append((target, delta[0], delta[1]))
+        relaxed = dp.copy()
+        choice = np.zeros(shape, dtype=np.int8)
+        for k, (target, d0, d1) in enumerate(row_options):
+            if max(abs(d0), abs(d1)) >= ev_to_win:
+                continue
+            (s0, t0), (s1, t1) = _shift(d0), _shift(d1)
+            src = dp[s0, s1]
+            candidate = src + costs[r, target]
+            improved = (src < DP_INF) & (candidate < relaxed[t0, t1])
+            relaxed[t0, t1][improved] = candidate[improved]
+            choice[t0, t1][improved] = k + 1
+        dp = relaxed
+        options.append(row_options)
+        choices.append(choice)
+
+    blocked = total - np.add.outer(np.arange(shape[0]), np.arange(shape[1])) < ev_to_win
+    masked = np.where(blocked, dp, DP_INF)
+    flat = int(np.argmin(masked))
+    if masked.flat[flat] >= DP_INF:
+        return None
+    cost = int(masked.flat[flat])
+    cell = list(np.unravel_index(flat, shape))
+    electoral_votes_flipped = 0
+    flips = []
+    for k in range(len(rows) - 1, -1, -1):
+        o = int(choices[k][cell[0], cell[1]])
+        if o:
+            target, d0, d1 = options[k][o - 1]
+            flips.append((states[rows[k]], PARTIES[target]))
+            electoral_votes_flipped += int(ev[rows[k]])
+            cell[0] -= d0
+            cell[1] -= d1
+    return cost, electoral_votes_flipped, flips
+
+
+def multiparty_flips(year_data):
+    """Cheapest outcome changes of one year when any state may go to any of D/R/T.
+
+    Outcomes are '<P> wins' for every party P other than the recorded winner
+    (P reaches electoral_votes_to_win) and 'no_majority' (every party ends below
+    it). Returns a list of row dicts with the cost, EVs moved and the flips
+    ('STATE->P'); unreachable outcomes have min_votes_to_flip -1.
+    """
+    states = year_data['state'].tolist()
+    ev = year_data['electoral_votes']
+    code = year_data['state_winner_code'].astype(np.int64)
+    costs = transfer_costs(year_data)
+    party_ev = np.array([year_data.first(f'{p}_electoral') for p in PARTIES], dtype=np.int64)
+    ev_to_win = int(year_data.first('electoral_votes_to_win'))
+    winner = PARTIES.index(year_data.first('overall_winner'))
+
+    outcomes = {}
+    for party in range(len(PARTIES)):
+        if party != winner:
+            needed = max(ev_to_win - int(party_ev[party]), 0)
+            outcomes[f'{PARTIES[party]}_wins'] = _party_wins(states, ev, code, costs, party, needed)
+    outcomes['no_majority'] = _block_majority(states, ev, code, costs, party_ev, winner, ev_to_win)
+
+    rows = []
+    for outcome, solution in outcomes.items():
+        cost, best_v, flips = solution if solution is not None else (-1, 0, [])
+        rows.append({
+            'year': year_data.year,
+            'outcome': outcome,
+            'min_votes_to_flip': cost,
+            'electoral_votes_flipped': best_v,
+            'number_of_flipped_states': len(flips),
+            'flipped_states': '; '.join(f'{state}->{party}' for state, party in flips),
+        })
+    reachable = [r for r in rows if r['min_votes_to_flip'] >= 0]
+    cheapest = min(reachable, key=lambda r: r['min_votes_to_flip']) if reachable else None
+    for r in rows:
+        r['cheapest'] = r is cheapest
+    return rows
+
+
+def multiparty_flips_for_years(dataset, start_year=None, end_year=None):
+    """multiparty_flips for every year in range as one DataFrame."""
+    rows = []
+    for year_data in dataset.iter_years(start_year, end_year):
+        rows += multiparty_flips(year_data)
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    from flexible_vote_margins import parse_years
+
+    parser = argparse.ArgumentParser(description='Minimum vote transfers for every outcome change with D/R/T as targets.')
+    parser.add_argument('--years', type=parse_years, default=(1900, 2024), help='YEAR or START-END (default: 1900-2024)')
+    parser.add_argument('--csv', default='1900_2024_election_results.fixed.csv')
+    parser.add_argument('--output-root', default=None)
+    args = parser.parse_args(argv)
+
+    dataset = load_dataset(args.csv)
+    start_year, end_year = args.years
+    results = multiparty_flips_for_years(dataset, start_year, end_year)
+    if results.empty:
+        parser.error(f'no election data for {start_year}-{end_year}')
+    results_dir = os.path.join(args.output_root or '', 'multiparty')
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, f'multiparty_flips-{start_year}-{end_year}.csv')
+    results.to_csv(path, index=False)
+    print(f'Wrote {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,14 @@
+import contextlib
+import io
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import matplotlib.pyplot as plt
 
+import instrumentation
+
 # Always use dark theme here. The caller can override if desired before import.
 plt.style.use('dark_background')
 
@@ -91,12 +98,13 @@ def make_plot(flip_results_df, start_year, end_year, plot_count, key, ylabel, ti
         fig.tight_layout()
 
         os.makedirs(folder_path, exist_ok=True)
-        fig.savefig(os.path.join(folder_path, f'{plot_count}-{filename}.png'))
-        print(f'Saved plot to {os.path.join(folder_path, f"{plot_count}-{filename}.png")}')
+        out_path = os.path.join(folder_path, f'{plot_count}-{filename}.png')
+        fig.savefig(out_path)
+        print(f'Saved plot to {out_path}')
         if show_plot:
             plt.show()
         plt.close(fig)
-        return
+        return out_path
 
     # Default single-axes behavior
     plt.figure(figsize=(18, 8))
@@ -129,10 +137,13 @@ def make_plot(flip_results_df, start_year, end_year, plot_count, key, ylabel, ti
     plt.text(0.5, 0.01, 'By: eigentaylor', ha='center', va='bottom', transform=plt.gca().transAxes, fontsize=10)
 
     os.makedirs(folder_path, exist_ok=True)
-    plt.savefig(os.path.join(folder_path, f'{plot_count}-{filename}.png'))
-    print(f'Saved plot to {os.path.join(folder_path, f"{plot_count}-{filename}.png")}')
+    out_path = os.path.join(folder_path, f'{plot_count}-{filename}.png')
+    plt.savefig(out_path)
+    print(f'Saved plot to {out_path}')
     if show_plot:
         plt.show()
+    plt.close()
+    return out_path
 
 
 def make_bar_plot(flip_results_df, start_year, end_year, plot_count, key, ylabel, title, filename, folder_path='results/', show_plot=False, subplot_dual_log=False):
@@ -262,12 +273,13 @@ def make_bar_plot(flip_results_df, start_year, end_year, plot_count, key, ylabel
         fig.text(0.3, 0.02, 'By: eigentaylor', ha='center', va='bottom')
         fig.tight_layout()
         os.makedirs(folder_path, exist_ok=True)
-        fig.savefig(os.path.join(folder_path, f'{plot_count}-{filename}.png'))
-        print(f'Saved plot to {os.path.join(folder_path, f"{plot_count}-{filename}.png")}')
+        out_path = os.path.join(folder_path, f'{plot_count}-{filename}.png')
+        fig.savefig(out_path)
+        print(f'Saved plot to {out_path}')
         if show_plot:
             plt.show()
         plt.close(fig)
-        return
+        return out_path
 
     # Default single-axes behavior
     plt.figure(figsize=(18, 8))
@@ -303,10 +315,13 @@ def make_bar_plot(flip_results_df, start_year, end_year, plot_count, key, ylabel
     plt.text(0.5, 0.99, 'By: eigentaylor', ha='center', va='top', transform=plt.gca().transAxes)
 
     os.makedirs(folder_path, exist_ok=True)
-    plt.savefig(os.path.join(folder_path, f'{plot_count}-{filename}.png'))
-    print(f'Saved plot to {os.path.join(folder_path, f"{plot_count}-{filename}.png")}')
+    out_path = os.path.join(folder_path, f'{plot_count}-{filename}.png')
+    plt.savefig(out_path)
+    print(f'Saved plot to {out_path}')
     if show_plot:
         plt.show()
+    plt.close()
+    return out_path
 
 
 def make_state_frequency_plot(flip_results_df, start_year, end_year, plot_count, folder_path='results/', show_plot=False):
@@ -332,12 +347,70 @@ def make_state_frequency_plot(flip_results_df, start_year, end_year, plot_count,
     plt.text(0.5, 0.99, 'By: eigentaylor', ha='center', va='top', transform=plt.gca().transAxes)
 
     os.makedirs(folder_path, exist_ok=True)
-    plt.savefig(os.path.join(folder_path, f'{plot_count}-flipped_states_frequency.png'))
+    out_path = os.path.join(folder_path, f'{plot_count}-flipped_states_frequency.png')
+    plt.savefig(out_path)
     if show_plot:
         plt.show()
+    plt.close()
+    return out_path
+
+
+def plot_job(func, *args, stage_name=None, **kwargs):
+    """Describe one plot as a picklable spec: the name of a plotting function in this module plus its arguments.
+
+    stage_name: label of the plot's profiling stage (see instrumentation), e.g. its output file name; default func
+    """
+    return {'func': func, 'args': args, 'kwargs': kwargs, 'stage_name': stage_name or func}
+
+
+def _init_plot_worker():
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+    plt.style.use('dark_background')
 
 
-def make_all_plots(flip_results_df, start_year, end_year, folder_path='results/', show_plot=False, clear_files=False, mode='classic'):
+def _run_plot_job(job):
+    """Render one job as a profiling stage named by the job's stage_name."""
+    with instrumentation.stage(job['stage_name']):
+        out_path = globals()[job['func']](*job['args'], **job['kwargs'])
+    instrumentation.count('files_written')
+    return out_path
+
+
+def _render_plot_job(job, profile=False):
+    """Render one job, capturing its console output (and its profile when profiling) so the
+    caller can print it in job order."""
+    buffer = io.StringIO()
+    with instrumentation.collect(profile) as profiler, contextlib.redirect_stdout(buffer):
+        out_path = _run_plot_job(job)
+    return out_path, buffer.getvalue(), profiler.snapshot() if profiler is not None else None
+
+
+def render_plot_jobs(jobs, workers=None):
+    """Render plot jobs concurrently in worker processes (Agg backend) and wait for all of them.
+
+    workers: number of processes (default: one per CPU, capped at the number of jobs);
+             1 renders in this process (needed for interactive show_plot).
+    Returns the manifest: written file paths in job order.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    if workers <= 1:
+        return [_run_plot_job(job) for job in jobs]
+
+    manifest = []
+    profile = instrumentation.active() is not None
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_plot_worker) as pool:
+        for out_path, output, snapshot in pool.map(_render_plot_job, jobs, [profile] * len(jobs)):
+            sys.stdout.write(output)
+            instrumentation.merge(snapshot)
+            manifest.append(out_path)
+    return manifest
+
+
+def make_all_plots(flip_results_df, start_year, end_year, folder_path='results/', show_plot=False, clear_files=False, mode='classic', workers=None):
+    """Render the per-mode figures (concurrently, see render_plot_jobs) and return the written paths."""
     os.makedirs(folder_path, exist_ok=True)
     if clear_files:
         # Remove all .png files in folder_path and its subfolders
@@ -346,19 +419,23 @@ def make_all_plots(flip_results_df, start_year, end_year, folder_path='results/'
                 if file.endswith('.png'):
                     os.remove(os.path.join(root, file))
 
+    jobs = []
     plot_count = 1
     title_suffix = 'Outright Win' if mode == 'classic' else 'No Majority Needed'
     # create a dual-subplot version: top regular, bottom log/symlog
-    make_bar_plot(flip_results_df, start_year, end_year, plot_count, 'flip_margin_ratio', 'Minimum Votes to Flip / Total Votes Cast in Year (%)', f'Percentage Minimum Votes to Flip / Total Votes Cast in Year ({start_year}-{end_year}) ({title_suffix})', f'min_votes_to_flip_ratio_{mode}', folder_path, show_plot, subplot_dual_log=True)
+    jobs.append(plot_job('make_bar_plot', flip_results_df, start_year, end_year, plot_count, 'flip_margin_ratio', 'Minimum Votes to Flip / Total Votes Cast in Year (%)', f'Percentage Minimum Votes to Flip / Total Votes Cast in Year ({start_year}-{end_year}) ({title_suffix})', f'min_votes_to_flip_ratio_{mode}', folder_path, show_plot, subplot_dual_log=True, stage_name=f'{plot_count}-min_votes_to_flip_ratio_{mode}'))
     plot_count += 1
     # make_plot(flip_results_df, start_year, end_year, plot_count, 'flip_margin_ratio', 'Minimum Votes to Flip / Total Votes Cast in Year (%)', f'Percentage Minimum Votes to Flip / Total Votes Cast in Year ({start_year}-{end_year})', 'flip_margin_ratio', folder_path, show_plot, use_log_scale=False)
     # plot_count += 1
-    make_bar_plot(flip_results_df, start_year, end_year, plot_count, 'popular_margin_ratio', 'Popular Vote Margin / Total Votes Cast in Year (%)', f'Percentage Popular Vote Margin / Total Votes Cast in Year ({start_year}-{end_year})', 'pop_margin_ratio', folder_path, show_plot, subplot_dual_log=False)
+    jobs.append(plot_job('make_bar_plot', flip_results_df, start_year, end_year, plot_count, 'popular_margin_ratio', 'Popular Vote Margin / Total Votes Cast in Year (%)', f'Percentage Popular Vote Margin / Total Votes Cast in Year ({start_year}-{end_year})', 'pop_margin_ratio', folder_path, show_plot, subplot_dual_log=False, stage_name=f'{plot_count}-pop_margin_ratio'))
     plot_count += 1
-    make_bar_plot(flip_results_df, start_year, end_year, plot_count, 'min_votes_to_flip', 'Minimum Votes to Flip', f'Minimum Votes to Flip Election Result by Year ({start_year}-{end_year}) ({title_suffix})', f'min_votes_to_flip_raw_{mode}', folder_path, show_plot, subplot_dual_log=True)
+    jobs.append(plot_job('make_bar_plot', flip_results_df, start_year, end_year, plot_count, 'min_votes_to_flip', 'Minimum Votes to Flip', f'Minimum Votes to Flip Election Result by Year ({start_year}-{end_year}) ({title_suffix})', f'min_votes_to_flip_raw_{mode}', folder_path, show_plot, subplot_dual_log=True, stage_name=f'{plot_count}-min_votes_to_flip_raw_{mode}'))
     plot_count += 1
-    make_bar_plot(flip_results_df, start_year, end_year, plot_count, 'popular_vote_margin', 'Popular Vote Margin', f'Popular Vote Margin by Year ({start_year}-{end_year})', 'pop_vote_margin_raw', folder_path, show_plot, subplot_dual_log=False)
+    jobs.append(plot_job('make_bar_plot', flip_results_df, start_year, end_year, plot_count, 'popular_vote_margin', 'Popular Vote Margin', f'Popular Vote Margin by Year ({start_year}-{end_year})', 'pop_vote_margin_raw', folder_path, show_plot, subplot_dual_log=False, stage_name=f'{plot_count}-pop_vote_margin_raw'))
     plot_count += 1
-    make_bar_plot(flip_results_df, start_year, end_year, plot_count, 'number_of_flipped_states', 'Number of Flipped States', f'Number of Flipped States by Year ({start_year}-{end_year}) ({title_suffix})', f'number_of_flipped_states_{mode}', folder_path, show_plot)
+    jobs.append(plot_job('make_bar_plot', flip_results_df, start_year, end_year, plot_count, 'number_of_flipped_states', 'Number of Flipped States', f'Number of Flipped States by Year ({start_year}-{end_year}) ({title_suffix})', f'number_of_flipped_states_{mode}', folder_path, show_plot, stage_name=f'{plot_count}-number_of_flipped_states_{mode}'))
     plot_count += 1
-    make_state_frequency_plot(flip_results_df, start_year, end_year, plot_count, folder_path, show_plot)
+    jobs.append(plot_job('make_state_frequency_plot', flip_results_df, start_year, end_year, plot_count, folder_path, show_plot, stage_name=f'{plot_count}-flipped_states_frequency'))
+
+    # interactive windows can only be shown from this process
+    return render_plot_jobs(jobs, workers=1 if show_plot else workers)
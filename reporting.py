@@ -1,8 +1,19 @@
+import io
+import json
 import os
 
+import instrumentation
 
-def generate_year_results(year, winner_name, winner, winner_electoral_votes, loser_name, loser, loser_electoral_votes, total_votes_winner, total_votes_loser, popular_vote_margin, electoral_college_votes_to_win, flipped_states_votes_dict, min_votes_to_flip, number_of_flipped_states, abs_popular_vote_margin, total_votes_in_year, best_v, start_year, end_year, filename=None, print_results=True, mode='classic', other_parties=None, skip_majority=False):
-    """Print and persist per-year summary details."""
+
+def generate_year_results(year, winner_name, winner, winner_electoral_votes, loser_name, loser, loser_electoral_votes, total_votes_winner, total_votes_loser, popular_vote_margin, electoral_college_votes_to_win, flipped_states_votes_dict, min_votes_to_flip, number_of_flipped_states, abs_popular_vote_margin, total_votes_in_year, best_v, start_year, end_year, filename=None, print_results=True, mode='classic', other_parties=None, skip_majority=False, sink=None, section=None, output_root=None):
+    """Print and persist per-year summary details.
+
+    sink: optional ReportSink holding the run's open report files; without one the
+        section is appended to the TXT file directly
+    section: the already rendered text from render_year_section, so a section
+        written to several files is only formatted once
+    output_root: folder the mode's output folder is created under (default: current directory)
+    """
     if best_v + loser_electoral_votes >= electoral_college_votes_to_win and mode == 'no_majority' and skip_majority:
         return
     popular_vote_margin = total_votes_winner - total_votes_loser
@@ -122,21 +133,43 @@ def generate_year_results(year, winner_name, winner, winner_electoral_votes, los
         print(f'Total number of flipped votes: {min_votes_to_flip} across {number_of_flipped_states} states, Ratio to Popular Vote Margin: {100 * min_votes_to_flip / abs_popular_vote_margin:.5f}%, Ratio to Total Votes in Year: {100 * min_votes_to_flip / total_votes_in_year:.5f}%')
         print(f'New Winner:{loser_name} ({loser}) with {best_v+loser_electoral_votes} electoral votes vs {winner_name} ({winner}) with {winner_electoral_votes-best_v} electoral votes\n')
 
-    # Map modes to output folders (user preference):
-    # classic -> results/, no_majority -> no_majority/
-    folder_map = {
-        'classic': 'results',
-        'no_majority': 'no_majority'
+    if section is None:
+        section = render_year_section(
+            year, winner_name, winner, winner_electoral_votes, loser_name, loser, loser_electoral_votes,
+            total_votes_winner, total_votes_loser, popular_vote_margin, electoral_college_votes_to_win,
+            flipped_states_votes_dict, min_votes_to_flip, number_of_flipped_states, abs_popular_vote_margin,
+            total_votes_in_year, best_v, other_parties=other_parties,
+        )
+    # machine-readable twin of the section, so consumers never parse the TXT
+    record = {
+        'year': int(year),
+        'mode': mode,
+        'min_votes_to_flip': int(min_votes_to_flip),
+        'number_of_flipped_states': int(number_of_flipped_states),
+        'electoral_votes_flipped': int(best_v),
+        'flipped_states': list(flipped_states_votes_dict),
+        # percentages rounded as printed in the section
+        'ratio_to_popular_margin': round(float(100 * min_votes_to_flip / abs_popular_vote_margin), 5),
+        'ratio_to_total_votes': round(float(100 * min_votes_to_flip / total_votes_in_year), 5),
+        'section': section,
     }
-    folder = folder_map.get(mode, os.path.join('results', mode))
-    os.makedirs(folder, exist_ok=True)
-    # Choose the correct filename depending on mode
-    if filename:
-        txt_name = filename + f'_{start_year}-{end_year}.txt'
-    else:
-        txt_name = f'no_majority_results_{start_year}-{end_year}.txt' if mode == 'no_majority' else f'flip_results_{start_year}-{end_year}.txt'
+    path = report_path(start_year, end_year, mode=mode, filename=filename, output_root=output_root)
+    if sink is not None:
+        sink.write(path, section)
+        sink.write_record(records_path(path), record)
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
     # Append to the text summary file for the selected mode
-    with open(os.path.join(folder, txt_name), 'a') as f:
+    with open(path, 'a') as f:
+        f.write(section)
+    with open(records_path(path), 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+def render_year_section(year, winner_name, winner, winner_electoral_votes, loser_name, loser, loser_electoral_votes, total_votes_winner, total_votes_loser, popular_vote_margin, electoral_college_votes_to_win, flipped_states_votes_dict, min_votes_to_flip, number_of_flipped_states, abs_popular_vote_margin, total_votes_in_year, best_v, other_parties=None):
+    """Render one year's text summary section (as appended to the TXT report) into a string."""
+    popular_vote_margin = total_votes_winner - total_votes_loser
+    with io.StringIO() as f:
         f.write(f'Year: {year}\n')
         f.write(f'\tOriginal Winner:\n\t\t{winner_name} ({winner}) with {winner_electoral_votes} electoral votes ({electoral_college_votes_to_win} needed)\n\t\t\tvs {loser_name} ({loser}) with {loser_electoral_votes} electoral votes \n')
         # include the single other party/candidate with the least EVs in the text output
@@ -337,3 +370,83 @@ def generate_year_results(year, winner_name, winner, winner_electoral_votes, los
                 # fallback to previous simple line if something goes wrong
                 f.write('\tNO MAJORITY\n')
             f.write('\n')
+        return f.getvalue()
+
+
+# Map modes to output folders (user preference):
+# classic -> results/, no_majority -> no_majority/
+REPORT_FOLDERS = {
+    'classic': 'results',
+    'no_majority': 'no_majority'
+}
+
+
+def report_folder(mode='classic', output_root=None):
+    """Output folder for a mode (classic -> results/, no_majority -> no_majority/), under output_root if given."""
+    folder = REPORT_FOLDERS.get(mode, os.path.join('results', mode))
+    return os.path.join(output_root, folder) if output_root else folder
+
+
+def report_path(start_year, end_year, mode='classic', filename=None, output_root=None):
+    """Path of the TXT summary file for a mode."""
+    folder = report_folder(mode, output_root)
+    # Choose the correct filename depending on mode
+    if filename:
+        txt_name = filename + f'_{start_year}-{end_year}.txt'
+    else:
+        txt_name = f'no_majority_results_{start_year}-{end_year}.txt' if mode == 'no_majority' else f'flip_results_{start_year}-{end_year}.txt'
+    return os.path.join(folder, txt_name)
+
+
+def records_path(txt_path):
+    """Path of the JSONL record stream that accompanies a TXT summary file."""
+    return os.path.splitext(txt_path)[0] + '.jsonl'
+
+
+def read_year_records(path):
+    """Load the per-year records written next to a TXT summary, in file order."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class ReportSink:
+    """Buffered writers for every TXT report file of a run.
+
+    Each file is opened (truncated) once, on first use or via open(), and stays
+    open until close(), so a run costs a few large writes per file instead of
+    an open/append cycle per year section.
+    """
+
+    def __init__(self, buffer_size=1 << 16):
+        self.buffer_size = buffer_size
+        self._files = {}
+
+    def open(self, path):
+        if path not in self._files:
+            folder = os.path.dirname(path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self._files[path] = open(path, 'w', buffering=self.buffer_size)
+            instrumentation.count('files_written')
+        return self._files[path]
+
+    def write(self, path, text):
+        self.open(path).write(text)
+
+    def write_record(self, path, record):
+        self.open(path).write(json.dumps(record) + '\n')
+
+    def flush(self):
+        for f in self._files.values():
+            f.flush()
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,310 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from analysis import DP_INF
+from election_dataset import PARTIES
+from election_loader import load_dataset
+from election_metrics import closeness_grid
+
+
+def _district_rows(year_data):
+    """Rows of congressional-district units (ME-02, NE-02, ...), which carry no Senate EVs."""
+    return np.array(['-' in po for po in year_data['state_po'].tolist()], dtype=bool)
+
+
+def _dc_rows(year_data):
+    return year_data['state_po'] == 'DC'
+
+
+def _cap_dc(year_data, ev):
+    """23rd Amendment: DC (when it votes) gets no more EVs than the least populous state."""
+    dc = _dc_rows(year_data) & (year_data['electoral_votes'] > 0)
+    if dc.any():
+        states = ~_dc_rows(year_data) & ~_district_rows(year_data) & (ev > 0)
+        if states.any():
+            ev[dc] = np.minimum(ev[dc], ev[states].min())
+    return ev
+
+
+def official(year_data):
+    """The EVs as recorded in the data."""
+    return year_data['electoral_votes'].copy()
+
+
+def no_dc(year_data):
+    """DC's electoral votes removed (no 23rd Amendment)."""
+    ev = official(year_data)
+    ev[_dc_rows(year_data)] = 0
+    return ev
+
+
+def no_senate(year_data):
+    """The two Senate EVs of every state removed; DC is capped at the smallest state."""
+    ev = official(year_data)
+    states = ~_dc_rows(year_data) & ~_district_rows(year_data) & (ev > 0)
+    ev[states] -= 2
+    return _cap_dc(year_data, ev)
+
+
+def house_size(seats, basis='seats'):
+    """Scenario with a House of `seats` members apportioned by Huntington-Hill.
+
+    The population proxy is each state's current House delegation (basis='seats',
+    i.e. a proportional rescale) or its total turnout (basis='votes'). Every state
+    gets at least one seat plus its two Senate EVs; district units keep their EV
+    and the rest goes to the state-wide row; DC is capped at the smallest state.
+    """
+    if basis not in ('seats', 'votes'):
+        raise ValueError(f"basis must be 'seats' or 'votes', got {basis!r}")
+
+    def scenario(year_data):
+        ev = official(year_data)
+        district = _district_rows(year_data)
+        state_rows = np.flatnonzero(~_dc_rows(year_data) & ~district & (ev > 0))
+        if len(state_rows) == 0:
+            return ev
+        # district units belong to the state-wide row whose postal code prefixes theirs
+        po = year_data['state_po'].tolist()
+        owner = {po[i]: i for i in state_rows}
+        district_ev = np.zeros(len(ev), dtype=np.int64)
+        for i in np.flatnonzero(district & (ev > 0)):
+            district_ev[owner[po[i].split('-')[0]]] += ev[i]
+        if basis == 'seats':
+            population = (ev + district_ev - 2)[state_rows].astype(np.float64)
+        else:
+            population = year_data['totalvotes'][state_rows].astype(np.float64)
+        if seats < len(state_rows):
+            raise ValueError(f'{year_data.year}: a House of {seats} cannot give each of {len(state_rows)} states a seat')
+
+        # priority of the n-th extra seat of each state: population / sqrt(n (n + 1)), n >= 1
+        n = np.arange(1, seats - len(state_rows) + 1, dtype=np.float64)
+        priorities = population[:, None] / np.sqrt(n * (n + 1))[None, :]
+        extra = seats - len(state_rows)
+        counts = np.ones(len(state_rows), dtype=np.int64)
+        if extra > 0:
+            winners = np.argpartition(priorities.ravel(), -extra)[-extra:] // len(n)
+            counts += np.bincount(winners, minlength=len(state_rows))
+        ev[state_rows] = counts + 2 - district_ev[state_rows]
+        return _cap_dc(year_data, ev)
+
+    scenario.__doc__ = f'House of {seats} apportioned by Huntington-Hill ({basis} basis).'
+    return scenario
+
+
+# Built-in scenarios by name: f(year_data) -> EVs per row of the year (same row order)
+SCENARIOS = {
+    'official': official,
+    'no_dc': no_dc,
+    'no_senate': no_senate,
+}
+
+
+def scenario_party_ev(year_data, weights):
+    """Per-party EVs of each scenario: the recorded per-party totals minus (or plus) the EVs
+    each scenario takes from (or gives to) a row, charged to that row's winner.
+
+    weights: (n_scenarios, n_rows) EVs per scenario. The recorded totals keep every faithless
+    or split elector of the rows a scenario leaves alone; the data has no per-row split, so a
+    changed row's EVs are charged to its winner (e.g. no_dc in 2000: D 267 - DC's 3 = 264).
+    """
+    recorded = np.array([year_data.first(f'{p}_electoral') for p in PARTIES], dtype=np.int64)
+    change = weights - year_data['electoral_votes'][None, :]
+    code = year_data['state_winner_code'].astype(np.int64)
+    by_party = np.stack([change[:, code == i].sum(axis=1) for i in range(len(PARTIES))], axis=1)
+    return recorded[None, :] + by_party
+
+
+def _batched_knapsack(ev_weights, flip_costs, max_electoral_votes):
+    """0/1 min-cost knapsack for a batch of scenarios with per-scenario weights.
+
+    ev_weights and flip_costs have shape (n_scenarios, n_items); column j is the
+    j-th item of each scenario (its own item order). Each item is relaxed for all
+    scenarios at once by gathering dp[v - w] per row. Returns the
+    (n_scenarios, EV) cost table and a bit-packed take table per item.
+    """
+    n_scen = ev_weights.shape[0]
+    n_ev = max_electoral_votes + 1
+    dp = np.full((n_scen, n_ev), DP_INF, dtype=np.int64)
+    dp[:, 0] = 0
+    positions = np.arange(n_ev)[None, :]
+    take_bits = []
+    for j in range(ev_weights.shape[1]):
+        source = positions - ev_weights[:, j:j + 1]
+        prev = np.take_along_axis(dp, np.maximum(source, 0), axis=1)
+        candidate = np.where((source >= 0) & (prev < DP_INF), prev + flip_costs[:, j:j + 1], DP_INF)
+        improved = candidate < dp
+        dp = np.where(improved, candidate, dp)
+        take_bits.append(np.packbits(improved, axis=1))
+    return dp, take_bits
+
+
+def _solve_targets(ev_weights, flip_costs, order, targets):
+    """Cheapest item sets reaching each scenario's EV target (fewest EVs on ties).
+
+    Returns (min_votes, electoral_votes_flipped, included) where min_votes is -1
+    for an unreachable target and included[s, i] marks item i (original order).
+    """
+    n_scen, n_items = ev_weights.shape
+    rows = np.arange(n_scen)[:, None]
+    w = ev_weights[rows, order]
+    c = flip_costs[rows, order]
+    max_ev = int(w.sum(axis=1).max()) if n_items else 0
+    dp, take_bits = _batched_knapsack(w, c, max_ev)
+
+    min_votes = np.zeros(n_scen, dtype=np.int64)
+    ev_flipped = np.zeros(n_scen, dtype=np.int64)
+    included = np.zeros((n_scen, n_items), dtype=bool)
+    positions = np.arange(max_ev + 1)[None, :]
+    masked = np.where(positions >= np.maximum(targets, 0)[:, None], dp, DP_INF)
+    best_v = np.argmin(masked, axis=1)
+    best_cost = masked[np.arange(n_scen), best_v]
+    needed = targets > 0
+    reachable = needed & (best_cost < DP_INF) & (targets <= max_ev)
+    min_votes[needed] = -1
+    min_votes[reachable] = best_cost[reachable]
+    ev_flipped[reachable] = best_v[reachable]
+
+    v = np.where(reachable, best_v, 0)
+    scen = np.arange(n_scen)
+    for j in range(n_items - 1, -1, -1):
+        took = ((take_bits[j][scen, v // 8] >> (7 - v % 8)) & 1).astype(bool) & (v > 0)
+        included[scen[took], order[took, j]] = True
+        v = v - np.where(took, w[:, j], 0)
+    return min_votes, ev_flipped, included
+
+
+def evaluate_year(year_data, scenarios, recount_threshold=0.005):
+    """Winners, flip results and metrics of one year under every scenario at once.
+
+    scenarios: {name: f(year_data) -> EVs per row}. The vote columns are shared;
+    only the EV vector changes. Party tallies come from scenario_party_ev, so the
+    'official' scenario reproduces the recorded totals (faithless electors included).
+    Returns a list of row dicts, one per scenario.
+    """
+    names = list(scenarios)
+    weights = np.stack([np.asarray(scenarios[n](year_data), dtype=np.int64) for n in names])
+
+    code = year_data['state_winner_code'].astype(np.int64)
+    party_ev = scenario_party_ev(year_data, weights)
+    total_ev = weights.sum(axis=1)
+    ev_to_win = total_ev // 2 + 1
+    recorded_total = year_data['electoral_votes'].sum()
+    # years whose recorded threshold differs from the row sum keep it in the unchanged scenarios
+    ev_to_win = np.where(total_ev == recorded_total, year_data.first('electoral_votes_to_win'), ev_to_win)
+
+    # EV winner per scenario; the recorded winner keeps ties, the runner-up takes its place if overtaken
+    winner = year_data.first('overall_winner')
+    runner_up = year_data.first('overall_runner_up')
+    w_idx, r_idx = PARTIES.index(winner), PARTIES.index(runner_up)
+    swapped = party_ev[:, r_idx] > party_ev[:, w_idx]
+    new_winner = np.where(swapped, r_idx, w_idx)
+    new_loser = np.where(swapped, w_idx, r_idx)
+    scen = np.arange(len(names))
+    winner_ev = party_ev[scen, new_winner]
+    loser_ev = party_ev[scen, new_loser]
+
+    # per-row flip cost for each scenario's loser (rows the loser won are not candidates)
+    votes = np.stack([year_data[f'{p}_votes'] for p in PARTIES], axis=1)
+    rows = np.arange(len(code))
+    candidate = code[None, :] != new_loser[:, None]
+    flip_costs = (votes[rows, code][None, :] - votes[:, new_loser].T) // 2 + 1
+    item_weights = np.where(candidate, weights, 0)
+    flip_costs = np.where(candidate, flip_costs, 0)
+    # cheapest votes per EV first, as in the single-year DP
+    ratio = np.where(item_weights > 0, flip_costs / np.maximum(item_weights, 1), np.inf)
+    order = np.argsort(ratio, axis=1, kind='stable')
+
+    targets = {
+        'classic': ev_to_win - loser_ev,
+        'no_majority': np.maximum(0, winner_ev - (total_ev // 2)),
+    }
+    solved = {mode: _solve_targets(item_weights, flip_costs, order, t) for mode, t in targets.items()}
+
+    # metrics: the popular vote is unchanged, the flip cost and the EV shares move
+    D = year_data['D_votes']
+    R = year_data['R_votes']
+    S = int(D.sum() + R.sum())
+    m = abs(int(D.sum()) - int(R.sum())) / S if S > 0 else float('nan')
+    f = np.where(solved['classic'][0] >= 0, solved['classic'][0], np.nan)
+    closeness = closeness_grid(np.full(len(names), m), f, np.full(len(names), float(S)), np.full(len(names), 0.5))
+    two_party = D + R
+    close = (two_party > 0) & (np.abs(D - R) < recount_threshold * two_party)
+    close_ev = (weights * close[None, :]).sum(axis=1)
+
+    states = year_data['state'].tolist()
+    results = []
+    for s, name in enumerate(names):
+        row = {
+            'year': year_data.year,
+            'scenario': name,
+            'total_electoral_votes': int(total_ev[s]),
+            'electoral_votes_to_win': int(ev_to_win[s]),
+            **{f'{p}_electoral': int(party_ev[s, i]) for i, p in enumerate(PARTIES)},
+            'winner': PARTIES[new_winner[s]],
+            'runner_up': PARTIES[new_loser[s]],
+            'winner_changed': bool(swapped[s]),
+        }
+        for mode, (min_votes, ev_flipped, included) in solved.items():
+            row[f'{mode}_min_votes_to_flip'] = int(min_votes[s])
+            row[f'{mode}_electoral_votes_flipped'] = int(ev_flipped[s])
+            row[f'{mode}_flipped_states'] = '; '.join(st for st, used in zip(states, included[s]) if used)
+        f_over_S = f[s] / S if S > 0 else float('nan')
+        row.update({
+            'm': m,
+            'f': f[s],
+            'f_over_S': f_over_S,
+            'EC_share': winner_ev[s] / total_ev[s] if total_ev[s] > 0 else float('nan'),
+            **{metric: float(values[s]) for metric, values in closeness.items()},
+            'recount_vulnerability_V': close_ev[s] / total_ev[s] if total_ev[s] > 0 else float('nan'),
+            'institutional_distortion_D': abs(f_over_S - m) / m if m and not np.isnan(m) else float('nan'),
+        })
+        results.append(row)
+    return results
+
+
+def evaluate_scenarios(dataset, scenarios=None, start_year=None, end_year=None, recount_threshold=0.005):
+    """evaluate_year over a year range; returns one DataFrame row per (year, scenario)."""
+    if scenarios is None:
+        scenarios = SCENARIOS
+    rows = []
+    for year_data in dataset.iter_years(start_year, end_year):
+        rows += evaluate_year(year_data, scenarios, recount_threshold=recount_threshold)
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    from flexible_vote_margins import choice_list, parse_years
+
+    parser = argparse.ArgumentParser(description='Flip results and metrics under alternative electoral vote apportionments.')
+    parser.add_argument('--years', type=parse_years, default=(1900, 2024), help='YEAR or START-END (default: 1900-2024)')
+    parser.add_argument('--scenarios', type=choice_list(tuple(SCENARIOS)), default=tuple(SCENARIOS),
+                        help=f'comma-separated built-in scenarios (default: {",".join(SCENARIOS)})')
+    parser.add_argument('--house-sizes', type=lambda s: [int(x) for x in s.split(',') if x], default=[],
+                        help='comma-separated House sizes to add as Huntington-Hill scenarios, e.g. 435,600')
+    parser.add_argument('--basis', choices=('seats', 'votes'), default='seats',
+                        help='population proxy for --house-sizes (default: current House seats)')
+    parser.add_argument('--csv', default='1900_2024_election_results.fixed.csv')
+    parser.add_argument('--output-root', default=None)
+    args = parser.parse_args(argv)
+
+    scenarios = {name: SCENARIOS[name] for name in args.scenarios}
+    for seats in args.house_sizes:
+        scenarios[f'house_{seats}_{args.basis}'] = house_size(seats, args.basis)
+
+    dataset = load_dataset(args.csv)
+    start_year, end_year = args.years
+    results = evaluate_scenarios(dataset, scenarios, start_year, end_year)
+    if results.empty:
+        parser.error(f'no election data for {start_year}-{end_year}')
+    results_dir = os.path.join(args.output_root or '', 'scenarios')
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, f'scenarios-{start_year}-{end_year}.csv')
+    results.to_csv(path, index=False)
+    print(f'Wrote {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -302,5 +302,13 @@ export default {
       1964: 'D', 1968: 'R', 1972: 'R', 1976: 'R', 1980: 'R', 1984: 'R', 1988: 'R', 1992: 'R',
       1996: 'R', 2000: 'R', 2004: 'R', 2008: 'R', 2012: 'R', 2016: 'R', 2020: 'R', 2024: 'R',
     },
+  },
+  districts: {
+    'ME-02': {
+      2016: 'R', 2020: 'R', 2024: 'R',
+    },
+    'NE-02': {
+      2008: 'D', 2020: 'D', 2024: 'D',
+    },
   }
 };
@@ -0,0 +1,162 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from election_loader import load_dataset
+
+
+class SwingCurves:
+    """Cumulative-EV-versus-uniform-swing curves of every year.
+
+    For each year the two-party loser's lost states are ordered by the swing
+    that flips them (votes to flip as a share of the state's two-party vote);
+    cum_ev is the EVs the loser has gained once the swing reaches each state's
+    threshold. All years live in flat arrays, year i in [offsets[i], offsets[i + 1]).
+    """
+
+    def __init__(self, years, offsets, swing, cum_ev, rows, states, needed_ev):
+        self.years = years
+        self.offsets = offsets
+        self.swing = swing
+        self.cum_ev = cum_ev
+        self.rows = rows
+        self.states = states
+        self.needed_ev = needed_ev
+        self._year_index = {int(y): i for i, y in enumerate(years.tolist())}
+        # segment keys: per-year cumulative EVs shifted apart so one searchsorted serves every year
+        self._stride = int(cum_ev.max()) + 1 if len(cum_ev) else 1
+        segment = np.repeat(np.arange(len(years)), np.diff(offsets))
+        self._keys = segment * self._stride + cum_ev
+
+    def _indices(self, years):
+        if years is None:
+            return np.arange(len(self.years))
+        return np.array([self._year_index[int(y)] for y in np.atleast_1d(years)], dtype=np.int64)
+
+    def curve(self, year):
+        """(swing thresholds, cumulative EVs, states) of one year, cheapest state first."""
+        i = self._year_index[int(year)]
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return self.swing[start:stop], self.cum_ev[start:stop], self.states[start:stop]
+
+    def _crossing(self, targets, idx):
+        """Position of the first curve point reaching each target (-1 if never)."""
+        targets = np.broadcast_to(np.asarray(targets, dtype=np.int64), idx.shape)
+        pos = np.searchsorted(self._keys, idx * self._stride + np.maximum(targets, 0), side='left')
+        return np.where(pos < self.offsets[idx + 1], pos, -1)
+
+    def swing_for(self, ev_targets, years=None):
+        """Smallest uniform swing giving the loser at least ev_targets EVs (nan if out of reach).
+
+        ev_targets: a scalar, or one target per year in `years` (default: all years)
+        """
+        idx = self._indices(years)
+        targets = np.broadcast_to(np.asarray(ev_targets, dtype=np.int64), idx.shape)
+        pos = self._crossing(targets, idx)
+        sigma = np.where(pos >= 0, self.swing[np.maximum(pos, 0)], np.nan)
+        return np.where(targets <= 0, 0.0, sigma)
+
+    def sigma(self, years=None):
+        """Swing that hands the loser the EVs it needs to win (the margin sensitivity sigma)."""
+        idx = self._indices(years)
+        return self.swing_for(self.needed_ev[idx], years)
+
+    def tipping_points(self, years=None):
+        """{year: tipping-point state}: the state whose flip completes the loser's
+        uniform-swing path to a majority (None when no flip is needed or possible)."""
+        idx = self._indices(years)
+        pos = self._crossing(self.needed_ev[idx], idx)
+        return {int(self.years[i]): (self.states[p] if p >= 0 and self.needed_ev[i] > 0 else None)
+                for i, p in zip(idx.tolist(), pos.tolist())}
+
+    def to_frame(self):
+        """Long table: year, state, swing, cumulative_ev, with the tipping point flagged."""
+        segment = np.repeat(np.arange(len(self.years)), np.diff(self.offsets))
+        tipping = self._crossing(self.needed_ev, np.arange(len(self.years)))
+        is_tipping = np.zeros(len(self.swing), dtype=bool)
+        is_tipping[tipping[(tipping >= 0) & (self.needed_ev > 0)]] = True
+        return pd.DataFrame({
+            'year': self.years[segment],
+            'state': self.states,
+            'swing': self.swing,
+            'cumulative_ev': self.cum_ev,
+            'tipping_point': is_tipping,
+        })
+
+
+def compute_swing_curves(dataset):
+    """Build SwingCurves for every year of the dataset in one column-wise pass.
+
+    Uses the same definitions as compute_state_metrics: the loser is the major
+    party that did not win, a state's threshold is (|D - R| // 2 + 1) / (D + R),
+    and the loser needs electoral_votes_to_win minus its recorded EVs.
+    """
+    cols = dataset.columns
+    years = dataset.years
+    starts = np.array([dataset.offsets[int(y)][0] for y in years], dtype=np.int64)
+    counts = np.array([dataset.offsets[int(y)][1] - dataset.offsets[int(y)][0] for y in years], dtype=np.int64)
+    year_idx = np.repeat(np.arange(len(years)), counts)
+
+    D = cols['D_votes']
+    R = cols['R_votes']
+    two_party = D + R
+    margin = np.abs(D - R)
+    valid = two_party > 0
+    flip_share = np.where(margin > 0, margin // 2 + 1, 0) / np.where(valid, two_party, 1)
+
+    winner = cols['overall_winner'][starts]
+    loser = np.where(winner == 'R', 'D', 'R')
+    loser_ec = np.where(winner == 'D', cols['R_electoral'][starts], cols['D_electoral'][starts])
+    needed_ev = np.maximum(cols['electoral_votes_to_win'][starts] - loser_ec, 0)
+
+    lost = np.flatnonzero(valid & (cols['party_win'] != loser[year_idx]))
+    order = lost[np.lexsort((flip_share[lost], year_idx[lost]))]
+    group = year_idx[order]
+    ev_sorted = cols['electoral_votes'][order]
+    cum_ev = np.cumsum(ev_sorted)
+    first = np.r_[True, group[1:] != group[:-1]] if len(group) else np.zeros(0, dtype=bool)
+    # restart the running sum at every year's first state
+    cum_ev -= np.maximum.accumulate(np.where(first, cum_ev - ev_sorted, 0))
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(group, minlength=len(years)))])
+
+    return SwingCurves(years, offsets, flip_share[order], cum_ev, order, cols['state'][order], needed_ev)
+
+
+def main(argv=None):
+    from flexible_vote_margins import parse_years
+
+    parser = argparse.ArgumentParser(description='Uniform-swing curves and tipping-point states for every year.')
+    parser.add_argument('--years', type=parse_years, default=(1900, 2024), help='YEAR or START-END (default: 1900-2024)')
+    parser.add_argument('--csv', default='1900_2024_election_results.fixed.csv')
+    parser.add_argument('--output-root', default=None)
+    args = parser.parse_args(argv)
+
+    dataset = load_dataset(args.csv)
+    start_year, end_year = args.years
+    curves = dataset.swing_curves()
+    years = [y for y in dataset.years.tolist() if start_year <= y <= end_year]
+    if not years:
+        parser.error(f'no election data for {start_year}-{end_year}')
+
+    results_dir = os.path.join(args.output_root or '', 'swing')
+    os.makedirs(results_dir, exist_ok=True)
+    frame = curves.to_frame()
+    curve_path = os.path.join(results_dir, f'swing_curves-{start_year}-{end_year}.csv')
+    frame[frame['year'].isin(years)].to_csv(curve_path, index=False)
+    tipping = curves.tipping_points(years)
+    summary = pd.DataFrame({
+        'year': years,
+        'needed_ev': curves.needed_ev[curves._indices(years)],
+        'sigma': curves.sigma(years),
+        'tipping_point': [tipping[y] for y in years],
+    })
+    summary_path = os.path.join(results_dir, f'tipping_points-{start_year}-{end_year}.csv')
+    summary.to_csv(summary_path, index=False)
+    print(f'Wrote {curve_path}')
+    print(f'Wrote {summary_path}')
+
+
+if __name__ == '__main__':
+    main()
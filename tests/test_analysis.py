@@ -0,0 +1,53 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis import solve_flip
+
+
+def two_party_year(seed, n_states=9):
+    """A small random two-party year in the input CSV schema."""
+    rng = np.random.default_rng(seed)
+    d_votes = rng.integers(100, 1000, size=n_states)
+    r_votes = rng.integers(100, 1000, size=n_states)
+    return pd.DataFrame({
+        'year': 3000,
+        'state': [f'S{i}' for i in range(n_states)],
+        'state_po': [f'S{i}' for i in range(n_states)],
+        'party_win': np.where(d_votes > r_votes, 'D', 'R'),
+        'D_votes': d_votes,
+        'R_votes': r_votes,
+        'T_votes': 0,
+        'electoral_votes': rng.integers(1, 8, size=n_states),
+        'totalvotes': d_votes + r_votes,
+    })
+
+
+def brute_force_cost(winner_states_dict, votes_to_win):
+    """Cheapest flip reaching votes_to_win over every subset of the states."""
+    states = list(winner_states_dict.items())
+    best = None
+    for k in range(1, len(states) + 1):
+        for subset in itertools.combinations(states, k):
+            if sum(d['electoral_votes'] for _, d in subset) >= votes_to_win:
+                cost = sum(d['votes_to_flip'] for _, d in subset)
+                best = cost if best is None else min(best, cost)
+    return best
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_dp_solution_is_exact(seed):
+    year = two_party_year(seed)
+    for loser in ('D', 'R'):
+        max_ev = int(year.loc[year['party_win'] != loser, 'electoral_votes'].sum())
+        for votes_to_win in range(1, max_ev + 1):
+            solution = solve_flip(year, loser, votes_to_win, solver='dp')
+            states = solution.flipped_states
+            info = solution.winner_states_dict
+            assert solution.gap == 0
+            assert len(set(states)) == len(states)
+            assert sum(info[s]['votes_to_flip'] for s in states) == solution.min_votes_to_flip
+            assert sum(info[s]['electoral_votes'] for s in states) == solution.best_v >= votes_to_win
+            assert solution.min_votes_to_flip == brute_force_cost(info, votes_to_win)
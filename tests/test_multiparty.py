@@ -0,0 +1,77 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from election_dataset import PARTIES, ElectionDataset
+from multiparty import multiparty_flips, transfer_costs
+
+
+def three_party_year(seed, n_states=8):
+    """A small random D/R/T year in the input CSV schema, or None when no party has a majority."""
+    rng = np.random.default_rng(seed)
+    # close races with a weaker third party, so cheap transfers can overshoot a majority
+    votes = rng.integers(400, 600, size=(n_states, len(PARTIES))) // np.array([1, 1, 2])
+    ev = rng.integers(1, 20, size=n_states)
+    code = votes.argmax(axis=1)
+    party_ev = np.array([ev[code == p].sum() for p in range(len(PARTIES))])
+    ev_to_win = int(ev.sum()) // 2 + 1
+    if party_ev.max() < ev_to_win:
+        return None
+    order = np.argsort(-party_ev, kind='stable')
+    df = pd.DataFrame({
+        'year': 3000,
+        'state': [f'S{i}' for i in range(n_states)],
+        'state_po': [f'S{i}' for i in range(n_states)],
+        'party_win': [PARTIES[c] for c in code],
+        'overall_winner': PARTIES[order[0]],
+        'overall_runner_up': PARTIES[order[1]],
+        'electoral_votes': ev,
+        'total_electoral_votes': int(ev.sum()),
+        'electoral_votes_to_win': ev_to_win,
+        'totalvotes': votes.sum(axis=1),
+    })
+    for p, party in enumerate(PARTIES):
+        df[f'{party}_votes'] = votes[:, p]
+        df[f'{party}_electoral'] = int(party_ev[p])
+    return ElectionDataset(df).year(3000)
+
+
+def brute_force_no_majority(year_data):
+    """Cheapest reassignment of rows to parties that leaves every party short of a majority."""
+    ev = year_data['electoral_votes']
+    code = year_data['state_winner_code'].astype(np.int64)
+    costs = transfer_costs(year_data)
+    rows = np.arange(len(ev))
+    assignments = np.array(list(itertools.product(range(len(PARTIES)), repeat=len(ev))))
+    final = np.stack([np.where(assignments == p, ev, 0).sum(axis=1) for p in range(len(PARTIES))], axis=1)
+    cost = np.where(assignments != code, costs[rows, assignments], 0).sum(axis=1)
+    blocked = final.max(axis=1) < year_data.first('electoral_votes_to_win')
+    return int(cost[blocked].min()) if blocked.any() else None
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_no_majority_matches_brute_force(seed):
+    year_data = three_party_year(seed)
+    if year_data is None:
+        pytest.skip('no majority holder in this instance')
+    row = next(r for r in multiparty_flips(year_data) if r['outcome'] == 'no_majority')
+    expected = brute_force_no_majority(year_data)
+    assert row['min_votes_to_flip'] == (expected if expected is not None else -1)
+
+    # the reported flips reach that cost and leave every party short of a majority
+    states = year_data['state'].tolist()
+    ev = year_data['electoral_votes']
+    costs = transfer_costs(year_data)
+    final = np.array([year_data.first(f'{p}_electoral') for p in PARTIES])
+    cost = 0
+    for flip in filter(None, row['flipped_states'].split('; ')):
+        state, party = flip.split('->')
+        r, p = states.index(state), PARTIES.index(party)
+        final[year_data['state_winner_code'][r]] -= ev[r]
+        final[p] += ev[r]
+        cost += int(costs[r, p])
+    if expected is not None:
+        assert cost == expected
+        assert final.max() < year_data.first('electoral_votes_to_win')
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""Benchmark suite for the flip DP, the pipeline, metrics, plotting and the data fixer.
+
+Every workload is fixed and seeded, so two runs on the same machine time the
+same work. Each workload is set up (untimed) and then timed --repeat times;
+the median, min and every run are written as JSON. With --baseline the run is
+compared against an earlier JSON and workloads whose median slowed down by
+more than --threshold are flagged (exit status 1).
+
+Usage:
+  python tools/benchmark.py [--repeat 3] [--only flip_dp,fixer] [--output-root DIR]
+  python tools/benchmark.py --baseline baseline.json --threshold 0.1
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import data_fixer  # noqa: E402
+from analysis import compute_flip_for_year  # noqa: E402
+from election_dataset import ElectionDataset  # noqa: E402
+from election_loader import load_dataset  # noqa: E402
+from election_metrics import compute_metrics_for_all_years  # noqa: E402
+from flexible_vote_margins import get_flip_results, parse_years  # noqa: E402
+from monte_carlo import electoral_votes_to_flip  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+CSV = os.path.join(ROOT, '1900_2024_election_results.fixed.csv')
+RAW_CSV = os.path.join(ROOT, '1900_2024_election_results.csv')
+SEED = 0
+
+
+def synthetic_year(n_units, seed=SEED, year=3000):
+    """One synthetic year of n_units two-party units (1-19 EVs each) in the input CSV schema."""
+    rng = np.random.default_rng([seed, n_units])
+    ev = rng.integers(1, 20, size=n_units)
+    d_votes = rng.integers(10_000, 1_000_000, size=n_units)
+    r_votes = rng.integers(10_000, 1_000_000, size=n_units)
+    party_win = np.where(d_votes > r_votes, 'D', 'R')
+    d_ev, r_ev = int(ev[party_win == 'D'].sum()), int(ev[party_win == 'R'].sum())
+    winner, runner_up = ('D', 'R') if d_ev > r_ev else ('R', 'D')
+    return pd.DataFrame({
+        'year': year,
+        'state': [f'UNIT {i:05d}' for i in range(n_units)],
+        'state_po': [f'U{i:05d}' for i in range(n_units)],
+        'D_name': 'D candidate', 'R_name': 'R candidate', 'T_name': '',
+        'party_win': party_win,
+        'D_votes': d_votes, 'R_votes': r_votes, 'T_votes': 0,
+        'overall_winner': winner, 'overall_runner_up': runner_up,
+        'electoral_votes': ev,
+        'winner_votes': np.maximum(d_votes, r_votes), 'loser_votes': np.minimum(d_votes, r_votes),
+        'total_electoral_votes': int(ev.sum()), 'electoral_votes_to_win': int(ev.sum()) // 2 + 1,
+        'D_electoral': d_ev, 'R_electoral': r_ev, 'T_electoral': 0,
+        'totalvotes': d_votes + r_votes,
+    })
+
+
+def _flip_all_years(year_slices):
+    for year_data in year_slices:
+        votes_to_win = electoral_votes_to_flip(year_data, 'classic')
+        if votes_to_win > 0:
+            compute_flip_for_year(year_data, year_data.first('overall_runner_up'), votes_to_win)
+
+
+def write_fixer_inputs(folder, n_rows, n_corrections, seed=SEED):
+    """Tile the raw input CSV (each copy shifted by 1000 years) to n_rows rows and write
+    n_corrections vote corrections spread over them. Returns (csv path, corrections path)."""
+    with open(RAW_CSV, newline='', encoding='utf-8') as fh:
+        reader = csv.DictReader(fh)
+        fieldnames = reader.fieldnames
+        base = list(reader)
+    rows = []
+    for i in range(n_rows):
+        row = dict(base[i % len(base)])
+        row['year'] = str(int(row['year']) + 1000 * (i // len(base)))
+        rows.append(row)
+    csv_path = os.path.join(folder, 'fixer_input.csv')
+    with open(csv_path, 'w', newline='', encoding='utf-8') as fh:
+        writer = csv.DictWriter(fh, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    rng = np.random.default_rng(seed)
+    corrections = []
+    for i in rng.choice(n_rows, size=min(n_corrections, n_rows), replace=False).tolist():
+        row = rows[i]
+        # alternate the two keys the fixer accepts
+        key = {'state': row['state']} if i % 2 else {'state_po': row['state_po']}
+        votes = data_fixer.parse_int(row[f"{row['party_win']}_votes"])
+        corrections.append({'year': int(row['year']), **key, 'changes': {f"{row['party_win']}_votes": votes + 1}})
+    corrections_path = os.path.join(folder, 'fixer_corrections.json')
+    with open(corrections_path, 'w', encoding='utf-8') as fh:
+        json.dump(corrections, fh)
+    return csv_path, corrections_path
+
+
+def workloads(args, workdir):
+    """[(name, params, setup, run)]: setup() is untimed and its result is passed to run()."""
+    start_year, end_year = args.years
+
+    def load():
+        return load_dataset(args.csv, use_cache=False)
+
+    def real_years():
+        return list(load().iter_years(start_year, end_year))
+
+    jobs = [('flip_dp:real', {'years': f'{start_year}-{end_year}'}, real_years, _flip_all_years)]
+    for n_units in args.sizes:
+        jobs.append((f'flip_dp:synthetic-{n_units}', {'units': n_units, 'seed': SEED},
+                     lambda n=n_units: [ElectionDataset(synthetic_year(n)).year(3000)], _flip_all_years))
+
+    pipeline_root = os.path.join(workdir, 'pipeline')
+    jobs.append(('pipeline', {'years': f'{start_year}-{end_year}', 'modes': 'classic,no_majority'}, load,
+                 lambda dataset: get_flip_results(dataset, start_year, end_year, flip_mode='both', output_root=pipeline_root)))
+
+    jobs.append(('metrics', {'years': f'{start_year}-{end_year}'}, load,
+                 lambda dataset: compute_metrics_for_all_years(dataset=dataset, start_year=start_year, end_year=end_year)))
+
+    def plot_setup():
+        import plotting
+        results = get_flip_results(load(), start_year, end_year, flip_mode='classic', write_reports=False, write_csv=False)
+        return plotting, results['classic'][0]
+
+    plots_dir = os.path.join(workdir, 'plots')
+    jobs.append(('plots', {'years': f'{start_year}-{end_year}', 'mode': 'classic', 'workers': args.plot_workers}, plot_setup,
+                 lambda state: state[0].make_all_plots(state[1], start_year, end_year, folder_path=plots_dir,
+                                                       mode='classic', workers=args.plot_workers)))
+
+    fixer_out = os.path.join(workdir, 'fixer_output.csv')
+    fixer_inputs = []
+
+    def fixer_setup():
+        if not fixer_inputs:
+            fixer_inputs.extend(write_fixer_inputs(workdir, args.fixer_rows, args.fixer_corrections))
+        return ['--infile', fixer_inputs[0], '--corrections', fixer_inputs[1], '--out', fixer_out]
+
+    jobs.append(('fixer', {'rows': args.fixer_rows, 'corrections': args.fixer_corrections, 'seed': SEED}, fixer_setup,
+                 data_fixer.main))
+
+    if args.only:
+        jobs = [job for job in jobs if any(job[0] == name or job[0].startswith(name + ':') for name in args.only)]
+    return jobs
+
+
+def run_benchmarks(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, params, setup, run in workloads(args, workdir):
+            runs = []
+            for _ in range(args.repeat):
+                state = setup()
+                # the workloads' own progress output is not part of the measurement
+                with contextlib.redirect_stdout(io.StringIO()):
+                    t0 = time.perf_counter()
+                    run(state)
+                    runs.append(time.perf_counter() - t0)
+            results[name] = {'params': params, 'median_s': statistics.median(runs), 'min_s': min(runs), 'runs': runs}
+            print(f'{name:<28} median {results[name]["median_s"]:8.3f}s  min {results[name]["min_s"]:8.3f}s')
+    return results
+
+
+def compare(results, baseline, threshold, min_delta=0.005):
+    """Per shared workload: baseline and current median and their ratio; a workload
+    regressed when it got more than `threshold` (relative) and min_delta seconds slower."""
+    comparison = {}
+    for name, current in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]['median_s'], current['median_s']
+        ratio = after / before if before > 0 else float('inf')
+        comparison[name] = {
+            'baseline_median_s': before,
+            'median_s': after,
+            'ratio': ratio,
+            'regression': ratio > 1 + threshold and after - before > min_delta,
+        }
+    return comparison
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Time fixed workloads and optionally compare them against a baseline run')
+    ap.add_argument('--years', type=parse_years, default=(1900, 2024), help='YEAR or START-END of the real-data workloads')
+    ap.add_argument('--csv', default=CSV)
+    ap.add_argument('--repeat', type=int, default=3, help='timed runs per workload (default: 3)')
+    ap.add_argument('--only', type=lambda text: [t.strip() for t in text.split(',') if t.strip()], default=None,
+                    help='comma-separated workloads or groups to run, e.g. flip_dp,metrics (default: all)')
+    ap.add_argument('--sizes', type=lambda text: [int(t) for t in text.split(',')], default=[100, 1000, 10000],
+                    help='unit counts of the synthetic flip DP years (default: 100,1000,10000)')
+    ap.add_argument('--fixer-rows', type=int, default=20000, help='rows of the synthetic data fixer input (default: 20000)')
+    ap.add_argument('--fixer-corrections', type=int, default=200, help='corrections applied by the fixer (default: 200)')
+    ap.add_argument('--plot-workers', type=int, default=1, help='plot processes (default: 1, render inline)')
+    ap.add_argument('--baseline', default=None, help='earlier benchmark JSON to compare against')
+    ap.add_argument('--threshold', type=float, default=0.10,
+                    help='relative slowdown of a workload median flagged as a regression (default: 0.10)')
+    ap.add_argument('--output-root', default=None)
+    args = ap.parse_args(argv)
+    if args.repeat < 1:
+        ap.error('--repeat must be at least 1')
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as fh:
+            baseline = json.load(fh)['workloads']
+
+    results = run_benchmarks(args)
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.platform(),
+        'repeat': args.repeat,
+        'workloads': results,
+    }
+    regressions = []
+    if baseline is not None:
+        report['baseline'] = os.path.abspath(args.baseline)
+        report['threshold'] = args.threshold
+        report['comparison'] = compare(results, baseline, args.threshold)
+        for name, row in report['comparison'].items():
+            flag = 'REGRESSION' if row['regression'] else 'ok'
+            print(f'{name:<28} {row["baseline_median_s"]:8.3f}s -> {row["median_s"]:8.3f}s  x{row["ratio"]:.2f}  {flag}')
+            if row['regression']:
+                regressions.append(name)
+
+    results_dir = os.path.join(args.output_root or '', 'benchmarks')
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, 'benchmark-results.json')
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(report, fh, indent=2)
+    print(f'Wrote {path}')
+    if regressions:
+        print(f'{len(regressions)} regression(s): {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,32 +8,15 @@ Usage:
   python tools\ev_report_all.py [YEAR]
 If YEAR is provided, prints only that year.
 """
-import csv
+import os
 import sys
 from collections import defaultdict
 
-CSV = "1900_2024_election_results.fixed.csv"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from election_loader import load_dataset  # noqa: E402
 
-def choose_winner_by_votes(row):
-    # row keys: D_votes,R_votes,T_votes may be empty
-    try:
-        d = int(row.get('D_votes') or 0)
-    except ValueError:
-        d = 0
-    try:
-        r = int(row.get('R_votes') or 0)
-    except ValueError:
-        r = 0
-    try:
-        t = int(row.get('T_votes') or 0)
-    except ValueError:
-        t = 0
-    maxv = max(d,r,t)
-    if maxv == d:
-        return row.get('D_name','').strip()
-    if maxv == r:
-        return row.get('R_name','').strip()
-    return row.get('T_name','').strip()
+CSV = "1900_2024_election_results.fixed.csv"
 
 
 def main():
@@ -47,32 +30,13 @@ def main():
 
     totals = defaultdict(lambda: defaultdict(int))
 
-    with open(CSV, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                year = int(row.get('year'))
-            except Exception:
-                continue
-            if filter_year and year != filter_year:
-                continue
-            try:
-                ev = int(row.get('electoral_votes') or 0)
-            except ValueError:
-                ev = 0
-            pw = (row.get('party_win') or '').strip()
-            if pw == 'D':
-                name = (row.get('D_name') or '').strip()
-            elif pw == 'R':
-                name = (row.get('R_name') or '').strip()
-            elif pw == 'T':
-                name = (row.get('T_name') or '').strip()
-            else:
-                # fallback to vote-based winner
-                name = choose_winner_by_votes(row)
-            if not name:
-                # if we still don't have a name, skip
-                continue
+    dataset = load_dataset(CSV)
+    # same per-year tally stage the reports use: each state's EVs go to its party_win
+    # candidate (or the vote-based winner when party_win is missing)
+    for year, tally in dataset.tallies().items():
+        if filter_year and year != filter_year:
+            continue
+        for name, ev in tally.ev_by_candidate:
             totals[year][name] += ev
 
     years = sorted(totals.keys())
@@ -1,28 +1,23 @@
-import csv
+import os
 import sys
 from collections import defaultdict
 
-def scan(path, year_filter=None):
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from election_dataset import PARTIES  # noqa: E402
+from election_loader import load_dataset  # noqa: E402
+
+
+def scan(dataset, year_filter=None):
     by_year = defaultdict(lambda: defaultdict(int))
-    with open(path, newline='', encoding='utf-8') as fh:
-        reader = csv.DictReader(fh)
-        for r in reader:
-            year = r.get('year')
-            if year_filter and str(year_filter) != str(year):
-                continue
-            try:
-                ev = int(float(r.get('electoral_votes') or 0))
-            except Exception:
-                ev = 0
-            # assign to party names in D_name/R_name/T_name columns only if corresponding *_electoral > 0
-            for col_prefix in ('D', 'R', 'T'):
-                name_col = f'{col_prefix}_name'
-                ev_col = f'{col_prefix}_electoral'
-                name = r.get(name_col) or ''
-                try:
-                    ev_assigned = int(float(r.get(ev_col) or 0))
-                except Exception:
-                    ev_assigned = 0
+    for year_data in dataset.iter_years():
+        year = year_data.year
+        if year_filter and int(year_filter) != year:
+            continue
+        # assign to party names in D_name/R_name/T_name columns only if corresponding *_electoral > 0
+        for col_prefix in PARTIES:
+            for name, ev_assigned in zip(year_data[f'{col_prefix}_name'].tolist(),
+                                         year_data[f'{col_prefix}_electoral'].tolist()):
                 if ev_assigned > 0 and name:
                     by_year[year][name] += ev_assigned
     return by_year
@@ -31,9 +26,9 @@ def main():
     if len(sys.argv) < 2:
         print('Usage: ev_scan.py <year>')
         sys.exit(1)
-    year = sys.argv[1]
+    year = int(sys.argv[1])
     path = '1900_2024_election_results.fixed.csv'
-    data = scan(path, year_filter=year)
+    data = scan(load_dataset(path), year_filter=year)
     if not data or year not in data:
         print(f'No data for year {year}')
         return
@@ -7,9 +7,16 @@ export default {
   states: {
     'California': { 1900: 'R', 1904: 'R', ... },
     ...
+  },
+  districts: {
+    'ME-02': { 2016: 'R', 2020: 'R', ... },
+    ...
   }
 };
 
+Congressional-district units (names containing '-', e.g. ME-02, NE-02) are
+listed under `districts`, keyed by their name as it appears in the data.
+
 The script looks for common header names (state, year, party_win) and is
 robust to simple variations. Run with --csv and --out to override defaults.
 """
@@ -19,6 +26,10 @@ import os
 import sys
 from collections import defaultdict
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from election_loader import SchemaError, load_dataset  # noqa: E402
+
 
 def detect_fieldnames(fieldnames):
     low = {f.lower(): f for f in fieldnames}
@@ -56,7 +67,21 @@ def map_party_to_letter(party_raw):
     return pl[0].upper()
 
 
+def states_from_dataset(dataset):
+    states = defaultdict(dict)
+    for year_data in dataset.iter_years():
+        for state, party_raw in zip(year_data['state'].tolist(), year_data['party_win'].tolist()):
+            if not state:
+                continue
+            letter = map_party_to_letter(party_raw)
+            if not letter:
+                continue
+            states[state][year_data.year] = letter
+    return states
+
+
 def build_states_dict(csv_path):
+    """Fallback for CSVs whose headers need detect_fieldnames."""
     states = defaultdict(dict)
     with open(csv_path, newline='', encoding='utf-8') as fh:
         reader = csv.DictReader(fh)
@@ -84,18 +109,11 @@ def build_states_dict(csv_path):
     return states
 
 
-def format_js(states_dict):
-    # sort states and years for deterministic output
-    lines = []
-    lines.append("export default {")
-    lines.append("  states: {")
-    for i, state in enumerate(sorted(states_dict.keys())):
-        if '-' in state:
-            # skip congressional districts
-            continue
+def _format_entries(lines, states_dict, names, title_case):
+    for state in names:
         years = sorted(states_dict[state].keys())
-        # title case states for consistency
-        lines.append(f"    '{state.title()}': {{")
+        # title case states for consistency (district names such as ME-02 are kept as-is)
+        lines.append(f"    '{state.title() if title_case else state}': {{")
         # pack year entries, keep line length readable
         parts = [f"{y}: '{states_dict[state][y]}'" for y in years]
         # group by 8 per line
@@ -108,6 +126,19 @@ def format_js(states_dict):
         # but keep a comma after the object itself for valid JS
         # (we'll tidy by ensuring a single comma after the closing brace)
         lines.append("    },")
+
+
+def format_js(states_dict):
+    # sort states and years for deterministic output
+    names = sorted(states_dict.keys())
+    lines = []
+    lines.append("export default {")
+    lines.append("  states: {")
+    _format_entries(lines, states_dict, [s for s in names if '-' not in s], title_case=True)
+    lines.append("  },")
+    # congressional districts with their own electoral vote (ME-02, NE-02, ...)
+    lines.append("  districts: {")
+    _format_entries(lines, states_dict, [s for s in names if '-' in s], title_case=False)
     lines.append("  }")
     lines.append("};")
     return '\n'.join(lines) + '\n'
@@ -126,7 +157,15 @@ def main():
         sys.stderr.write(f"CSV file not found: {csv_path}\n")
         raise SystemExit(2)
 
-    states = build_states_dict(csv_path)
+    try:
+        dataset = load_dataset(csv_path)
+    except (KeyError, SchemaError):
+        # not the pipeline's schema; fall back to header detection
+        dataset = None
+    if dataset is not None:
+        states = states_from_dataset(dataset)
+    else:
+        states = build_states_dict(csv_path)
     if not states:
         sys.stderr.write("No state/year/party rows found.\n")
         raise SystemExit(1)
@@ -135,7 +174,8 @@ def main():
     with open(out_path, 'w', encoding='utf-8') as fh:
         fh.write(js)
 
-    print(f"Wrote {out_path} ({len(states)} states, years per state may vary)")
+    n_districts = sum('-' in s for s in states)
+    print(f"Wrote {out_path} ({len(states) - n_districts} states, {n_districts} districts, years per state may vary)")
 
 
 if __name__ == '__main__':
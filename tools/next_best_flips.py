@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""List the K cheapest distinct flip scenarios for a year.
+
+Runs the flip DP once with an exact choice table and prints the cheapest set of
+states plus the next best alternatives, so analysts don't have to exclude states
+by hand and rerun the pipeline.
+
+Usage:
+  python tools/next_best_flips.py YEAR [--k 5] [--mode classic|no_majority]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from analysis import compute_top_flip_sets  # noqa: E402
+from election_loader import load_dataset  # noqa: E402
+
+CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '1900_2024_election_results.fixed.csv')
+
+
+def main():
+    ap = argparse.ArgumentParser(description='K cheapest distinct flip sets for a year')
+    ap.add_argument('year', type=int)
+    ap.add_argument('--k', type=int, default=5)
+    ap.add_argument('--mode', choices=('classic', 'no_majority'), default='classic')
+    ap.add_argument('--csv', default=CSV)
+    args = ap.parse_args()
+
+    dataset = load_dataset(args.csv)
+    if args.year not in dataset.offsets:
+        print(f'No data for year {args.year}')
+        return
+    election_results = dataset.year(args.year)
+
+    winner = election_results.first('overall_winner')
+    loser = election_results.first('overall_runner_up')
+    winner_ev = election_results.first(winner + '_electoral')
+    loser_ev = election_results.first(loser + '_electoral')
+    ev_to_win = int(election_results['electoral_votes'].sum()) // 2 + 1
+
+    if args.mode == 'classic':
+        electoral_votes_to_flip = election_results.first('electoral_votes_to_win') - loser_ev
+    else:
+        electoral_votes_to_flip = max(0, winner_ev - (ev_to_win - 1))
+
+    solutions, winner_states_dict = compute_top_flip_sets(election_results, loser, electoral_votes_to_flip, k=args.k)
+
+    print(f'Year: {args.year} ({args.mode}, {electoral_votes_to_flip} EVs to flip toward {loser})')
+    for rank, (flipped_states, votes, ev) in enumerate(solutions, start=1):
+        states = sorted(flipped_states, key=lambda s: winner_states_dict[s]['votes_to_flip'])
+        print(f'  #{rank}: {votes:,} votes, {ev} EVs across {len(states)} states: {", ".join(states)}')
+
+
+if __name__ == '__main__':
+    main()
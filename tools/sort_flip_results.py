@@ -1,65 +1,46 @@
 from pathlib import Path
-import re
+import os
+import sys
 
-def main():
-    # Process both the classic and no_majority results files if present
-    SOURCES = [
-        Path('results/flip_results_1900-2024.txt'),
-        Path('no_majority/no_majority_results_1900-2024.txt'),
-        Path('no_majority/no_majority_ONLY_results_1900-2024.txt')
-    ]
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from reporting import read_year_records, records_path, report_path  # noqa: E402
 
+def main(start_year=1900, end_year=2024, output_root=None, modes=('classic', 'no_majority')):
+    # Process both the classic and no_majority results files if present
+    SOURCES = []
+    if 'classic' in modes:
+        SOURCES.append(Path(report_path(start_year, end_year, 'classic', output_root=output_root)))
+    if 'no_majority' in modes:
+        SOURCES.append(Path(report_path(start_year, end_year, 'no_majority', output_root=output_root)))
+        SOURCES.append(Path(report_path(start_year, end_year, 'no_majority', filename='no_majority_ONLY_results', output_root=output_root)))
+
+    written = []
     for SRC in SOURCES:
-        if not SRC.exists():
-            print(f'skipping missing source: {SRC}')
+        # sort from the JSONL records written alongside each TXT report (no text scraping)
+        records_src = Path(records_path(str(SRC)))
+        if not records_src.exists():
+            print(f'skipping missing source: {records_src}')
             continue
 
-        text = SRC.read_text(encoding='utf-8')
-        # strip possible surrounding code fences
-        text = re.sub(r'^\s*```(?:\w+)?\s*\n', '', text)
-        text = re.sub(r'\n?\s*```\s*$', '', text)
-
-        # split into sections starting with 'Year: ####'
-        sections = re.split(r'(?=^Year:\s*\d{4})', text, flags=re.MULTILINE)
-        # drop any leading chunk before first Year:
-        if sections and not sections[0].strip().startswith('Year:'):
-            sections = sections[1:]
-
-        raw_entries = []   # (raw_count:int, section:str)
-        ratio_entries = [] # (ratio:float, section:str) -- ratio is percent value (e.g. 0.53931 means percent)
-
-        for sec in sections:
-            m_raw = re.search(r'Total number of flipped votes:\s*([\d,]+)', sec)
-            if m_raw:
-                raw = int(m_raw.group(1).replace(',', ''))
-            else:
-                raw = -1
-
-            # look for the 'Ratio to Total Votes in Year: X.XXXXX%'
-            m_ratio = re.search(r'Ratio to Total Votes in Year:\s*([\d.]+)%', sec)
-            if m_ratio:
-                # store the percent numeric (not divided by 100) so it's comparable to the printed value
-                ratio = float(m_ratio.group(1))
-            else:
-                ratio = -1.0
-
-            raw_entries.append((raw, sec))
-            ratio_entries.append((ratio, sec))
+        records = read_year_records(records_src)
 
-        # sort descending (largest first) — raw by count, ratio by percent value
-        raw_entries.sort(key=lambda x: x[0], reverse=False)
-        ratio_entries.sort(key=lambda x: x[0], reverse=False)
+        # sort ascending (stable, so ties keep year order) — raw by count, ratio by percent value
+        raw_entries = sorted(records, key=lambda r: r['min_votes_to_flip'])
+        ratio_entries = sorted(records, key=lambda r: r['ratio_to_total_votes'])
 
         base_name = SRC.name
         dst_raw = SRC.parent / f'sorted_raw_{base_name}'
         dst_ratio = SRC.parent / f'sorted_ratio_{base_name}'
 
-        out_raw = '\n\n'.join([sec.rstrip() for num, sec in raw_entries]) + '\n'
-        out_ratio = '\n\n'.join([sec.rstrip() for num, sec in ratio_entries]) + '\n'
+        out_raw = '\n\n'.join([r['section'].rstrip() for r in raw_entries]) + '\n'
+        out_ratio = '\n\n'.join([r['section'].rstrip() for r in ratio_entries]) + '\n'
 
         dst_raw.write_text(out_raw, encoding='utf-8')
         dst_ratio.write_text(out_ratio, encoding='utf-8')
-        print(f'Wrote {dst_raw} and {dst_ratio} with {len(sections)} sections')
+        print(f'Wrote {dst_raw} and {dst_ratio} with {len(records)} sections')
+        written += [str(dst_raw), str(dst_ratio)]
+    return written
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()